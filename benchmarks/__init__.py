@@ -0,0 +1,8 @@
+"""
+Benchmarks of the MkDocs PDF Generate plugin.
+
+* :mod:`benchmarks.sitegen` generates synthetic MkDocs sites of any size.
+* :mod:`benchmarks.run` times each stage of the PDF conversion on the pages of a generated site,
+  and writes the results as JSON so runs can be compared.
+* :mod:`benchmarks.imports` times the imports of the plugin, in fresh interpreters.
+"""
@@ -0,0 +1,110 @@
+"""
+Time the imports of the plugin, each round in a fresh Python interpreter.
+
+MkDocs imports the plugin on every build, even when it is disabled with `enabled_if_env`. The heavy dependencies
+(WeasyPrint, pypdf, BeautifulSoup) are only imported when the first page is converted, so importing the plugin
+should cost next to nothing. The modules of MkDocs are imported before the timer starts, as MkDocs has already
+loaded them when it imports the plugin.
+
+Usage::
+
+    $ python -m benchmarks.imports --rounds 10 --output imports.json
+    $ python -m benchmarks.imports --rounds 10 --compare imports.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .run import Benchmark, compare
+
+# Dependencies which must not be imported by a disabled plugin
+HEAVY_MODULES = ("weasyprint", "pypdf", "bs4", "lxml", "PIL", "fontTools", "concurrent.futures")
+
+# Imported stages: the plugin (what every build pays), the renderer (created by an enabled plugin, even if every
+# page sets `build: false`) and WeasyPrint (paid on the first page converted)
+MODULES = (
+    ("import.plugin", "mkdocs_pdf_generate.plugin"),
+    ("import.renderer", "mkdocs_pdf_generate.renderer"),
+    ("import.weasyprint", "weasyprint"),
+)
+
+_CHILD = """
+import sys
+from timeit import default_timer as timer
+
+import mkdocs.config.defaults, mkdocs.plugins, mkdocs.structure.files, mkdocs.structure.nav, mkdocs.structure.pages
+
+start = timer()
+import {module}
+print(timer() - start)
+print(" ".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def time_import(module: str) -> Tuple[float, List[str]]:
+    """
+    Import a module in a fresh interpreter.
+
+    :param module: The name of the module.
+    :return: The import time in seconds, and the heavy dependencies loaded by the import.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(module=module, heavy=HEAVY_MODULES)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.splitlines()
+    return float(output[0]), output[1].split() if len(output) > 1 else []
+
+
+def run(args: argparse.Namespace) -> Dict:
+    """
+    Time the imports.
+
+    :param args: The command line arguments.
+    :return: The benchmark results.
+    """
+    bench = Benchmark(args.rounds)
+    loaded = {}
+    for name, module in MODULES:
+        timings = []
+        for _ in range(args.rounds):
+            seconds, loaded[name] = time_import(module)
+            timings.append(seconds)
+        bench.add(name, timings)
+
+    print()
+    for name, modules in loaded.items():
+        print("{:<32} loads {}".format(name, ", ".join(modules) or "no heavy dependency"))
+
+    return {
+        "machine_info": {"python_version": sys.version.split()[0], "platform": sys.platform},
+        "params": {"rounds": args.rounds},
+        "datetime": datetime.now(timezone.utc).isoformat(),
+        "benchmarks": bench.results,
+        "loaded_modules": loaded,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the imports of the plugin.")
+    parser.add_argument("--rounds", type=int, default=5, help="the number of interpreters started (default: 5)")
+    parser.add_argument("--output", type=Path, help="the JSON file of the results")
+    parser.add_argument("--compare", type=Path, help="a JSON file of previous results to compare with")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="UTF-8")
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text(encoding="UTF-8")))
+
+
+if __name__ == "__main__":
+    main()
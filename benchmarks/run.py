@@ -0,0 +1,347 @@
+"""
+Time each stage of the PDF conversion on the pages of a synthetic site.
+
+The site is generated with :mod:`benchmarks.sitegen` and built by MkDocs without the plugin, then every stage
+is timed on the built pages. The stages modify the parsed page in-place, so each round runs on a fresh copy
+of its input, which is not timed.
+
+Usage::
+
+    $ python -m benchmarks.run --pages 20 --output results.json
+    $ python -m benchmarks.run --pages 20 --output new.json --compare results.json
+
+The JSON file follows the layout of pytest-benchmark: a `benchmarks` list of `name` and `stats` (in seconds).
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import statistics
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from timeit import default_timer as timer
+from typing import Callable, Dict, List, Optional, Sequence
+
+from bs4 import BeautifulSoup
+
+from .sitegen import generate_site
+
+
+class Benchmark:
+    """
+    Time the stages of the PDF conversion and collect their statistics.
+    """
+
+    def __init__(self, rounds: int, stages: Optional[Sequence[str]] = None):
+        """
+        Initialize the benchmark.
+
+        :param rounds: The number of timed rounds of each stage, on each page.
+        :param stages: The names of the stages to run. All the stages are run if None.
+        """
+        self.rounds = rounds
+        self.stages = stages
+        self.results: List[Dict] = []
+
+    def __call__(self, name: str, func: Callable, setup: Callable[[], tuple] = tuple, inputs: Sequence = (None,)):
+        """
+        Time a stage.
+
+        :param name: The name of the stage.
+        :param func: The stage, called with the arguments returned by `setup`.
+        :param setup: Called before each round with an input, returns the arguments of the stage. It is not timed.
+        :param inputs: The inputs of the stage (e.g. the pages), each one is run for every round.
+        """
+        if self.stages is not None and name not in self.stages:
+            return
+        timings = []
+        for item in inputs:
+            for _ in range(self.rounds):
+                args = setup(item) if item is not None else setup()
+                start = timer()
+                func(*args)
+                timings.append(timer() - start)
+        self.add(name, timings)
+
+    def add(self, name: str, timings: List[float]) -> None:
+        """
+        Add the statistics of a stage timed elsewhere (e.g. in a subprocess).
+
+        :param name: The name of the stage.
+        :param timings: The time of each round, in seconds.
+        """
+        stats = {
+            "min": min(timings),
+            "max": max(timings),
+            "mean": statistics.mean(timings),
+            "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            "median": statistics.median(timings),
+            "rounds": len(timings),
+            "total": sum(timings),
+        }
+        stats["ops"] = 1 / stats["mean"] if stats["mean"] else 0.0
+        self.results.append({"name": name, "stats": stats})
+        print(
+            "{:<32} {:>6} rounds  mean {:>10.3f} ms  min {:>10.3f} ms".format(
+                name, stats["rounds"], stats["mean"] * 1000, stats["min"] * 1000
+            )
+        )
+
+
+def build_site(config_file: Path, site_dir: Path):
+    """
+    Build a site with MkDocs.
+
+    :param config_file: The path of the `mkdocs.yml` file.
+    :param site_dir: The output directory.
+    :return: The MkDocs configuration.
+    """
+    from mkdocs.commands.build import build
+    from mkdocs.config import load_config
+
+    config = load_config(str(config_file), site_dir=str(site_dir))
+    build(config)
+    return config
+
+
+def make_options(config):
+    """
+    Create the plugin options with the default plugin configuration.
+
+    :param config: The MkDocs configuration.
+    :return: The plugin options.
+    """
+    from mkdocs_pdf_generate.options import Options
+    from mkdocs_pdf_generate.plugin import PdfGeneratePlugin
+
+    plugin = PdfGeneratePlugin()
+    errors, _ = plugin.load_config({"toc": True, "toc_numbering": True}, str(config["config_file_path"]))
+    if errors:
+        raise ValueError("Invalid plugin configuration: {}".format(errors))
+    logger = logging.getLogger("mkdocs-pdf-generate-benchmark")
+    logger.setLevel(logging.ERROR)
+    return Options(plugin.config, config, logger)
+
+
+def run(args: argparse.Namespace) -> Dict:
+    """
+    Generate the site, build it and time the stages.
+
+    :param args: The command line arguments.
+    :return: The benchmark results.
+    """
+    with tempfile.TemporaryDirectory(prefix="mkdocs_pdf_generate_bench_") as work_dir:
+        return _run(args, Path(work_dir))
+
+
+def _run(args: argparse.Namespace, work_dir: Path) -> Dict:
+    from weasyprint import __version__ as weasyprint_version
+
+    from mkdocs_pdf_generate import __version__, cover, generate_csv, generate_txt, toc
+    from mkdocs_pdf_generate.preprocessor import get_content, get_separate
+    from mkdocs_pdf_generate.preprocessor.content import restructure_tabbed_content
+    from mkdocs_pdf_generate.preprocessor.links import LinkMap
+    from mkdocs_pdf_generate.renderer import Renderer
+    from mkdocs_pdf_generate.styles import load_print_stylesheets, style_for_print
+    from mkdocs_pdf_generate.themes import cinder, generic, material
+
+    config_file = generate_site(
+        work_dir,
+        pages=args.pages,
+        heading_depth=args.heading_depth,
+        tables=args.tables,
+        code_blocks=args.code_blocks,
+        images=args.images,
+        tabs=args.tabs,
+        seed=args.seed,
+    )
+    site_dir = work_dir.joinpath("site")
+    config = build_site(config_file, site_dir)
+    options = make_options(config)
+    renderer = Renderer(options=options)
+    stylesheets = load_print_stylesheets(options)
+
+    pages = []
+    for index in range(min(args.sample, args.pages)):
+        html_file = site_dir.joinpath(f"page-{index}", "index.html")
+        pages.append((html_file, html_file.read_text(encoding="UTF-8")))
+
+    def page_soup(page, *stages: Callable) -> BeautifulSoup:
+        html_file, html = page
+        options.site_url = config["site_url"]
+        options.md_src_path = Path(html_file.parent.name + ".md")
+        options.out_dest_path = html_file.parent
+        options.body_title = None
+        soup = BeautifulSoup(html, options.html_parser)
+        for stage in stages:
+            soup = stage(soup, page) or soup
+        return soup
+
+    def base_url(page) -> str:
+        return page[0].parent.joinpath("page.pdf").as_uri()
+
+    def content(soup, page):
+        return get_content(soup, options, {})
+
+    def separate(soup, page):
+        return get_separate(soup, base_url(page), config["site_url"])
+
+    bench = Benchmark(args.rounds, args.stages)
+    bench("parse", lambda html: BeautifulSoup(html, options.html_parser), lambda page: (page[1],), pages)
+    # Both values of the `html_parser` option, the lxml stage is left out if lxml is not installed
+    for parser in ("html.parser", "lxml"):
+        if parser == "lxml" and importlib.util.find_spec("lxml") is None:
+            continue
+        bench(
+            f"parse.{parser}", lambda html, parser=parser: BeautifulSoup(html, parser), lambda page: (page[1],), pages
+        )
+    bench("get_content", lambda soup: get_content(soup, options, {}), lambda page: (page_soup(page),), pages)
+    bench(
+        "get_separate",
+        lambda soup, url: get_separate(soup, url, config["site_url"]),
+        lambda page: (page_soup(page, content), base_url(page)),
+        pages,
+    )
+    link_map = LinkMap(str(path) for path in site_dir.rglob("*") if path.is_file())
+    bench(
+        "get_separate.link_map",
+        lambda soup, url: get_separate(soup, url, config["site_url"], link_map=link_map),
+        lambda page: (page_soup(page, content), base_url(page)),
+        pages,
+    )
+    bench("restructure_tabbed_content", restructure_tabbed_content, lambda page: (page_soup(page, content),), pages)
+    bench(
+        "toc.make_toc",
+        lambda soup: toc.make_toc(soup, options),
+        lambda page: (page_soup(page, content, separate),),
+        pages,
+    )
+    bench(
+        "cover.make_cover",
+        lambda soup: cover.make_cover(soup, options, {}),
+        lambda page: (page_soup(page, content, separate),),
+        pages,
+    )
+    bench("style_for_print", lambda: style_for_print(options, {}, stylesheets))
+
+    for name, theme in (("generic", generic), ("cinder", cinder), ("material", material)):
+        bench(f"theme.{name}.modify_html", theme.modify_html, lambda page: (page[1], "page.pdf"), pages)
+        bench(f"theme.{name}.splice_link", theme.splice_link, lambda page: (page[1], "page.pdf"), pages)
+        if hasattr(theme, "modify_soup"):
+            # The fallback of the handler, if the anchor of the link is not found
+            bench(f"theme.{name}.modify_soup", theme.modify_soup, lambda page: (page_soup(page), "page.pdf"), pages)
+
+    def prepared_html(page) -> tuple:
+        return (renderer.prepare_html(page_soup(page), base_url(page), {}),)
+
+    bench("weasyprint.render", renderer._render_html, prepared_html, pages)
+
+    output_dir = work_dir.joinpath("pdf")
+    output_dir.mkdir()
+
+    def write_pdf(soup, url) -> None:
+        renderer.write_pdf(soup, url, output_dir.joinpath("page_R_1_0.pdf"), {})
+        # The files are written in the background, the time spent writing them is included
+        renderer.artifacts.flush()
+
+    bench("write_pdf", write_pdf, lambda page: (page_soup(page), base_url(page)), pages)
+
+    # The TXT TOC is built from the layout of the rendered document (it replaced `pdf_txt_toc`)
+    def txt_toc_inputs(page) -> tuple:
+        soup, headings = renderer._prepare_soup(page_soup(page), base_url(page), {})
+        document = renderer._render_html(str(soup))
+        return output_dir.joinpath("page_R_1_0.txt"), toc.get_toc_entries(headings, options), document.pages
+
+    bench(
+        "generate_txt.txt_toc",
+        lambda txt_file, entries, doc_pages: generate_txt.txt_toc(
+            txt_file, entries, doc_pages, options.toc_title, options.checksum_algorithm
+        ),
+        txt_toc_inputs,
+        pages,
+    )
+
+    meta = {"csv_name": "Benchmark", "type": "Manual"}
+    bench(
+        "generate_csv.get_data",
+        lambda: generate_csv.get_data(
+            output_dir, "page_R_1_0", meta, config["site_url"], None, options.checksum_algorithm
+        ),
+    )
+
+    return {
+        "machine_info": {
+            "node": platform.node(),
+            "processor": platform.processor(),
+            "machine": platform.machine(),
+            "python_version": platform.python_version(),
+            "system": platform.system(),
+            "cpu_count": os.cpu_count(),
+        },
+        "versions": {"mkdocs-pdf-generate": __version__, "weasyprint": weasyprint_version},
+        "params": {
+            "pages": args.pages,
+            "sample": len(pages),
+            "rounds": args.rounds,
+            "heading_depth": args.heading_depth,
+            "tables": args.tables,
+            "code_blocks": args.code_blocks,
+            "images": args.images,
+            "tabs": args.tabs,
+            "seed": args.seed,
+        },
+        "datetime": datetime.now(timezone.utc).isoformat(),
+        "benchmarks": bench.results,
+    }
+
+
+def compare(results: Dict, baseline: Dict) -> None:
+    """
+    Print the change of the mean time of each stage against a previous run.
+
+    :param results: The results of this run.
+    :param baseline: The results of the previous run.
+    """
+    previous = {bench["name"]: bench["stats"] for bench in baseline["benchmarks"]}
+    print("\n{:<32} {:>12} {:>12} {:>8}".format("stage", "before (ms)", "after (ms)", "change"))
+    for bench in results["benchmarks"]:
+        before = previous.get(bench["name"])
+        if before is None:
+            continue
+        after = bench["stats"]["mean"]
+        change = (after - before["mean"]) / before["mean"] if before["mean"] else 0.0
+        print("{:<32} {:>12.3f} {:>12.3f} {:>+8.1%}".format(bench["name"], before["mean"] * 1000, after * 1000, change))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the stages of the PDF conversion.")
+    parser.add_argument("--pages", type=int, default=20, help="the number of pages of the site (default: 20)")
+    parser.add_argument("--sample", type=int, default=5, help="the number of pages timed (default: 5)")
+    parser.add_argument("--rounds", type=int, default=3, help="the number of rounds per page (default: 3)")
+    parser.add_argument("--heading-depth", type=int, default=4, help="the deepest heading level (default: 4)")
+    parser.add_argument("--tables", type=int, default=1, help="the number of tables per section (default: 1)")
+    parser.add_argument("--code-blocks", type=int, default=1, help="the number of code blocks per section (default: 1)")
+    parser.add_argument("--images", type=int, default=1, help="the number of images per section (default: 1)")
+    parser.add_argument("--tabs", type=int, default=1, help="the number of tabbed blocks per section (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the random text (default: 0)")
+    parser.add_argument("--stages", nargs="+", help="the names of the stages to run (default: all)")
+    parser.add_argument("--output", type=Path, help="the JSON file of the results")
+    parser.add_argument("--compare", type=Path, help="a JSON file of previous results to compare with")
+    args = parser.parse_args()
+
+    # Keep the output readable, MkDocs logs every page of the build
+    logging.getLogger("mkdocs").setLevel(logging.WARNING)
+    results = run(args)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="UTF-8")
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text(encoding="UTF-8")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Generate synthetic MkDocs sites to benchmark the plugin.
+
+Usage::
+
+    $ python -m benchmarks.sitegen /tmp/bench-site --pages 500 --heading-depth 4 --tables 3
+"""
+
+import argparse
+import random
+import struct
+import zlib
+from pathlib import Path
+from typing import List
+
+_WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore "
+    "magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo consequat"
+).split()
+
+_CONFIG = """site_name: Benchmark site
+site_url: https://example.com/docs/
+theme:
+  name: material
+  logo: img/diagram.png
+markdown_extensions:
+  - toc:
+      permalink: true
+  - admonition
+  - attr_list
+  - md_in_html
+  - pymdownx.highlight
+  - pymdownx.superfences
+  - pymdownx.tabbed:
+      alternate_style: true
+plugins:
+  - search
+"""
+
+_PLUGIN_CONFIG = """  - pdf-generate:
+      enable_csv: true
+"""
+
+
+def _png(width: int, height: int) -> bytes:
+    """
+    Encode a grey image as PNG.
+
+    :param width: The width of the image.
+    :param height: The height of the image.
+    :return: The PNG file content.
+    """
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    rows = b"".join(b"\x00" + bytes([(x * 7 + y * 3) % 256 for x in range(width)]) for y in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _table(rng: random.Random, rows: int = 8, columns: int = 4) -> List[str]:
+    lines = ["| " + " | ".join(f"Column {c + 1}" for c in range(columns)) + " |"]
+    lines.append("|" + "|".join([":---", "---:", ":---:", "---"][c % 4] for c in range(columns)) + "|")
+    for _ in range(rows):
+        lines.append("| " + " | ".join(rng.choice(_WORDS) for _ in range(columns)) + " |")
+    return lines
+
+
+def _code_block(rng: random.Random, lines: int = 12) -> List[str]:
+    code = ["```python"]
+    for i in range(lines):
+        code.append(f"def {rng.choice(_WORDS)}_{i}(value):  # {rng.choice(_WORDS)}")
+        code.append(f"    return value * {i}")
+    code.append("```")
+    return code
+
+
+def _tabbed_block(rng: random.Random, tabs: int = 3) -> List[str]:
+    block = []
+    for i in range(tabs):
+        block.append(f'=== "Tab {i + 1}"')
+        block.append("")
+        block.append("    " + _sentence(rng))
+        block.append("")
+    return block
+
+
+def _page(
+    rng: random.Random,
+    index: int,
+    pages: int,
+    heading_depth: int,
+    tables: int,
+    code_blocks: int,
+    images: int,
+    tabs: int,
+) -> str:
+    lines = [f"# Page {index}", "", _sentence(rng, 30), ""]
+    # Sections of every level, down to the heading depth
+    for section in range(1, 4):
+        for level in range(2, heading_depth + 1):
+            lines += ["#" * level + f" Section {section}.{level} of page {index}", "", _sentence(rng, 40), ""]
+            other = rng.randrange(pages)
+            lines += [f"See [page {other}](page-{other}.md#page-{other}) for details.", ""]
+        for _ in range(tables):
+            lines += _table(rng) + [""]
+        for _ in range(code_blocks):
+            lines += _code_block(rng) + [""]
+        for _ in range(images):
+            lines += ["![Diagram](img/diagram.png)", ""]
+        for _ in range(tabs):
+            lines += _tabbed_block(rng)
+    return "\n".join(lines)
+
+
+def generate_site(
+    target: Path,
+    pages: int = 50,
+    heading_depth: int = 4,
+    tables: int = 1,
+    code_blocks: int = 1,
+    images: int = 1,
+    tabs: int = 1,
+    with_plugin: bool = False,
+    seed: int = 0,
+) -> Path:
+    """
+    Generate a synthetic MkDocs site. Each page has three sections of every heading level down to the heading depth,
+    and each section holds the given number of tables, code blocks, images and tabbed blocks.
+
+    :param target: The directory of the site.
+    :param pages: The number of pages.
+    :param heading_depth: The deepest heading level, between 2 and 6.
+    :param tables: The number of tables per section.
+    :param code_blocks: The number of code blocks per section.
+    :param images: The number of images per section.
+    :param tabs: The number of tabbed blocks per section.
+    :param with_plugin: Whether the `pdf-generate` plugin is enabled in the `mkdocs.yml` file.
+    :param seed: The seed of the random text, the same seed always generates the same site.
+    :return: The path of the `mkdocs.yml` file.
+    """
+    rng = random.Random(seed)
+    heading_depth = min(max(heading_depth, 2), 6)
+
+    docs_dir = target.joinpath("docs")
+    docs_dir.joinpath("img").mkdir(parents=True, exist_ok=True)
+    docs_dir.joinpath("img", "diagram.png").write_bytes(_png(320, 200))
+    for index in range(pages):
+        content = _page(rng, index, pages, heading_depth, tables, code_blocks, images, tabs)
+        docs_dir.joinpath(f"page-{index}.md").write_text(content, encoding="UTF-8")
+    docs_dir.joinpath("index.md").write_text("# Benchmark site\n\n" + _sentence(rng, 50) + "\n", encoding="UTF-8")
+
+    config_file = target.joinpath("mkdocs.yml")
+    config_file.write_text(_CONFIG + (_PLUGIN_CONFIG if with_plugin else ""), encoding="UTF-8")
+    return config_file
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic MkDocs site.")
+    parser.add_argument("target", type=Path, help="the directory of the site")
+    parser.add_argument("--pages", type=int, default=50, help="the number of pages (default: 50)")
+    parser.add_argument("--heading-depth", type=int, default=4, help="the deepest heading level (default: 4)")
+    parser.add_argument("--tables", type=int, default=1, help="the number of tables per section (default: 1)")
+    parser.add_argument("--code-blocks", type=int, default=1, help="the number of code blocks per section (default: 1)")
+    parser.add_argument("--images", type=int, default=1, help="the number of images per section (default: 1)")
+    parser.add_argument("--tabs", type=int, default=1, help="the number of tabbed blocks per section (default: 1)")
+    parser.add_argument("--with-plugin", action="store_true", help="enable the pdf-generate plugin in mkdocs.yml")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the random text (default: 0)")
+    args = parser.parse_args()
+
+    config_file = generate_site(
+        args.target,
+        pages=args.pages,
+        heading_depth=args.heading_depth,
+        tables=args.tables,
+        code_blocks=args.code_blocks,
+        images=args.images,
+        tabs=args.tabs,
+        with_plugin=args.with_plugin,
+        seed=args.seed,
+    )
+    print(f"Generated {args.pages} page(s): {config_file}")
+
+
+if __name__ == "__main__":
+    main()
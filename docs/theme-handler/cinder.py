@@ -1,5 +1,9 @@
+from typing import Optional
+
 from bs4 import BeautifulSoup
 
+from mkdocs_pdf_generate.themes import opening_tag, splice_html
+
 
 def get_stylesheet() -> str:
     return """
@@ -22,6 +26,11 @@ def get_stylesheet() -> str:
     """
 
 
+def splice_link(html: str, href: str) -> Optional[str]:
+    link = '<small><a href="{}" title="PDF Export" download class="pdf-download">Download PDF</a></small>'
+    return splice_html(html, opening_tag("footer"), link.format(href))
+
+
 def modify_html(html: str, href: str) -> str:
     soup = BeautifulSoup(html, "html.parser")
     sm_wrapper = soup.new_tag("small")
@@ -0,0 +1,143 @@
+import gzip
+import logging
+import os
+import queue
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+# Number of documents whose files wait to be written before the renderer blocks, each one holds whole files
+MAX_PENDING_DOCUMENTS = 8
+
+
+class Artifact(NamedTuple):
+    """
+    A file produced by the conversion of a document.
+    """
+
+    path: Path
+    # Text is encoded as UTF-8
+    data: Union[bytes, str]
+    # Whether the file is compressed with gzip, the path should end with `.gz`
+    compress: bool = False
+
+
+def write_atomic(path: Path, data: Union[bytes, str], compress: bool = False) -> None:
+    """
+    Write a file through a temporary file renamed over the target, so the file is never seen half-written.
+
+    :param path: The path of the file, its parent directories are created.
+    :param data: The content of the file.
+    :param compress: Whether the content is compressed with gzip.
+    """
+    if isinstance(data, str):
+        data = data.encode("UTF-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(".{}.{}.tmp".format(path.name, uuid.uuid4().hex[:8]))
+    try:
+        with open(tmp_path, "xb") as f:
+            if compress:
+                with gzip.GzipFile(filename=path.stem, mode="wb", fileobj=f) as gz:
+                    gz.write(data)
+            else:
+                f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ArtifactWriter:
+    """
+    Write the files of the converted documents (PDF, TXT and debug HTML files) on a pool of I/O threads, while the
+    next documents are laid out. The documents wait in a bounded queue, so the renderer blocks if the files are
+    written slower than they are produced.
+    """
+
+    def __init__(self, logger: logging.Logger, threads: int = 2, max_pending: int = MAX_PENDING_DOCUMENTS):
+        """
+        Initialize the writer. The threads are started on the first submitted document.
+
+        :param logger: The logger of the plugin, the write errors are logged.
+        :param threads: The number of I/O threads. The files are written on the calling thread if 0.
+        :param max_pending: The number of documents waiting to be written before :meth:`submit` blocks.
+        """
+        self.logger = logger
+        self.threads = threads
+        # Number of documents whose files could not be written, and the last write error
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._queue: "queue.Queue[Optional[Tuple[Sequence[Artifact], Optional[Callable]]]]" = queue.Queue(max_pending)
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def submit(self, artifacts: Sequence[Artifact], on_written: Optional[Callable[[], None]] = None) -> None:
+        """
+        Queue the files of a document.
+
+        :param artifacts: The files to write, in order.
+        :param on_written: Called on the I/O thread once all the files are written (e.g. to copy them to the cache).
+        """
+        if self.threads <= 0:
+            self._write(artifacts, on_written)
+            return
+        if not self._workers:
+            for n in range(self.threads):
+                worker = threading.Thread(target=self._run, name=f"mkdocs-pdf-generate-io-{n}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        self._queue.put((artifacts, on_written))
+
+    def write(self, path: Path, data: Union[bytes, str], compress: bool = False) -> None:
+        """
+        Queue a single file, see :meth:`submit`.
+
+        :param path: The path of the file.
+        :param data: The content of the file.
+        :param compress: Whether the file is compressed with gzip.
+        """
+        self.submit([Artifact(path, data, compress)])
+
+    def flush(self) -> None:
+        """
+        Wait until the queued files are written.
+        """
+        if self._workers:
+            self._queue.join()
+
+    def close(self) -> None:
+        """
+        Write the queued files and stop the threads.
+        """
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, artifacts: Sequence[Artifact], on_written: Optional[Callable[[], None]]) -> None:
+        try:
+            for artifact in artifacts:
+                write_atomic(artifact.path, artifact.data, artifact.compress)
+            if on_written is not None:
+                on_written()
+        except Exception as e:
+            message = "Failed to write {}: {}".format(", ".join(str(a.path) for a in artifacts), e)
+            with self._lock:
+                self.errors += 1
+                self.last_error = message
+            self.logger.error("❌ " + message)
@@ -0,0 +1,301 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote, urlsplit
+from urllib.request import url2pathname
+
+from . import __version__
+from .artifacts import write_atomic
+from .checksums import data_checksum
+from .jobs import RenderJob
+from .options import Options
+
+# Options fields which affect the content of a PDF document
+_OPTION_KEYS = (
+    "author",
+    "author_logo",
+    "copyright",
+    "disclaimer",
+    "include_legal_terms",
+    "cover",
+    "cover_title",
+    "cover_subtitle",
+    "cover_images",
+    "toc",
+    "toc_title",
+    "toc_level",
+    "toc_ordering",
+    "theme_name",
+    "html_parser",
+)
+
+# Distributions whose upgrades change the layout or the encoding of a PDF document
+_RENDERING_DISTRIBUTIONS = ("weasyprint", "pydyf")
+
+# Extensions of the template files which affect the content of a PDF document
+_TEMPLATE_SUFFIXES = (".css", ".j2", ".jinja2", ".html", ".htm")
+
+# Local files referenced by a page
+_ASSET_REF = re.compile(r"""\b(?:src|href)=["']([^"'#?]+)""", re.IGNORECASE)
+# Referenced files which never affect the content of a PDF document (other pages, scripts, generated files)
+_IGNORED_ASSET_SUFFIXES = (".html", ".htm", ".js", ".map", ".json", ".xml", ".pdf", ".txt")
+
+
+def _json_dumps(value: Any) -> str:
+    """Serialize a value into a stable JSON string."""
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class RenderCache:
+    """
+    A persistent on-disk cache of generated PDF (and TXT) files.
+
+    Each entry is keyed by a hash of everything that affects the generated files:
+    the page HTML, the PDF metadata, the plugin options, the plugin and custom CSS, the templates
+    and the theme handler stylesheet.
+    The least recently used entries are evicted when the cache grows over its size limit.
+    """
+
+    PDF_FILE = "document.pdf"
+    TXT_FILE = "document.txt"
+
+    def __init__(self, options: Options, theme_stylesheet: Optional[str], cache_dir: Optional[Path] = None):
+        """
+        Initialize the cache.
+
+        :param options: The plugin options.
+        :param theme_stylesheet: The stylesheet of the theme handler.
+        :param cache_dir: The directory of the cache. Defaults to the `cache_dir` option.
+        """
+        self._options = options
+        self.cache_dir = cache_dir or options.cache_dir()
+        self.max_size = options.cache_max_size * 1024 * 1024
+        # The paths are hashed relative to these directories, so the keys are the same in every checkout
+        config = options.user_config
+        roots = [
+            ("package", Path(__file__).parent),
+            ("site", Path(config["site_dir"])),
+            ("docs", Path(config["docs_dir"])),
+            ("config", Path(config["config_file_path"]).parent),
+        ]
+        self._roots = [(name, root.resolve()) for name, root in roots]
+        # Digests of the files read during this build, by path
+        self._file_digests: Dict[Path, str] = {}
+        self._fingerprint = self._make_fingerprint(theme_stylesheet)
+
+    def key(self, job: RenderJob) -> str:
+        """
+        Compute the cache key of a page.
+
+        :param job: The page snapshot to build.
+        :return: The hexadecimal cache key.
+        """
+        h = hashlib.sha256(self._fingerprint.encode())
+        # The base URL is the file URL of the PDF file, made of the destination directory and the file name
+        page_data = [
+            job.file_name,
+            job.site_url,
+            job.src_path.as_posix(),
+            self._portable_path(job.dest_path),
+            job.body_title,
+            job.pdf_meta,
+        ]
+        h.update(_json_dumps(page_data).encode("UTF-8"))
+        h.update(job.content.encode("UTF-8"))
+        for path in self._dependencies(job):
+            h.update(self._portable_path(path).encode("UTF-8"))
+            h.update(self._file_digest(path).encode())
+        return h.hexdigest()
+
+    def restore(self, key: str, dest_path: Path, file_name: str) -> Optional[Dict[str, str]]:
+        """
+        Copy the cached files of an entry to the output directory.
+
+        :param key: The cache key.
+        :param dest_path: The directory where the PDF (and TXT) file are written.
+        :param file_name: The base name of the PDF (and TXT) file.
+        :return: The checksums of the restored files (by file type, "pdf" and "txt") if the entry was found,
+          None otherwise.
+        """
+        entry = self._entry_dir(key)
+        cached_pdf = entry.joinpath(self.PDF_FILE)
+        if not cached_pdf.is_file():
+            return None
+
+        algorithm = self._options.checksum_algorithm
+        checksums = {}
+        for file_type, cached_file in (("pdf", cached_pdf), ("txt", entry.joinpath(self.TXT_FILE))):
+            if file_type == "pdf" or cached_file.is_file():
+                # Written through a temporary file, as the files written by the renderer
+                data = cached_file.read_bytes()
+                write_atomic(dest_path.joinpath(f"{file_name}.{file_type}"), data)
+                checksums[file_type] = data_checksum(data, algorithm)
+        # Mark the entry as recently used
+        os.utime(entry)
+        return checksums
+
+    def store(self, key: str, dest_path: Path, file_name: str, with_txt: bool = False) -> None:
+        """
+        Add the generated files of a page to the cache.
+
+        :param key: The cache key.
+        :param dest_path: The directory where the PDF (and TXT) file were written.
+        :param file_name: The base name of the PDF (and TXT) file.
+        :param with_txt: Whether a TXT file was generated for the page.
+        """
+        entry = self._entry_dir(key)
+        if entry.is_dir():
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+
+        # Fill a temporary directory first, so concurrent builds never see a partial entry
+        tmp_entry = Path(tempfile.mkdtemp(prefix=".tmp-", dir=entry.parent))
+        try:
+            shutil.copyfile(dest_path.joinpath(f"{file_name}.pdf"), tmp_entry.joinpath(self.PDF_FILE))
+            if with_txt:
+                shutil.copyfile(dest_path.joinpath(f"{file_name}.txt"), tmp_entry.joinpath(self.TXT_FILE))
+            os.replace(tmp_entry, entry)
+        except OSError:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    def prune(self) -> int:
+        """
+        Evict the least recently used entries until the cache fits in its size limit.
+
+        :return: The number of evicted entries.
+        """
+        if not self.cache_dir.is_dir():
+            return 0
+
+        entries = []
+        total_size = 0
+        for entry in self.cache_dir.glob("*/*"):
+            if not entry.is_dir() or entry.name.startswith(".tmp-"):
+                continue
+            size = sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+            entries.append((entry.stat().st_mtime, size, entry))
+            total_size += size
+
+        evicted = 0
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= size
+            evicted += 1
+        return evicted
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir.joinpath(key[:2], key)
+
+    def _portable_path(self, path: Path) -> str:
+        """
+        Get the form of a path hashed in the cache keys, relative to the plugin package, the site directory, the docs
+        directory or the directory of the `mkdocs.yml` file.
+
+        :param path: The path of a file or directory.
+        :return: The name of the directory and the relative POSIX path, or the absolute path if the path is under
+          none of them.
+        """
+        path = Path(path).resolve()
+        for name, root in self._roots:
+            if root == path or root in path.parents:
+                return "{}:{}".format(name, path.relative_to(root).as_posix())
+        return str(path)
+
+    def _file_digest(self, path: Path) -> str:
+        """
+        Get the digest of a file's content. Each file is read once per build.
+
+        :param path: The path of the file.
+        :return: The hexadecimal digest, or an empty string if the file does not exist.
+        """
+        digest = self._file_digests.get(path)
+        if digest is None:
+            try:
+                digest = hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+            except OSError:
+                digest = ""
+            self._file_digests[path] = digest
+        return digest
+
+    def _dependencies(self, job: RenderJob) -> List[Path]:
+        """
+        Find the local files (images, stylesheets, fonts, ...) a page depends on.
+
+        :param job: The page snapshot to build.
+        :return: A sorted list of file paths.
+        """
+        site_dir = Path(self._options.user_config["site_dir"])
+        paths = set()
+        for ref in _ASSET_REF.findall(job.content):
+            target = urlsplit(ref)
+            if target.scheme == "file":
+                path = Path(url2pathname(target.path))
+            elif target.scheme or target.netloc:
+                continue
+            elif ref.startswith("/"):
+                path = site_dir.joinpath(unquote(target.path).lstrip("/"))
+            else:
+                path = job.dest_path.joinpath(unquote(target.path))
+            if path.suffix.lower() not in _IGNORED_ASSET_SUFFIXES and path.is_file():
+                paths.add(path.resolve())
+
+        # Cover image of the document (relative to the Markdown file)
+        cover_image = job.pdf_meta.get("cover_image")
+        if isinstance(cover_image, dict) and cover_image.get("source"):
+            docs_dir = Path(self._options.user_config["docs_dir"])
+            path = docs_dir.joinpath(job.src_path).parent.joinpath(cover_image["source"])
+            if path.is_file():
+                paths.add(path.resolve())
+        return sorted(paths)
+
+    def _make_fingerprint(self, theme_stylesheet: Optional[str]) -> str:
+        """
+        Hash the inputs shared by all the pages of a build.
+
+        :param theme_stylesheet: The stylesheet of the theme handler.
+        :return: The hexadecimal fingerprint.
+        """
+        options = self._options
+        h = hashlib.sha256()
+        h.update(__version__.encode())
+        # Read from the package metadata, so WeasyPrint is still imported on the first document rendered
+        for distribution in _RENDERING_DISTRIBUTIONS:
+            try:
+                h.update("{}={}".format(distribution, version(distribution)).encode())
+            except PackageNotFoundError:
+                pass
+        h.update(_json_dumps({key: getattr(options, key) for key in _OPTION_KEYS}).encode("UTF-8"))
+        # `now` is added to the template keywords (and so to `extra`) at render time
+        extra = {k: v for k, v in options.user_config["extra"].items() if k != "now"}
+        h.update(_json_dumps(extra).encode("UTF-8"))
+        h.update((theme_stylesheet or "").encode("UTF-8"))
+
+        # Plugin stylesheets and templates
+        package_dir = Path(__file__).parent.resolve()
+        files = sorted(package_dir.joinpath("styles").glob("*.css"))
+        files += sorted(package_dir.joinpath("templates").glob("*.j2"))
+        # Custom stylesheets and templates
+        custom_template_path = options.template.get_custom_template_path()
+        if custom_template_path.is_dir():
+            files += sorted(f for f in custom_template_path.rglob("*") if f.suffix in _TEMPLATE_SUFFIXES)
+
+        # Author logo and cover images
+        images = [options.author_logo] + list((options.cover_image_urls or {}).values())
+        for image in images:
+            target = urlsplit(str(image or ""))
+            if target.scheme == "file":
+                files.append(Path(url2pathname(target.path)))
+
+        for file in files:
+            if file.is_file():
+                h.update(self._portable_path(file).encode("UTF-8"))
+                h.update(self._file_digest(file).encode())
+        return h.hexdigest()
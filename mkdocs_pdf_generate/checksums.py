@@ -0,0 +1,34 @@
+import hashlib
+from pathlib import Path
+from typing import Union
+
+# Hash algorithms supported by the `checksum_algorithm` option
+CHECKSUM_ALGORITHMS = ("md5", "sha256", "blake2b")
+
+_CHUNK_SIZE = 1 << 20
+
+
+def data_checksum(data: bytes, algorithm: str) -> str:
+    """
+    Compute the checksum of bytes, e.g. the content of a file which is not written yet.
+
+    :param data: The bytes.
+    :param algorithm: The name of the hash algorithm.
+    :return: The uppercase hexadecimal digest.
+    """
+    return hashlib.new(algorithm, data).hexdigest().upper()
+
+
+def file_checksum(path: Union[Path, str], algorithm: str) -> str:
+    """
+    Compute the checksum of a file's content.
+
+    :param path: The path of the file.
+    :param algorithm: The name of the hash algorithm.
+    :return: The uppercase hexadecimal digest.
+    """
+    h = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest().upper()
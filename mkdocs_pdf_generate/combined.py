@@ -0,0 +1,291 @@
+"""
+Build a single PDF document of the whole site.
+
+Every page of the navigation is laid out as its own chapter (so only one chapter is held in memory
+by each process), and the chapters are stitched together with pypdf:
+
+1. The chapters and the front matter (cover page and site-wide TOC) are laid out once to find
+   their page counts and the pages of their headings.
+2. They are rendered again to PDF files, with the page number offsets (`__pgnum__` counter)
+   and the page numbers of the site-wide TOC.
+3. The PDF files are merged with their outlines, and the links between chapters are turned into
+   internal destinations.
+"""
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup
+
+from .jobs import ChapterJob, ChapterLayout, RenderJob
+from .options import Options
+from .toc import Heading, number_headings
+
+if TYPE_CHECKING:
+    from pypdf import PdfWriter
+
+# Links to other chapters are written with this URI scheme, and turned into internal destinations after merging
+LINK_SCHEME = "mkdocs-pdf-chapter:"
+
+
+class CombinedDocumentException(Exception):
+    """
+    Custom exception class for errors related to building the combined PDF document.
+    """
+
+
+def chapter_anchor(index: int, anchor: str = "") -> str:
+    """
+    Get the name of an anchor in the combined document. The anchors of each chapter are prefixed to be unique.
+
+    :param index: The index of the chapter.
+    :param anchor: The anchor in the page, or an empty string for the start of the chapter.
+    :return: The anchor name.
+    """
+    return f"chapter-{index}--{anchor}" if anchor else f"chapter-{index}"
+
+
+def page_key(url: str) -> str:
+    """
+    Normalize the URL of a page (relative to the site root), to match the links between pages.
+
+    :param url: The URL of the page, without fragment.
+    :return: The normalized URL.
+    """
+    url = re.sub(r"(^|/)index\.html?$", r"\1", url)
+    url = re.sub(r"^\./", "", url)
+    return url.strip("/")
+
+
+def prepare_chapter(soup: BeautifulSoup, chapter: ChapterJob, options: Options, headings: Sequence[Heading]) -> None:
+    """
+    Prepare the DOM of a chapter: number its headings, make its anchors unique, and rewrite the links to the
+    other chapters. Must be called after the links are resolved by the preprocessor.
+
+    :param soup: The BeautifulSoup object of the chapter, modified in-place.
+    :param chapter: The chapter.
+    :param options: The plugin options.
+    :param headings: The heading index of the chapter, see :func:`~mkdocs_pdf_generate.toc.index_headings`.
+    """
+    number_headings(soup, options, headings)
+
+    for element in soup.body.find_all(id=True):
+        element["id"] = chapter_anchor(chapter.index, element["id"])
+    start = soup.new_tag("div", id=chapter_anchor(chapter.index))
+    soup.body.insert(0, start)
+
+    site_url = chapter.page.site_url.rstrip("/") + "/"
+    for a in soup.body.find_all("a", href=True):
+        href = a["href"]
+        if href.startswith("#"):
+            a["href"] = "#" + chapter_anchor(chapter.index, href[1:])
+            continue
+        if not (href + "/").startswith(site_url):
+            continue
+        target = urlsplit(href[len(site_url) :])
+        index = chapter.link_map.get(page_key(target.path))
+        if index is not None:
+            a["href"] = LINK_SCHEME + chapter_anchor(index, target.fragment)
+
+
+def get_chapter_headings(
+    headings: Sequence[Heading], chapter: ChapterJob, options: Options
+) -> List[Tuple[str, str, int]]:
+    """
+    Get the headings of a prepared chapter listed in the site-wide TOC.
+
+    :param headings: The heading index of the chapter.
+    :param chapter: The chapter, the front matter has no heading listed.
+    :param options: The plugin options.
+    :return: A list of (anchor, text, level) tuples in document order. The text includes the heading numbering.
+    """
+    if not chapter.index:
+        return []
+    level = min(max(options.toc_level, 1), 6)
+    return [
+        (chapter_anchor(chapter.index, h.id), re.sub(r"\s+", " ", h.numbering + h.text).strip(), h.level)
+        for h in headings
+        if h.level <= level and h.id is not None
+    ]
+
+
+def make_site_toc(soup: BeautifulSoup, options: Options, site_toc: Sequence[Tuple[str, str, int, int]]) -> None:
+    """
+    Replace the content of the front matter with the site-wide table of contents.
+
+    :param soup: The BeautifulSoup object of the front matter, modified in-place.
+    :param options: The plugin options.
+    :param site_toc: The (anchor, text, level, page number) tuples of the TOC entries.
+    """
+    soup.body.clear()
+    if not options.toc:
+        return
+
+    toc = soup.new_tag("article", id="doc-toc")
+    title = soup.new_tag("h1")
+    title.append(soup.new_string(options.toc_title))
+    toc.append(title)
+
+    # Nested lists, one per heading level
+    lists = [(1, soup.new_tag("ul"))]
+    toc.append(lists[0][1])
+    for anchor, text, level, page in site_toc:
+        while len(lists) > 1 and lists[-1][0] > level:
+            lists.pop()
+        if level > lists[-1][0] and lists[-1][1].contents:
+            sub_list = soup.new_tag("ul")
+            lists[-1][1].contents[-1].append(sub_list)
+            lists.append((level, sub_list))
+        li = soup.new_tag("li")
+        a = soup.new_tag("a", href=LINK_SCHEME + anchor, attrs={"data-page": str(page)})
+        a.append(soup.new_string(text))
+        li.append(a)
+        lists[-1][1].append(li)
+
+    style = soup.new_tag("style")
+    # The targets are in other PDF files, show the page numbers computed from the chapter layouts
+    style.string = "article#doc-toc li a::after { content: attr(data-page); }"
+    soup.head.append(style)
+    soup.body.append(toc)
+
+
+def _site_toc(layouts: Sequence[ChapterLayout], offsets: Sequence[int]) -> List[Tuple[str, str, int, int]]:
+    """
+    Build the entries of the site-wide TOC from the chapter layouts.
+
+    :param layouts: The layouts of the chapters.
+    :param offsets: The number of pages before each chapter.
+    :return: The (anchor, text, level, page number) tuples of the TOC entries.
+    """
+    site_toc = []
+    for layout, offset in zip(layouts, offsets):
+        for anchor, text, level in layout.headings:
+            page = layout.anchors.get(anchor)
+            if page is not None:
+                site_toc.append((anchor, text, level, offset + page + 1))
+    return site_toc
+
+
+def rewrite_chapter_links(writer: "PdfWriter") -> int:
+    """
+    Turn the links to other chapters into links to the named destinations of the merged document.
+
+    :param writer: The pypdf writer of the merged document.
+    :return: The number of rewritten links.
+    """
+    from pypdf.generic import NameObject, TextStringObject
+
+    rewritten = 0
+    for page in writer.pages:
+        for annotation in page.get("/Annots", []):
+            annotation = annotation.get_object()
+            action = annotation.get("/A")
+            if action is None:
+                continue
+            action = action.get_object()
+            uri = action.get("/URI")
+            if action.get("/S") != "/URI" or not str(uri or "").startswith(LINK_SCHEME):
+                continue
+            del annotation["/A"]
+            annotation[NameObject("/Dest")] = TextStringObject(str(uri)[len(LINK_SCHEME) :])
+            rewritten += 1
+    return rewritten
+
+
+def build_combined(
+    pages: Sequence[Tuple[str, RenderJob]],
+    output_file: Path,
+    render: Callable[[List[ChapterJob]], List[ChapterLayout]],
+    metadata: Optional[Dict[str, str]] = None,
+) -> int:
+    """
+    Build the combined PDF document of the site.
+
+    :param pages: The (URL, page snapshot) tuples of the pages, in navigation order.
+    :param output_file: The path of the combined PDF file.
+    :param render: A function laying out a list of chapters (in worker processes or in-process),
+      returning their layouts in the same order.
+    :param metadata: The document information of the combined PDF (e.g. `/Title`).
+    :return: The number of pages of the combined document.
+    """
+    from pypdf import PdfWriter
+
+    link_map = {page_key(url): index for index, (url, _) in enumerate(pages, start=1)}
+    chapters = [
+        ChapterJob(index=index, page=job, url=url, link_map=link_map) for index, (url, job) in enumerate(pages, start=1)
+    ]
+    # The front matter reuses the page of the first chapter (for its stylesheets)
+    front_matter = ChapterJob(index=0, page=pages[0][1], url=pages[0][0], link_map=link_map, site_toc=[])
+
+    def check(layouts: List[ChapterLayout]) -> List[ChapterLayout]:
+        for layout in layouts:
+            if layout.error is not None:
+                raise CombinedDocumentException(
+                    "Error laying out chapter {}. Reason: {}".format(layout.index, layout.error)
+                )
+        return layouts
+
+    # Phase 1: page counts and heading pages
+    layouts = check(render(chapters))
+    chapter_offsets = [0]
+    for layout in layouts[:-1]:
+        chapter_offsets.append(chapter_offsets[-1] + layout.page_count)
+    front_matter_pages = check(render([front_matter._replace(site_toc=_site_toc(layouts, chapter_offsets))]))[0]
+    front_matter_pages = front_matter_pages.page_count
+
+    # Phase 2: render the PDF files with the final page numbers
+    tmp_dir = Path(tempfile.mkdtemp(prefix="mkdocs_pdf_generate_combined_"))
+    try:
+        pdf_files = [str(tmp_dir.joinpath(f"chapter-{index}.pdf")) for index in range(len(chapters) + 1)]
+        for _ in range(2):
+            offsets = [front_matter_pages + offset for offset in chapter_offsets]
+            total_pages = offsets[-1] + layouts[-1].page_count
+            final_jobs = [
+                front_matter._replace(
+                    site_toc=_site_toc(layouts, offsets), total_pages=total_pages, pdf_file=pdf_files[0]
+                )
+            ]
+            final_jobs += [
+                chapter._replace(page_offset=offset, total_pages=total_pages, pdf_file=pdf_files[chapter.index])
+                for chapter, offset in zip(chapters, offsets)
+            ]
+            final_layouts = check(render(final_jobs))
+            if final_layouts[0].page_count == front_matter_pages:
+                break
+            # The page numbers made the TOC longer (or shorter), render again with the new offsets
+            front_matter_pages = final_layouts[0].page_count
+        else:
+            raise CombinedDocumentException("The page count of the table of contents does not converge.")
+
+        # Merge the chapters
+        writer = PdfWriter()
+        for pdf_file in pdf_files:
+            writer.append(pdf_file, import_outline=True)
+        rewrite_chapter_links(writer)
+        if metadata:
+            writer.add_metadata(metadata)
+
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_output = tmp_dir.joinpath("combined.pdf")
+        with open(tmp_output, "wb") as f:
+            writer.write(f)
+        writer.close()
+        shutil.move(str(tmp_output), str(output_file))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return total_pages
+
+
+def combined_href(output_file: Path, dest_path: Path) -> str:
+    """
+    Get the link to the combined PDF document from the directory of a page.
+
+    :param output_file: The path of the combined PDF file.
+    :param dest_path: The output directory of the page.
+    :return: The relative URL of the combined PDF file.
+    """
+    return Path(os.path.relpath(output_file, dest_path)).as_posix()
@@ -1,11 +1,11 @@
 import re
-from typing import Dict, Optional
+from typing import Dict, Optional, Sequence
 
 from bs4 import BeautifulSoup, Tag
 from pathlib import Path
 
 from .options import Options
-from .templates.filters.url import URLFilter
+from .toc import Heading, get_title, index_headings
 
 
 class PDFPluginException(Exception):
@@ -16,20 +16,27 @@ class PDFPluginException(Exception):
     pass
 
 
-def make_cover(soup: BeautifulSoup, options: Options, pdf_metadata: Dict) -> None:
+def make_cover(
+    soup: BeautifulSoup, options: Options, pdf_metadata: Dict, headings: Optional[Sequence[Heading]] = None
+) -> None:
     """
     Generate a cover page if the 'cover' option is enabled.
 
     :param soup: The target element.
     :param options: Project options.
     :param pdf_metadata: Metadata for the PDF.
+    :param headings: The heading index of the document, built if None.
     """
 
     if options.cover:
-        _make_cover(soup, options, pdf_metadata)
+        if headings is None:
+            headings = index_headings(soup, options)
+        _make_cover(soup, options, pdf_metadata, headings)
 
 
-def _make_cover(soup: BeautifulSoup, options: Options, pdf_metadata: Dict) -> Optional[BeautifulSoup]:
+def _make_cover(
+    soup: BeautifulSoup, options: Options, pdf_metadata: Dict, headings: Sequence[Heading]
+) -> Optional[BeautifulSoup]:
     """
     Generate a cover page for a PDF document and add it to the provided BeautifulSoup object.
 
@@ -40,6 +47,7 @@ def _make_cover(soup: BeautifulSoup, options: Options, pdf_metadata: Dict) -> Op
     :param soup: The BeautifulSoup object representing the document's HTML.
     :param options: An instance of the Options class containing various configuration settings.
     :param pdf_metadata: Metadata for the PDF document.
+    :param headings: The heading index of the document, its title is removed.
 
     :return: The modified BeautifulSoup object with the cover page inserted or None.
     """
@@ -50,11 +58,9 @@ def _make_cover(soup: BeautifulSoup, options: Options, pdf_metadata: Dict) -> Op
         keywords["cover_title"] = pdf_metadata.get("title") or options.body_title or keywords["cover_title"]
         # Set cover image
         document_type: str = pdf_metadata.get("type") or "Documentation"
-        path_filter = URLFilter(options, options.user_config)
-        if options.cover_images is not None:
-            cover_images = {
-                str(img_k).lower(): path_filter(pathname=str(img_v)) for img_k, img_v in options.cover_images.items()
-            }
+        path_filter = options.url_filter
+        cover_images = options.cover_image_urls
+        if cover_images is not None:
             keywords["cover_image"] = cover_images.get(document_type.lower()) or cover_images.get("default")
         # Set cover sub_title
         keywords["cover_subtitle"] = (
@@ -64,18 +70,10 @@ def _make_cover(soup: BeautifulSoup, options: Options, pdf_metadata: Dict) -> Op
         # Populate local options into template keywords
         keywords.update({k: v for k, v in pdf_metadata.items() if k != "cover_image"})
 
-        # Select cover template
+        # Select and render the cover template, the documents with the same cover share the rendered fragment
         cover_template_files = [document_type.lower(), "cover", "default_cover"]
-        template = options.template.select(cover_template_files)
-        options.logger.info(f'Generate cover page for PDF document using "{template.name}" template.')
-
-        def str_to_bs4(html_like_str: str) -> Tag:
-            """Convert an HTML-like string to a BeautifulSoup Tag."""
-            html_soup = BeautifulSoup(html_like_str, "html.parser")
-            return html_soup
-
-        cover_template = str(template.render(keywords))
-        cover_html = str_to_bs4(cover_template)
+        template_name, cover_html = options.template.render_fragment(cover_template_files, keywords)
+        options.logger.info(f'Generate cover page for PDF document using "{template_name}" template.')
 
         # Include an image on the cover page
         def include_image(cover_page_html: Tag) -> Tag:
@@ -98,7 +96,7 @@ def _make_cover(soup: BeautifulSoup, options: Options, pdf_metadata: Dict) -> Op
             cover_img_tag = cover_page_html.find(attrs={"id": cover_img_id})
             if not cover_img_tag:
                 options.logger.error(
-                    f"No HTML element in your cover template ('{template.name}') "
+                    f"No HTML element in your cover template ('{template_name}') "
                     f"has an 'id' attribute equal to `{cover_img_id}`."
                 )
                 return cover_page_html
@@ -122,9 +120,9 @@ def _make_cover(soup: BeautifulSoup, options: Options, pdf_metadata: Dict) -> Op
         cover_html = include_image(cover_html)
 
         # Remove h1 content
-        h1_title = soup.find("h1", attrs={"id": re.compile(r"[\w_\-]+")})
+        h1_title = get_title(headings)
         if h1_title is not None:
-            h1_title.decompose()
+            h1_title.element.decompose()
 
         # Insert cover_html at the beginning of the document
         soup.body.insert(0, cover_html)
@@ -0,0 +1,316 @@
+"""
+A long-lived local WeasyPrint render daemon.
+
+The daemon keeps WeasyPrint, the fonts and the plugin stylesheets loaded, and renders the prepared HTML
+of PDF documents sent by the plugin over a Unix domain socket. Start it with::
+
+    python -m mkdocs_pdf_generate.daemon /tmp/mkdocs-pdf-generate.sock --workers 4 --output-root site
+
+and set the `render_daemon_socket` plugin option to the same socket path. The socket is only accessible to the
+user running the daemon, and the files are only written under the output roots (the current directory by default).
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .logger import get_logger
+
+# Messages are sent as a 4-byte big-endian length followed by a UTF-8 JSON payload
+_HEADER = struct.Struct(">I")
+
+
+class RenderDaemonException(Exception):
+    """
+    Custom exception class for errors reported by the render daemon.
+    """
+
+
+def _send_message(conn: socket.socket, message: Dict) -> None:
+    payload = json.dumps(message).encode("UTF-8")
+    conn.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exactly(conn: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size > 0:
+        chunk = conn.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_message(conn: socket.socket) -> Dict:
+    (size,) = _HEADER.unpack(_recv_exactly(conn, _HEADER.size))
+    return json.loads(_recv_exactly(conn, size).decode("UTF-8"))
+
+
+def render_with_daemon(socket_path: str, html: str, pdf_file: str, options: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    Ask the render daemon to render prepared HTML to a PDF file.
+
+    :param socket_path: The path of the daemon's Unix domain socket.
+    :param html: The prepared HTML of the document.
+    :param pdf_file: The output filename for the PDF.
+    :param options: The `checksum_algorithm` of the written files, the site locations of the `resolver` (see
+      :func:`~mkdocs_pdf_generate.resources.resolver_settings`), and the `txt_file`, `toc_entries` and `toc_title`
+      of the TXT table of contents to write from the layout of the document, if needed.
+    :return: None if the daemon is not running (or stopped), the reply of the daemon once the PDF file is written:
+      the `checksums` of the written files (by file type, "pdf" and "txt"), the `page_count` of the document and
+      the number of resources fetched from the network (`network_requests`).
+    :raise RenderDaemonException: If the daemon failed to render the document.
+    """
+    if not hasattr(socket, "AF_UNIX") or not Path(socket_path).exists():
+        return None
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            conn.connect(socket_path)
+        except OSError:
+            # Stale socket file, the daemon is not running
+            return None
+        try:
+            _send_message(conn, dict(options or {}, html=html, pdf_file=str(pdf_file)))
+            reply = _recv_message(conn)
+        except ConnectionError:
+            # The daemon stopped before replying
+            return None
+    finally:
+        conn.close()
+
+    if reply.get("error"):
+        raise RenderDaemonException(reply["error"])
+    return reply
+
+
+def _output_path(path: str, roots: Sequence[Path]) -> Path:
+    """
+    Check that a file requested by a client is written under one of the output roots.
+
+    :param path: The absolute path of the file.
+    :param roots: The resolved output roots of the daemon.
+    :return: The path of the file, with its directory resolved.
+    :raise RenderDaemonException: If the path is not absolute or not under an output root.
+    """
+    file_path = Path(path)
+    if file_path.is_absolute() and file_path.name not in ("", ".", ".."):
+        # The file itself is replaced by a rename, only its directory may be a symbolic link
+        file_path = file_path.parent.resolve().joinpath(file_path.name)
+        if any(root == file_path.parent or root in file_path.parents for root in roots):
+            return file_path
+    raise RenderDaemonException("{} is not under the output roots of the render daemon".format(path))
+
+
+def _listen(socket_path: str, backlog: int) -> socket.socket:
+    """
+    Create the listening socket of the daemon, only accessible to the user running it.
+
+    :param socket_path: The path of the Unix domain socket, replaced if it exists.
+    :param backlog: The number of pending connections.
+    :return: The listening socket.
+    """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Created without permissions for the other users, then restricted to the owner
+    umask = os.umask(0o177)
+    try:
+        listener.bind(socket_path)
+    finally:
+        os.umask(umask)
+    os.chmod(socket_path, 0o600)
+    listener.listen(backlog)
+    return listener
+
+
+def _warm_up() -> None:
+    """
+    Import WeasyPrint and lay out a document using the plugin stylesheets,
+    so fonts are discovered once in the parent process and shared by the forked workers.
+    """
+    from weasyprint import HTML
+
+    styles_dir = Path(__file__).parent.joinpath("styles")
+    css = "\n".join(f.read_text(encoding="UTF-8") for f in sorted(styles_dir.glob("*.css")))
+    html = (
+        f"<html><head><style>{css}</style></head><body>"
+        '<article id="doc-cover"><h1>Cover</h1></article>'
+        '<article class="md-content__inner"><h2 id="warm-up">Warm up</h2><p>Warm up <code>code</code></p></article>'
+        "</body></html>"
+    )
+    HTML(string=html).render()
+
+
+def _serve_forever(listener: socket.socket, output_roots: Sequence[Path]) -> None:
+    """
+    Accept and handle render requests in a worker process.
+
+    :param listener: The listening socket shared by all the workers.
+    :param output_roots: The resolved directories the files are written under.
+    """
+    from weasyprint import HTML, default_url_fetcher
+    from weasyprint.text.fonts import FontConfiguration
+
+    from .artifacts import write_atomic
+    from .checksums import data_checksum
+    from .generate_txt import txt_toc
+    from .resources import LocalResolver
+
+    logger = get_logger("mkdocs-pdf-generate-daemon")
+    # Shared by all the documents rendered by the worker
+    font_config = FontConfiguration()
+    while True:
+        conn, _ = listener.accept()
+        try:
+            request = _recv_message(conn)
+            try:
+                pdf_file = _output_path(request["pdf_file"], output_roots)
+                txt_file = _output_path(request["txt_file"], output_roots) if request.get("txt_file") else None
+                checksum_algorithm = request.get("checksum_algorithm", "md5")
+                # The resources of the site are read from the local files, as in-process
+                fetch = default_url_fetcher
+                resolver = None
+                if request.get("resolver"):
+                    resolver = LocalResolver(default_url_fetcher, request["resolver"], logger)
+                    fetch = resolver.fetch
+                pdf_document = HTML(string=request["html"], url_fetcher=fetch).render(font_config=font_config)
+                # Written through a temporary file, so the PDF file is never seen half-written
+                pdf_data = pdf_document.write_pdf()
+                write_atomic(pdf_file, pdf_data)
+                checksums = {"pdf": data_checksum(pdf_data, checksum_algorithm)}
+                if txt_file is not None:
+                    checksums["txt"] = txt_toc(
+                        txt_file,
+                        request["toc_entries"],
+                        pdf_document.pages,
+                        request["toc_title"],
+                        checksum_algorithm,
+                    )
+                reply = {
+                    "pdf_file": request["pdf_file"],
+                    "checksums": checksums,
+                    "page_count": len(pdf_document.pages),
+                    "network_requests": resolver.network_requests if resolver is not None else 0,
+                }
+            except Exception as e:
+                logger.error("Failed to render {}: {}".format(request.get("pdf_file"), e))
+                reply = {"error": str(e) or type(e).__name__}
+            _send_message(conn, reply)
+        except (ConnectionError, OSError, ValueError) as e:
+            logger.warning("Dropped a connection: {}".format(e))
+        finally:
+            conn.close()
+
+
+def _spawn_worker(listener: socket.socket, output_roots: Sequence[Path]) -> int:
+    """
+    Fork a pre-warmed worker process.
+
+    :param listener: The listening socket shared by all the workers.
+    :param output_roots: The resolved directories the files are written under.
+    :return: The PID of the worker.
+    """
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            _serve_forever(listener, output_roots)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def run(socket_path: str, workers: int, output_roots: Sequence[str] = (".",)) -> None:
+    """
+    Start the render daemon and its worker processes, and supervise them until SIGTERM or SIGINT is received.
+
+    :param socket_path: The path of the Unix domain socket to listen on.
+    :param workers: The number of worker processes.
+    :param output_roots: The directories the PDF and TXT files may be written under, the requests writing files
+      elsewhere are rejected.
+    """
+    logger = get_logger("mkdocs-pdf-generate-daemon")
+    if not hasattr(socket, "AF_UNIX") or not hasattr(os, "fork"):
+        raise RenderDaemonException("The render daemon requires Unix domain sockets and os.fork().")
+
+    logger.info("Loading WeasyPrint and fonts...")
+    _warm_up()
+
+    roots = [Path(root).resolve() for root in output_roots]
+    listener = _listen(socket_path, max(workers * 4, 16))
+
+    children: List[int] = [_spawn_worker(listener, roots) for _ in range(workers)]
+    logger.info("Render daemon listening on {} with {} worker(s)".format(socket_path, workers))
+    logger.info("Writing the files under {}".format(", ".join(str(root) for root in roots)))
+
+    stopping = False
+
+    def stop(signum: int, frame: Optional[object]) -> None:
+        nonlocal stopping
+        stopping = True
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    try:
+        while children:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            if pid in children:
+                children.remove(pid)
+                if not stopping:
+                    # Replace crashed workers
+                    logger.warning("Worker {} exited, starting a new one".format(pid))
+                    children.append(_spawn_worker(listener, roots))
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        logger.info("Render daemon stopped")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m mkdocs_pdf_generate.daemon",
+        description="Run a long-lived WeasyPrint render daemon for mkdocs-pdf-generate.",
+    )
+    parser.add_argument("socket", help="path of the Unix domain socket to listen on")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes (default: CPUs)"
+    )
+    parser.add_argument(
+        "-o",
+        "--output-root",
+        action="append",
+        help="directory the PDF and TXT files may be written under, can be repeated (default: current directory)",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)-8s -  %(message)s")
+
+    try:
+        run(args.socket, max(args.workers, 1), args.output_root or ["."])
+    except RenderDaemonException as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from timeit import default_timer as timer
+from typing import TYPE_CHECKING, Dict, Optional
+from urllib.parse import urlsplit
+
+from .artifacts import write_atomic
+from .resources import read_fetch_result
+
+if TYPE_CHECKING:
+    from weasyprint.text.fonts import FontConfiguration
+
+# Extensions of the web font files
+_FONT_SUFFIXES = (".woff", ".woff2", ".ttf", ".otf", ".eot")
+
+
+def is_font_url(url: str) -> bool:
+    """
+    Check if a URL points to a font file.
+
+    :param url: The URL to check.
+    :return: True if the URL points to a font file, False otherwise.
+    """
+    return urlsplit(url).path.lower().endswith(_FONT_SUFFIXES)
+
+
+class FontLoader:
+    """
+    Load the fonts of all the PDF documents of a build.
+
+    It owns the WeasyPrint font configuration shared by every document, and is used as URL fetcher
+    to keep the downloaded web fonts in a persistent on-disk cache.
+    """
+
+    def __init__(self, cache_dir: Optional[Path], logger: logging.Logger):
+        """
+        Initialize the font loader.
+
+        :param cache_dir: The directory where the downloaded web fonts are kept. Web fonts are not cached if None.
+        :param logger: The logger of the plugin.
+        """
+        self.cache_dir = cache_dir
+        self._logger = logger
+        # Time spent loading fonts, in seconds
+        self.load_time = 0.0
+        self._font_config: Optional["FontConfiguration"] = None
+
+    @property
+    def font_config(self) -> "FontConfiguration":
+        """
+        Get the font configuration shared by all the documents, creating it on first use.
+
+        :return: The WeasyPrint font configuration.
+        """
+        if self._font_config is None:
+            from weasyprint.text.fonts import FontConfiguration
+
+            start = timer()
+            self._font_config = FontConfiguration()
+            self.load_time += timer() - start
+        return self._font_config
+
+    def fetch(self, url: str, *args, **kwargs) -> Dict:
+        """
+        Fetch an external resource for WeasyPrint. Web fonts are fetched from the font cache if possible.
+
+        :param url: The URL of the resource.
+        :return: The WeasyPrint URL fetcher result.
+        """
+        from weasyprint.urls import default_url_fetcher
+
+        if not is_font_url(url):
+            return default_url_fetcher(url, *args, **kwargs)
+
+        start = timer()
+        try:
+            return self._fetch_font(url, *args, **kwargs)
+        finally:
+            self.load_time += timer() - start
+
+    def _fetch_font(self, url: str, *args, **kwargs) -> Dict:
+        from weasyprint.urls import default_url_fetcher
+
+        if self.cache_dir is None or urlsplit(url).scheme not in ("http", "https"):
+            return default_url_fetcher(url, *args, **kwargs)
+
+        key = hashlib.sha256(url.encode("UTF-8")).hexdigest()
+        font_file = self.cache_dir.joinpath(key)
+        meta_file = self.cache_dir.joinpath(key + ".json")
+        if font_file.is_file() and meta_file.is_file():
+            result = json.loads(meta_file.read_text(encoding="UTF-8"))
+            result["string"] = font_file.read_bytes()
+            return result
+
+        result = default_url_fetcher(url, *args, **kwargs)
+        data = read_fetch_result(result)
+        meta = {key: result.get(key) for key in ("mime_type", "encoding", "redirected_url")}
+
+        # Write the font first and its metadata last, so a concurrent build never reads a partial entry
+        try:
+            write_atomic(font_file, data)
+            write_atomic(meta_file, json.dumps(meta).encode("UTF-8"))
+        except OSError as e:
+            # The font is still used, it is downloaded again by the next build
+            self._logger.warning("Could not add {} to the font cache: {}".format(url, e))
+        return dict(meta, string=data)
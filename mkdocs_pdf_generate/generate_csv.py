@@ -1,9 +1,8 @@
 import re
 from pathlib import Path, PosixPath, WindowsPath
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 
-from weasyprint import urls
-from simple_file_checksum import get_checksum
+from .checksums import file_checksum
 
 
 def rel_html_href(file_path: Union[Path, str], site_url: str) -> str:
@@ -17,6 +16,8 @@ def rel_html_href(file_path: Union[Path, str], site_url: str) -> str:
     :param site_url: The base URL of the website.
     :return: The relative HTML href for the file.
     """
+    from weasyprint import urls
+
     if isinstance(file_path, str):
         file_path = Path(file_path)
 
@@ -40,7 +41,14 @@ def rel_html_href(file_path: Union[Path, str], site_url: str) -> str:
     return urls.iri_to_uri(abs_html_href)
 
 
-def get_data(destination_path: Path, filename: str, pdf_meta: Dict, site_url: str) -> List[str]:
+def get_data(
+    destination_path: Path,
+    filename: str,
+    pdf_meta: Dict,
+    site_url: str,
+    checksums: Optional[Dict[str, str]] = None,
+    checksum_algorithm: str = "md5",
+) -> List[str]:
     """
     Get a list of file URLs and metadata for a given PDF file.
 
@@ -48,6 +56,9 @@ def get_data(destination_path: Path, filename: str, pdf_meta: Dict, site_url: st
     :param filename: The base filename (without extension) of the PDF file.
     :param pdf_meta: Metadata for the PDF file.
     :param site_url: The base URL of the website.
+    :param checksums: The checksums of the PDF and TXT files computed while they were written, by file type.
+      The missing checksums are computed from the files.
+    :param checksum_algorithm: The hash algorithm of the checksums.
     :return: A list containing metadata and URLs related to the PDF file.
     """
     pdf_file = destination_path.joinpath(f"{filename}.pdf")
@@ -57,8 +68,9 @@ def get_data(destination_path: Path, filename: str, pdf_meta: Dict, site_url: st
 
     title = pdf_meta.get("csv_name") or filename.split("_R_")[0]
     revision = "R_{}".format(filename.split("_R_")[1])
-    pdf_checksum = get_checksum(pdf_file, algorithm="MD5").upper()
-    txt_checksum = get_checksum(txt_file, algorithm="MD5").upper()
+    checksums = checksums or {}
+    pdf_checksum = checksums.get("pdf") or file_checksum(pdf_file, checksum_algorithm)
+    txt_checksum = checksums.get("txt") or file_checksum(txt_file, checksum_algorithm)
     doc_type = pdf_meta.get("type") or "Document"
 
     return [
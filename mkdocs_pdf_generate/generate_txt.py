@@ -1,8 +1,9 @@
-import re
+import os
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Sequence, Tuple
 
-from pypdf import PdfReader
+from .artifacts import write_atomic
+from .checksums import data_checksum
 
 
 class TXtTocFileException(Exception):
@@ -11,77 +12,53 @@ class TXtTocFileException(Exception):
     """
 
 
-def _make_pdf_txt_toc(destination_path: Path, filename: str, extra_data: Dict) -> str:
+def _make_txt_toc(toc_entries: Sequence[Tuple[str, str]], pages: List, toc_title: str) -> str:
     """
-    Generate table of contents (TOC) text from a PDF file.
+    Generate table of contents (TOC) text from the layout of a PDF document.
 
-    :param destination_path: The path where the TXT file will be stored.
-    :param filename: The base name of the TXT file.
-    :param extra_data: Additional data for TXT TOC generation.
+    :param toc_entries: The (anchor, text) tuples of the TOC links, in document order.
+    :param pages: The pages of the rendered weasyprint document.
+    :param toc_title: The title of the TOC.
     :return: Generated TOC text.
     """
-    separate_toc_text_n_pgnum = re.compile(r"^(\d+) (.+)$|^(\d+\.)+ (.+)$")
-    pdf_filename = destination_path.joinpath(f"{filename}.pdf")
-
-    pdf_reader: PdfReader = PdfReader(pdf_filename)
-
-    # Determine the TOC pages
-    toc_page_contents = ""
-    checker = ["", 0]
-    for pg_num, page in enumerate(pdf_reader.pages):
-        if extra_data.get("isCover", True) and pg_num == 0:
-            continue
-        page_content = page.extract_text().splitlines()
-        page_data = [
-            pg for pg in page_content if separate_toc_text_n_pgnum.search(pg) is not None and pg not in ["", "\n"]
-        ]
-
-        if checker[0] == page_data[0] or checker[0] == page_data[1]:
-            break
-        if checker[1] == 0:
-            toc_text = page_data[0].split(" ", maxsplit=1)
-            checker[0] = toc_text[1]
-            checker[1] = 1
-
-        toc_page_contents += "\n".join(page_data) + "\n"
-
-    # Prepare the TOC data for formatting (Page Title - Page Num)
-    toc_contents = toc_page_contents.splitlines()
-    toc_title = extra_data.get("tocTitle", "Table of Contents") + "\n"
-
-    # Group each item in the new_toc_content list into two separate lists
-    toc_item_text = []  # list of toc text
-    toc_item_pgnum = []  # list of toc pg_num
-
-    for item in toc_contents:
-        match_toc_text_n_pgnum = separate_toc_text_n_pgnum.search(item)
-        if match_toc_text_n_pgnum is not None:
-            match_toc_pgnum = match_toc_text_n_pgnum.group(1)
-            match_toc_text = match_toc_text_n_pgnum.group(2)
-
-            toc_item_pgnum.append(match_toc_pgnum)
-            toc_item_text.append(match_toc_text)
-
-    if len(toc_item_text) != len(toc_item_pgnum):
-        raise TXtTocFileException("Generating TXT toc file failed.")
-
-    # Format TOC text and construct the final TOC content
-    toc_items = [f"{toc_txt}\t{toc_pgnum}" for toc_txt, toc_pgnum in zip(toc_item_text, toc_item_pgnum)]
-    toc_items.insert(0, toc_title)
+    # Page number of each anchor, as shown in the TOC (`target-counter(attr(href), page)`)
+    anchor_pages: Dict[str, int] = {}
+    for pg_num, page in enumerate(pages, start=1):
+        for anchor in page.anchors:
+            anchor_pages.setdefault(anchor, pg_num)
+
+    # Format TOC text and construct the final TOC content (Page Title - Page Num)
+    toc_items = [f"{toc_txt}\t{anchor_pages[ref]}" for ref, toc_txt in toc_entries if ref in anchor_pages]
+    toc_items.insert(0, toc_title + "\n")
     return "\n".join(toc_items)
 
 
-def pdf_txt_toc(destination_path: Path, filename: str, extra_data: Dict) -> None:
+def txt_toc_content(toc_entries: Sequence[Tuple[str, str]], pages: List, toc_title: str) -> bytes:
     """
-    Generate a table of contents (TOC) tree from a PDF to a Text file.
+    Get the content of the Text file of the table of contents (TOC) of a rendered PDF document.
 
-    :param destination_path: The path where the TXT file will be stored.
-    :param filename: The base name of the TXT file.
-    :param extra_data: Additional data for TOC generation.
-    :return: None
+    :param toc_entries: The (anchor, text) tuples of the TOC links, in document order.
+    :param pages: The pages of the rendered weasyprint document.
+    :param toc_title: The title of the TOC.
+    :return: The content of the TXT file.
     """
+    txt_file_content: str = _make_txt_toc(toc_entries, pages, toc_title)
+    return txt_file_content.replace("\n", os.linesep).encode("UTF-8")
 
-    txt_file = destination_path.joinpath(f"{filename}.txt")
 
-    txt_file_content: str = _make_pdf_txt_toc(destination_path, filename, extra_data)
-    txt_file.write_text(txt_file_content, encoding="UTF-8")
+def txt_toc(
+    txt_file: Path, toc_entries: Sequence[Tuple[str, str]], pages: List, toc_title: str, checksum_algorithm: str
+) -> str:
+    """
+    Write the table of contents (TOC) of a rendered PDF document to a Text file, through a temporary file.
+
+    :param txt_file: The path of the TXT file.
+    :param toc_entries: The (anchor, text) tuples of the TOC links, in document order.
+    :param pages: The pages of the rendered weasyprint document.
+    :param toc_title: The title of the TOC.
+    :param checksum_algorithm: The hash algorithm of the TXT file checksum.
+    :return: The checksum of the TXT file.
+    """
+    data = txt_toc_content(toc_entries, pages, toc_title)
+    write_atomic(txt_file, data)
+    return data_checksum(data, checksum_algorithm)
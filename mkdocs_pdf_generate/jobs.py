@@ -0,0 +1,193 @@
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from . import generate_csv
+
+
+class RenderJob(NamedTuple):
+    """
+    A snapshot of everything needed to build the PDF document of a single page.
+
+    The snapshot only holds plain values, so it can be sent to a worker process.
+    """
+
+    src_path: Path
+    dest_path: Path
+    file_name: str
+    content: str
+    base_url: str
+    pdf_meta: Dict
+    site_url: str
+    body_title: Optional[str]
+
+    @property
+    def pdf_file(self) -> str:
+        return self.file_name + ".pdf"
+
+
+class RenderResult(NamedTuple):
+    """
+    The outcome of building the PDF document of a single page.
+    """
+
+    src_path: Path
+    pdf_file: str
+    txt_generated: bool = False
+    csv_data: Optional[List[str]] = None
+    error: Optional[str] = None
+    cached: bool = False
+    font_time: float = 0.0
+    # Resources served from the resource cache, fetched, and bytes not fetched again
+    fetch_hits: int = 0
+    fetch_misses: int = 0
+    bytes_saved: int = 0
+    # Resources requested from the network instead of read from the local files
+    network_requests: int = 0
+    # Time spent in each stage, in seconds, page count (unknown if restored from cache) and sizes of the files
+    stage_times: Optional[Dict[str, float]] = None
+    page_count: Optional[int] = None
+    pdf_size: int = 0
+    txt_size: int = 0
+
+
+class ChapterJob(NamedTuple):
+    """
+    A snapshot of everything needed to lay out a chapter of the combined PDF document.
+
+    Chapter 0 is the front matter (cover page and site-wide TOC), the other chapters are the pages of the
+    navigation, numbered from 1.
+    """
+
+    index: int
+    page: RenderJob
+    url: str
+    # Chapter index of each page, by normalized URL (see `combined.page_key`)
+    link_map: Dict[str, int]
+    # Number of pages before the chapter, and in the whole document
+    page_offset: int = 0
+    total_pages: Optional[int] = None
+    # The PDF file to write, if any
+    pdf_file: Optional[str] = None
+    # The (anchor, text, level, page number) tuples of the site-wide TOC, for the front matter
+    site_toc: Optional[List[Tuple[str, str, int, int]]] = None
+
+
+class ChapterLayout(NamedTuple):
+    """
+    The outcome of laying out a chapter of the combined PDF document.
+    """
+
+    index: int
+    page_count: int = 0
+    # The (anchor, text, level) tuples of the headings listed in the site-wide TOC
+    headings: Optional[List[Tuple[str, str, int]]] = None
+    # The page index of each heading anchor in the chapter
+    anchors: Optional[Dict[str, int]] = None
+    error: Optional[str] = None
+
+
+def build_document(renderer, job: RenderJob, soup: Optional[BeautifulSoup] = None) -> RenderResult:
+    """
+    Build the PDF document (and the TXT TOC file and CSV data, if needed) of a page.
+
+    :param renderer: The :class:`~mkdocs_pdf_generate.renderer.Renderer` used to build the PDF.
+    :param job: The page snapshot to build.
+    :param soup: The already parsed page content, if available. It is modified by the renderer.
+    :return: The result of the build.
+    """
+    options = renderer.options
+    logger = renderer.logger
+
+    # Restore the per-page options captured in the snapshot
+    options.site_url = job.site_url
+    options.md_src_path = job.src_path
+    options.out_dest_path = job.dest_path
+    options.body_title = job.body_title
+
+    dest_path = job.dest_path
+    file_name = job.file_name
+    pdf_file = job.pdf_file
+
+    # Generate TXT TOC if needed, from the layout of the PDF document
+    generate_txt_document = str(job.pdf_meta.get("toc_txt")).lower() == "true"
+    if generate_txt_document and not (options.toc and options.toc_ordering):
+        logger.warning("⚠️ You must set both `toc` and `toc_numbering` to `true` to generate TXT table of contents")
+        generate_txt_document = False
+
+    renderer.timer.reset()
+    renderer.page_count = None
+    renderer.file_sizes = {}
+    font_time = renderer.fonts.load_time
+    resources = renderer.resources
+    fetch_hits, fetch_misses, bytes_saved = resources.hits, resources.misses, resources.bytes_saved
+    network_requests = renderer.resolver.network_requests
+    cache = renderer.cache
+    cache_key = checksums = None
+    if cache is not None:
+        with renderer.timer.stage("cache"):
+            cache_key = cache.key(job)
+            checksums = cache.restore(cache_key, dest_path, file_name)
+    cached = checksums is not None
+    if cached:
+        logger.info("✅ {} file restored from cache".format(pdf_file))
+    else:
+        if generate_txt_document:
+            logger.info(f"Generating TXT TOC: {file_name}.txt, from {file_name}.pdf table of contents")
+
+        def written() -> None:
+            # The files are written in the background, they are reported and copied to the cache once written
+            logger.info("✅ {} file generated".format(pdf_file))
+            if generate_txt_document:
+                logger.info(f"✅ {file_name}.txt TOC file generated")
+            if cache_key is not None:
+                cache.store(cache_key, dest_path, file_name, with_txt=generate_txt_document)
+
+        checksums = renderer.write_pdf(
+            soup if soup is not None else job.content,
+            job.base_url,
+            dest_path.joinpath(pdf_file),
+            pdf_metadata=job.pdf_meta,
+            txt_filename=dest_path.joinpath(f"{file_name}.txt") if generate_txt_document else None,
+            on_written=written,
+        )
+
+    csv_data = None
+    # Gather CSV file data, using the checksums computed while writing the files
+    if generate_txt_document and options.enable_csv:
+        with renderer.timer.stage("csv"):
+            csv_data = generate_csv.get_data(
+                dest_path, file_name, job.pdf_meta, job.site_url, checksums, options.checksum_algorithm
+            )
+
+    return RenderResult(
+        job.src_path,
+        pdf_file,
+        txt_generated=generate_txt_document,
+        csv_data=csv_data,
+        cached=cached,
+        font_time=renderer.fonts.load_time - font_time,
+        fetch_hits=resources.hits - fetch_hits,
+        fetch_misses=resources.misses - fetch_misses,
+        bytes_saved=resources.bytes_saved - bytes_saved,
+        network_requests=renderer.resolver.network_requests - network_requests,
+        stage_times=renderer.timer.reset(),
+        page_count=renderer.page_count,
+        pdf_size=_file_size(renderer, "pdf", dest_path.joinpath(pdf_file)),
+        txt_size=_file_size(renderer, "txt", dest_path.joinpath(f"{file_name}.txt")) if generate_txt_document else 0,
+    )
+
+
+def _file_size(renderer, file_type: str, path: Path) -> int:
+    """
+    Get the size of a file of the converted document. The files written by the renderer may still be queued.
+
+    :param renderer: The renderer which converted the document.
+    :param file_type: The file type ("pdf" or "txt").
+    :param path: The path of the file, used if it was not written by the renderer (restored from cache, or
+      written by the render daemon).
+    :return: The size of the file in bytes.
+    """
+    size = renderer.file_sizes.get(file_type)
+    return size if size is not None else path.stat().st_size
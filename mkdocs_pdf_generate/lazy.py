@@ -0,0 +1,212 @@
+"""
+On-demand conversion of the PDF documents while `mkdocs serve` runs (the `serve_lazy` option).
+
+The builds only record the documents to convert. A document is converted the first time its PDF (or TXT) file
+is requested from the development server, or by a background thread when the server is idle.
+"""
+
+import logging
+import os
+import posixpath
+import threading
+from timeit import default_timer as timer
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+from .jobs import RenderJob, build_document
+
+# Seconds the background thread waits after a build before converting documents, so the pages reloaded by the
+# browsers are served first
+BACKGROUND_DELAY = 2.0
+# Seconds a request waits for the ongoing build, before the file is served as it is (e.g. a TXT file which is not
+# the TOC of a document)
+BUILD_TIMEOUT = 30.0
+
+
+class LazyRenderer:
+    """
+    Convert the documents recorded by the last build when they are requested, one at a time. The documents
+    requested from the server go before the documents converted in the background.
+
+    The documents are converted in-process, with a renderer of their own, so a rebuild can start while a document
+    is being converted. The converted files are kept in the render cache, and restored from it after a rebuild
+    if the inputs of the page did not change.
+    """
+
+    def __init__(self, logger: logging.Logger, background: bool = True):
+        """
+        Initialize the lazy renderer. The background thread is started with the first published build.
+
+        :param logger: The logger of the plugin.
+        :param background: Whether the documents are also converted by a background thread when the server is idle.
+        """
+        self.logger = logger
+        self.background = background
+        self._cond = threading.Condition()
+        # Held while a document is converted, the renderer converts one document at a time
+        self._render_lock = threading.Lock()
+        self._building = False
+        self._closed = False
+        self._generation = 0
+        self._published_at = 0.0
+        # The documents of the last published build, restored if the next build fails
+        self._jobs: Sequence[RenderJob] = []
+        # The documents of the last build by path of their files, and the documents not converted yet by PDF path
+        self._documents: Dict[str, RenderJob] = {}
+        self._pending: Dict[str, RenderJob] = {}
+        # Number of requests waiting for a document
+        self._waiting = 0
+        self._make_renderer: Optional[Callable] = None
+        self._renderer = None
+        self._thread: Optional[threading.Thread] = None
+
+    def begin_build(self) -> None:
+        """
+        Stop converting the documents of the previous build, as the site directory is rebuilt. Waits for the
+        document being converted, if any.
+        """
+        with self._cond:
+            self._building = True
+            self._generation += 1
+            self._documents = {}
+            self._pending = {}
+        with self._render_lock:
+            if self._renderer is not None:
+                self._renderer.artifacts.close()
+                self._renderer = None
+
+    def publish(self, jobs: Sequence[RenderJob], make_renderer: Callable) -> None:
+        """
+        Record the documents of a build, once the site directory is built.
+
+        :param jobs: The page snapshots of the documents.
+        :param make_renderer: Create the :class:`~mkdocs_pdf_generate.renderer.Renderer` converting the documents
+          of the build, called on the first conversion.
+        """
+        documents = {}
+        for job in jobs:
+            documents[_file_key(job.dest_path.joinpath(job.pdf_file))] = job
+            if str(job.pdf_meta.get("toc_txt")).lower() == "true":
+                documents[_file_key(job.dest_path.joinpath(f"{job.file_name}.txt"))] = job
+        with self._cond:
+            self._jobs = jobs
+            self._documents = documents
+            self._pending = {_file_key(job.dest_path.joinpath(job.pdf_file)): job for job in jobs}
+            self._make_renderer = make_renderer
+            self._building = False
+            self._published_at = timer()
+            self._cond.notify_all()
+        if self.background and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="mkdocs-pdf-generate-lazy", daemon=True)
+            self._thread.start()
+
+    def cancel_build(self) -> None:
+        """
+        Record the documents of the previous build again, as the build failed. The documents converted before are
+        converted again, or restored from the render cache, as the site directory may have been cleaned.
+        """
+        with self._cond:
+            jobs, make_renderer = self._jobs, self._make_renderer
+            if make_renderer is None:
+                # No build was published, there are no documents to convert
+                self._building = False
+                self._cond.notify_all()
+                return
+        self.publish(jobs, make_renderer)
+
+    def convert(self, file_path: str) -> None:
+        """
+        Convert the document of a file, if it belongs to a document not converted yet. Waits for the ongoing
+        build, if any, for up to :data:`BUILD_TIMEOUT` seconds.
+
+        :param file_path: The absolute path of the requested file.
+        """
+        if not file_path.endswith((".pdf", ".txt")):
+            return
+        key = _file_key(file_path)
+        with self._cond:
+            if not self._cond.wait_for(lambda: not self._building or self._closed, timeout=BUILD_TIMEOUT):
+                return
+            job = self._documents.get(key)
+            if job is None:
+                return
+            pdf_key = _file_key(job.dest_path.joinpath(job.pdf_file))
+            if pdf_key not in self._pending:
+                return
+            generation = self._generation
+            self._waiting += 1
+        try:
+            self._convert(pdf_key, job, generation)
+        finally:
+            with self._cond:
+                self._waiting -= 1
+                self._cond.notify_all()
+
+    def wsgi_app(self, app: Callable, root: str, mount_path: str) -> Callable:
+        """
+        Wrap the WSGI application of the development server, to convert the requested documents before they are
+        served.
+
+        :param app: The WSGI application of the server.
+        :param root: The site directory served.
+        :param mount_path: The URL path the site is served from, with leading and trailing slashes.
+        :return: The wrapping WSGI application.
+        """
+
+        def serve(environ: Dict, start_response: Callable) -> Iterable[bytes]:
+            # Same path resolution as the MkDocs server
+            path = environ.get("PATH_INFO", "").encode("latin-1").decode("utf-8", "ignore")
+            if (path + "/").startswith(mount_path):
+                rel_file_path = posixpath.normpath("/" + path[len(mount_path) :]).lstrip("/")
+                self.convert(os.path.join(root, rel_file_path))
+            return app(environ, start_response)
+
+        return serve
+
+    def close(self) -> None:
+        """
+        Stop the background thread, and write the files of the converted documents.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._render_lock:
+            if self._renderer is not None:
+                self._renderer.artifacts.close()
+                self._renderer = None
+
+    def _convert(self, pdf_key: str, job: RenderJob, generation: int) -> None:
+        with self._render_lock:
+            with self._cond:
+                # Converted while waiting for the lock, or a rebuild started
+                if generation != self._generation or self._pending.pop(pdf_key, None) is None:
+                    return
+            if self._renderer is None:
+                self._renderer = self._make_renderer()
+            self.logger.info("Converting {} to {}".format(job.src_path, job.pdf_file))
+            try:
+                build_document(self._renderer, job)
+                # The files are served as soon as this returns
+                self._renderer.artifacts.flush()
+            except Exception as e:
+                self.logger.error("❌ Error converting {}. Reason: {}".format(job.src_path, e))
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    delay = self._published_at + BACKGROUND_DELAY - timer()
+                    if not self._building and not self._waiting and self._pending and delay <= 0:
+                        break
+                    self._cond.wait(timeout=delay if delay > 0 else None)
+                pdf_key, job = next(iter(self._pending.items()))
+                generation = self._generation
+            self._convert(pdf_key, job, generation)
+
+
+def _file_key(path) -> str:
+    return os.path.normcase(os.path.normpath(os.path.abspath(str(path))))
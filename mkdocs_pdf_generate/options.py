@@ -1,12 +1,13 @@
 import logging
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 from mkdocs.config import config_options
 from mkdocs.config.base import LegacyConfig
 from mkdocs.config.defaults import MkDocsConfig
 
 
+from .checksums import CHECKSUM_ALGORITHMS
 from .templates.filters.url import URLFilter
 from .templates.template import Template
 
@@ -20,6 +21,10 @@ class Options(object):
         ("enable_csv", config_options.Type(bool, default=False)),
         ("debug", config_options.Type(bool, default=False)),
         ("debug_target", config_options.Type(str, default="")),
+        ("debug_prettify", config_options.Type(bool, default=False)),
+        ("debug_gzip", config_options.Type(bool, default=False)),
+        ("profile", config_options.Type(bool, default=False)),
+        ("profile_memory", config_options.Type(bool, default=False)),
         ("enabled_if_env", config_options.Type(str)),
         ("theme_handler_path", config_options.Type(str)),
         ("author", config_options.Type(str, default=None)),
@@ -36,6 +41,24 @@ class Options(object):
         ("toc_title", config_options.Type(str, default="Table of Contents")),
         ("toc_level", config_options.Type(int, default=4)),
         ("cover_images", config_options.Type(dict, default=None)),
+        ("parallel", config_options.Type(bool, default=False)),
+        ("parallel_workers", config_options.Type(int, default=None)),
+        ("cache", config_options.Type(bool, default=False)),
+        ("cache_dir", config_options.Type(str, default=".cache/plugin/pdf-generate")),
+        ("cache_max_size", config_options.Type(int, default=500)),
+        ("serve_incremental", config_options.Type(bool, default=False)),
+        ("serve_lazy", config_options.Type(bool, default=False)),
+        ("serve_lazy_background", config_options.Type(bool, default=True)),
+        ("render_daemon_socket", config_options.Type(str, default=None)),
+        ("font_cache_dir", config_options.Type(str, default=None)),
+        ("resource_cache_max_size", config_options.Type(int, default=128)),
+        ("checksum_algorithm", config_options.Choice(CHECKSUM_ALGORITHMS, default="md5")),
+        ("write_threads", config_options.Type(int, default=2)),
+        ("html_parser", config_options.Choice(("html.parser", "lxml"), default="html.parser")),
+        ("build_report", config_options.Type(bool, default=False)),
+        ("build_report_slowest", config_options.Type(int, default=5)),
+        ("combined", config_options.Type(bool, default=False)),
+        ("combined_output_path", config_options.Type(str, default="pdf/combined.pdf")),
     )
 
     def __init__(self, local_config: LegacyConfig, config: MkDocsConfig, logger: logging):
@@ -44,6 +67,34 @@ class Options(object):
         self.enable_csv = local_config["enable_csv"]
         self.debug = local_config["debug"]
         self.debug_target = None if len(local_config["debug_target"]) == 0 else local_config["debug_target"]
+        self.debug_prettify = local_config["debug_prettify"]
+        self.debug_gzip = local_config["debug_gzip"]
+        self.profile = local_config["profile"]
+        self.profile_memory = local_config["profile_memory"]
+        self.parallel = local_config["parallel"]
+        self.parallel_workers = local_config["parallel_workers"]
+        self.cache = local_config["cache"]
+        self._cache_dir = local_config["cache_dir"]
+        self.cache_max_size = local_config["cache_max_size"]
+        self.serve_incremental = local_config["serve_incremental"]
+        self.serve_lazy = local_config["serve_lazy"]
+        self.serve_lazy_background = local_config["serve_lazy_background"]
+        self.render_daemon_socket = local_config["render_daemon_socket"]
+        self._font_cache_dir = local_config["font_cache_dir"]
+        self.resource_cache_max_size = local_config["resource_cache_max_size"]
+        self.checksum_algorithm = local_config["checksum_algorithm"]
+        self.write_threads = local_config["write_threads"]
+        self.html_parser = local_config["html_parser"]
+        if self.html_parser == "lxml":
+            try:
+                import lxml  # noqa: F401
+            except ImportError:
+                logger.warning("⚠️ The lxml package is not installed, the html.parser HTML parser is used instead.")
+                self.html_parser = "html.parser"
+        self.build_report = local_config["build_report"]
+        self.build_report_slowest = local_config["build_report_slowest"]
+        self.combined = local_config["combined"]
+        self._combined_output_path = local_config["combined_output_path"]
         self._src_path = None
         self._dest_path = None
 
@@ -90,11 +141,14 @@ class Options(object):
             # Read from global config only if plugin config is not set
             self.theme_handler_path = config.get("theme_handler_path", None)
 
+        # Path resolution shared by the whole build, the resolved paths are memoized
+        self._url_filter = URLFilter(self, config)
+
         # Template handler(Jinja2 wrapper)
         self._template = Template(self, config)
 
         # Author Logo
-        logo_path_filter = URLFilter(self, config)
+        logo_path_filter = self._url_filter
         self.author_logo = local_config["author_logo"]
         if not self.author_logo:
             config_theme = config["theme"]
@@ -102,6 +156,13 @@ class Options(object):
         if isinstance(self.author_logo, str):
             self.author_logo = logo_path_filter(self.author_logo)
 
+        # Cover images by lowercase document type, resolved once per build
+        self._cover_image_urls: Optional[Dict[str, str]] = None
+        if self._cover_images is not None:
+            self._cover_image_urls = {
+                str(img_k).lower(): self._url_filter(pathname=str(img_v)) for img_k, img_v in self._cover_images.items()
+            }
+
         # for system
         self._logger = logger
 
@@ -153,6 +214,14 @@ class Options(object):
     def cover_images(self) -> Dict:
         return self._cover_images
 
+    @property
+    def cover_image_urls(self) -> Optional[Dict[str, str]]:
+        return self._cover_image_urls
+
+    @property
+    def url_filter(self) -> URLFilter:
+        return self._url_filter
+
     @property
     def logger(self) -> logging:
         return self._logger
@@ -178,9 +247,33 @@ class Options(object):
         self._dest_path = input_path
 
     def debug_dir(self) -> Path:
-        if self.debug:
+        if self.debug or self.profile:
             docs_src_dir = Path(self.user_config["config_file_path"]).parent.resolve()
             debug_folder_path = docs_src_dir.joinpath("pdf_html_debug")
             if not debug_folder_path.is_dir():
                 debug_folder_path.mkdir(parents=True, exist_ok=True)
             return debug_folder_path
+
+    def cache_dir(self) -> Path:
+        cache_folder_path = Path(self._cache_dir)
+        if not cache_folder_path.is_absolute():
+            docs_src_dir = Path(self.user_config["config_file_path"]).parent.resolve()
+            cache_folder_path = docs_src_dir.joinpath(cache_folder_path)
+        if not cache_folder_path.is_dir():
+            cache_folder_path.mkdir(parents=True, exist_ok=True)
+        return cache_folder_path
+
+    def font_cache_dir(self) -> Optional[Path]:
+        if not self._font_cache_dir:
+            return None
+        font_cache_folder_path = Path(self._font_cache_dir)
+        if not font_cache_folder_path.is_absolute():
+            docs_src_dir = Path(self.user_config["config_file_path"]).parent.resolve()
+            font_cache_folder_path = docs_src_dir.joinpath(font_cache_folder_path)
+        if not font_cache_folder_path.is_dir():
+            font_cache_folder_path.mkdir(parents=True, exist_ok=True)
+        return font_cache_folder_path
+
+    def combined_output_file(self) -> Path:
+        site_dir = Path(self.user_config["site_dir"])
+        return site_dir.joinpath(self._combined_output_path)
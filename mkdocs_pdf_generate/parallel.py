@@ -0,0 +1,185 @@
+import logging
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from mkdocs.config.defaults import MkDocsConfig
+
+from .jobs import ChapterJob, ChapterLayout, RenderJob, RenderResult, build_document
+from .logger import get_logger
+from .preprocessor.links import LinkMap
+
+# MkDocs configuration keys read by Options, Template and URLFilter.
+# Only these are sent to the worker processes, as the full configuration holds unpicklable plugin instances.
+_CONFIG_KEYS = (
+    "config_file_path",
+    "copyright",
+    "dev_addr",
+    "docs_dir",
+    "extra",
+    "site_author",
+    "site_dir",
+    "site_name",
+    "site_url",
+    "strict",
+    "theme",
+)
+
+# Renderer of the current worker process (set by `_init_worker`)
+_worker_renderer = None
+
+
+def config_snapshot(config: MkDocsConfig) -> Dict:
+    """
+    Copy the parts of the MkDocs configuration the plugin needs into a plain (picklable) dictionary.
+
+    :param config: The MkDocs configuration.
+    :return: A dictionary holding a subset of the MkDocs configuration.
+    """
+    snapshot = {key: config[key] for key in _CONFIG_KEYS if key in config}
+    theme_handler_path = config.get("theme_handler_path", None)
+    if theme_handler_path:
+        snapshot["theme_handler_path"] = theme_handler_path
+    return snapshot
+
+
+def _init_worker(
+    plugin_config: Dict, config: Dict, cache_dir: Optional[Path], link_map: Optional[LinkMap] = None
+) -> None:
+    """
+    Create the renderer used by a worker process.
+
+    :param plugin_config: The plugin configuration.
+    :param config: A snapshot of the MkDocs configuration (see :func:`config_snapshot`).
+    :param cache_dir: The render cache directory passed to the renderer.
+    :param link_map: The URLs of the files of the site, used to rewrite the links between pages.
+    """
+    global _worker_renderer
+
+    from weasyprint.logger import LOGGER
+
+    from .options import Options
+    from .renderer import Renderer
+
+    logger = get_logger("mkdocs-pdf-generate")
+    options = Options(plugin_config, config, logger)
+    if options.verbose:
+        LOGGER.setLevel(logging.DEBUG)
+        logger.setLevel(logging.DEBUG)
+    else:
+        # Progress is reported by the main process, in submission order
+        LOGGER.setLevel(logging.ERROR)
+        logger.setLevel(logging.WARNING)
+
+    _worker_renderer = Renderer(options=options, cache_dir=cache_dir)
+    _worker_renderer.link_map = link_map
+    # Write the files still queued when the pool is shut down, before the worker process exits
+    Finalize(_worker_renderer, _worker_renderer.artifacts.close, exitpriority=10)
+
+
+def _run_job(job: RenderJob) -> RenderResult:
+    """
+    Build a PDF document inside a worker process.
+
+    :param job: The page snapshot to build.
+    :return: The result of the build. Errors are returned instead of raised.
+    """
+    artifacts = _worker_renderer.artifacts
+    errors = artifacts.errors
+    try:
+        result = build_document(_worker_renderer, job)
+        # The files are written before the result is reported, so the write errors are reported with it
+        artifacts.flush()
+    except Exception as e:
+        return RenderResult(job.src_path, job.pdf_file, error=str(e))
+    if artifacts.errors > errors:
+        return RenderResult(job.src_path, job.pdf_file, error=artifacts.last_error)
+    return result
+
+
+def _run_chapter(chapter: ChapterJob) -> ChapterLayout:
+    """
+    Lay out a chapter of the combined PDF document inside a worker process.
+
+    :param chapter: The chapter to lay out.
+    :return: The layout of the chapter. Errors are returned instead of raised.
+    """
+    try:
+        return _worker_renderer.render_chapter(chapter)
+    except Exception as e:
+        return ChapterLayout(chapter.index, error=str(e))
+
+
+class RenderPool:
+    """
+    A pool of worker processes building PDF documents in parallel.
+    """
+
+    def __init__(
+        self,
+        plugin_config: Dict,
+        config: MkDocsConfig,
+        workers: Optional[int] = None,
+        cache_dir: Optional[Path] = None,
+        link_map: Optional[LinkMap] = None,
+    ):
+        """
+        Initialize the pool. Worker processes are started on the first submitted job.
+
+        :param plugin_config: The plugin configuration.
+        :param config: The MkDocs configuration.
+        :param workers: The number of worker processes. Defaults to the number of CPUs.
+        :param cache_dir: The render cache directory passed to the renderers (see :class:`Renderer`).
+        :param link_map: The URLs of the files of the site, sent once to each worker process.
+        """
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(dict(plugin_config), config_snapshot(config), cache_dir, link_map),
+        )
+        self._jobs: List[Tuple[RenderJob, Future]] = []
+
+    def submit(self, job: RenderJob) -> None:
+        """
+        Queue a page for conversion.
+
+        :param job: The page snapshot to build.
+        """
+        self._jobs.append((job, self._executor.submit(_run_job, job)))
+
+    def results(self) -> Iterator[RenderResult]:
+        """
+        Wait for the queued jobs and yield their results in submission order.
+
+        :return: An iterator of build results.
+        """
+        jobs, self._jobs = self._jobs, []
+        for job, future in jobs:
+            try:
+                yield future.result()
+            except Exception as e:
+                # The worker process itself failed (e.g. it was killed or the job could not be pickled)
+                yield RenderResult(job.src_path, job.pdf_file, error=str(e) or type(e).__name__)
+
+    def layout_chapters(self, chapters: List[ChapterJob]) -> List[ChapterLayout]:
+        """
+        Lay out the chapters of the combined PDF document, and wait for them.
+
+        :param chapters: The chapters to lay out.
+        :return: The layouts of the chapters, in the same order.
+        """
+        futures = [(chapter, self._executor.submit(_run_chapter, chapter)) for chapter in chapters]
+        layouts = []
+        for chapter, future in futures:
+            try:
+                layouts.append(future.result())
+            except Exception as e:
+                layouts.append(ChapterLayout(chapter.index, error=str(e) or type(e).__name__))
+        return layouts
+
+    def shutdown(self) -> None:
+        """
+        Stop the worker processes.
+        """
+        self._executor.shutdown(wait=True)
@@ -1,9 +1,11 @@
 import csv
 import logging
 import os
+import shutil
+import tempfile
 from pathlib import Path
 from timeit import default_timer as timer
-from typing import List, Union, Optional
+from typing import TYPE_CHECKING, Callable, Dict, List, Literal, Union, Optional
 
 from mkdocs.config.defaults import MkDocsConfig
 from mkdocs.plugins import BasePlugin
@@ -11,12 +13,18 @@ from mkdocs.structure.files import Files
 from mkdocs.structure.nav import Navigation
 from mkdocs.structure.pages import Page
 
-from . import generate_txt, generate_csv
 from .logger import get_logger
 from .options import Options
-from .renderer import Renderer
-from .templates.filters.url import URLFilter
-from .utils import get_pdf_metadata, extract_h1_title, secure_filename
+from .timings import REPORT_FILE_NAME, StageTimer, slowest, write_report
+
+if TYPE_CHECKING:
+    # The renderer, BeautifulSoup, WeasyPrint and pypdf are imported by the hooks, on the first page converted,
+    # so a disabled plugin does not load them
+    from mkdocs.livereload import LiveReloadServer
+
+    from .jobs import RenderJob, RenderResult
+    from .lazy import LazyRenderer
+    from .parallel import RenderPool
 
 
 class PDFPluginException(Exception):
@@ -45,12 +53,56 @@ class PdfGeneratePlugin(BasePlugin):
         self.txt_num_files = 0
         self.num_errors = 0
         self.total_time = 0
+        self.font_time = 0
         self.csv_build: List[List] = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.fetch_hits = 0
+        self.fetch_misses = 0
+        self.bytes_saved = 0
+        self.network_requests = 0
+        # Entries of the build report, and time spent in the stages of the page being processed
+        self.report_documents: List[Dict] = []
+        self._timer = StageTimer()
+        self._page_times: Dict[str, Dict[str, float]] = {}
+        self._pool: Optional["RenderPool"] = None
+        self._serve = False
+        self._serve_cache_dir: Optional[Path] = None
+        # Converts the documents on request when `serve_lazy` is enabled, and the documents recorded by the build
+        self._lazy: Optional["LazyRenderer"] = None
+        self._lazy_jobs: List["RenderJob"] = []
+
+    def on_startup(self, *, command: Literal["build", "gh-deploy", "serve"], dirty: bool) -> None:
+        """
+        Event handler when MkDocs starts. Defining it keeps the plugin instance alive across `mkdocs serve` rebuilds.
+        """
+        self._serve = command == "serve"
+
+    def on_shutdown(self) -> None:
+        """
+        Event handler when MkDocs exits.
+        """
+        if self._lazy is not None:
+            self._lazy.close()
+            self._lazy = None
+        if self._serve_cache_dir is not None:
+            shutil.rmtree(self._serve_cache_dir, ignore_errors=True)
+            self._serve_cache_dir = None
 
     def on_config(self, config: MkDocsConfig) -> Optional[MkDocsConfig]:
         """
         Event handler when the MkDocs configuration is being processed.
         """
+        # Reset the build counters, the plugin instance is reused across `mkdocs serve` rebuilds
+        self.pdf_num_files = self.txt_num_files = self.num_errors = 0
+        self.cache_hits = self.cache_misses = 0
+        self.fetch_hits = self.fetch_misses = self.bytes_saved = self.network_requests = 0
+        self.total_time = self.font_time = 0
+        self.csv_build = []
+        self.report_documents = []
+        self._page_times = {}
+        self._lazy_jobs = []
+
         if "enabled_if_env" in self.config:
             env_name = self.config["enabled_if_env"]
             if env_name:
@@ -65,11 +117,33 @@ class PdfGeneratePlugin(BasePlugin):
             self._logger.info("PDF debug option is enabled.")
         if self.config["debug_target"]:
             self._logger.info("Debug Target File: {}.".format(self.config["debug_target"]))
+        if self.config["profile"]:
+            self._logger.info("PDF profile option is enabled.")
 
         self._options = Options(self.config, config, self._logger)
-
-        from weasyprint.logger import LOGGER
-
+        self.combined = self._options.combined
+
+        lazy = self._serve and self._options.serve_lazy and not self.combined
+        if self._serve and (self._options.serve_incremental or lazy):
+            # Keep the PDF files of the previous rebuilds, so only the pages with changed inputs are converted again.
+            # They are kept in the persistent cache if enabled, and reused by the next runs of the server
+            if not self._options.cache and self._serve_cache_dir is None:
+                self._serve_cache_dir = Path(tempfile.mkdtemp(prefix="mkdocs_pdf_generate_"))
+                self._logger.info("PDF incremental regeneration is enabled.")
+        if lazy:
+            if self._lazy is None:
+                from .lazy import LazyRenderer
+
+                self._lazy = LazyRenderer(self._logger, background=self._options.serve_lazy_background)
+                self._logger.info("PDF documents are converted when requested from the server.")
+            # The site directory is rebuilt, the documents of the previous build can't be converted anymore
+            self._lazy.begin_build()
+        elif self._lazy is not None:
+            self._lazy.close()
+            self._lazy = None
+
+        # The WeasyPrint logger, configured without importing WeasyPrint
+        LOGGER = logging.getLogger("weasyprint")
         if self._options.verbose:
             LOGGER.setLevel(logging.DEBUG)
             self._logger.setLevel(logging.DEBUG)
@@ -79,8 +153,7 @@ class PdfGeneratePlugin(BasePlugin):
         handler = logging.StreamHandler()
         handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
         LOGGER.addHandler(handler)
-
-        self.renderer = Renderer(options=self._options)
+        # The renderer of the build is created in `on_nav`, once the files of the site are known
         return config
 
     def on_nav(self, nav: Navigation, config: MkDocsConfig, files: Files) -> Navigation:
@@ -90,9 +163,12 @@ class PdfGeneratePlugin(BasePlugin):
         if not self.enabled:
             return nav
 
+        from .preprocessor.links import LinkMap
         from .renderer import Renderer
 
-        self.renderer = Renderer(options=self._options)
+        self.renderer = Renderer(options=self._options, cache_dir=self._render_cache_dir)
+        # The links between pages are rewritten with the URLs of the files of the site, computed once per build
+        self.renderer.link_map = LinkMap(file.abs_dest_path for file in files)
 
         self.renderer.pages = [None] * len(nav.pages)
         for page in nav.pages:
@@ -107,6 +183,8 @@ class PdfGeneratePlugin(BasePlugin):
         if not self.enabled:
             return output_content
 
+        from .utils import get_pdf_metadata, extract_h1_title, secure_filename
+
         start = timer()
 
         # Since the MkDocs build is done on a local server, the `site_url` config variable is equal to
@@ -144,7 +222,7 @@ class PdfGeneratePlugin(BasePlugin):
 
         if self._options.debug and self._options.debug_target is not None:
             # Debugging only the debug target file
-            path_filter = URLFilter(self._options, self._options.user_config)
+            path_filter = self._options.url_filter
             debug_target_file = path_filter(pathname=str(self._options.debug_target))
             doc_src_path = path_filter(pathname=str(self._options.md_src_path))
             if doc_src_path == debug_target_file:
@@ -153,7 +231,17 @@ class PdfGeneratePlugin(BasePlugin):
                 build_pdf_document = False
 
         if build_pdf_document:
-            self._options.body_title = extract_h1_title(output_content, dict(page.meta))
+            from bs4 import BeautifulSoup
+
+            from .combined import combined_href
+            from .jobs import RenderJob, build_document
+            from .parallel import RenderPool
+
+            # Parse the page once, the soup is shared by the title extraction, the link injection and the renderer
+            self._timer.reset()
+            with self._timer.stage("parse"):
+                soup = BeautifulSoup(output_content, self._options.html_parser)
+            self._options.body_title = extract_h1_title(soup, dict(page.meta))
 
             file_name = pdf_meta.get("filename") or pdf_meta.get("title") or self._options.body_title or None
 
@@ -174,42 +262,59 @@ class PdfGeneratePlugin(BasePlugin):
             # Generate a secure filename
             file_name = secure_filename(file_name)
             base_url = dest_path.joinpath(file_name).as_uri()
-            pdf_file = file_name + ".pdf"
-
-            try:
-                self._logger.info("Converting {} to {}".format(src_path, pdf_file))
-                self.renderer.write_pdf(
-                    output_content,
-                    base_url,
-                    dest_path.joinpath(pdf_file),
-                    pdf_metadata=pdf_meta,
-                )
-                self._logger.info("✅ {} file generated".format(pdf_file))
-                # Generate TXT TOC if needed
-                generate_txt_document = str(pdf_meta.get("toc_txt")).lower() == "true"
-                if generate_txt_document:
-                    if self._options.toc and self._options.toc_ordering:
-                        self._logger.info(
-                            f"Generating TXT TOC: {file_name}.txt, from {file_name}.pdf table of contents"
-                        )
-                        extra_data = dict(isCover=self._options.cover, tocTitle=self._options.toc_title)
-                        # Generate TOC_TXT file
-                        generate_txt.pdf_txt_toc(dest_path, file_name, extra_data)
-                        self._logger.info(f"✅ {file_name}.txt TOC file generated")
-                        # Gather CSV file data
-                        if self._options.enable_csv:
-                            csv_data = generate_csv.get_data(dest_path, file_name, pdf_meta, site_url)
-                            self.csv_build.append(csv_data)
-                        self.txt_num_files += 1
-                    else:
-                        self._logger.warning(
-                            "⚠️ You must set both `toc` and `toc_numbering` to `true` to generate TXT table of contents"
-                        )
-                output_content = self.renderer.add_link(output_content, pdf_file)
-                self.pdf_num_files += 1
-            except Exception as e:
-                self.num_errors += 1
-                raise PDFPluginException("❌ Error converting {}. Reason: {}".format(src_path, e))
+
+            job = RenderJob(
+                src_path=src_path,
+                dest_path=dest_path,
+                file_name=file_name,
+                content=output_content,
+                base_url=base_url,
+                pdf_meta=pdf_meta,
+                site_url=site_url,
+                body_title=self._options.body_title,
+            )
+
+            if self.combined:
+                # The page is rendered as a chapter of the combined document in `on_post_build`
+                output_file = self._options.combined_output_file()
+                page_content = self.renderer.add_link(output_content, combined_href(output_file, dest_path), soup=soup)
+                if page.file.url in self.renderer.page_order:
+                    self.renderer.pages[self.renderer.page_order.index(page.file.url)] = job
+                else:
+                    self._logger.info("⏩ Skipped: {} is not in the navigation".format(src_path))
+                end = timer()
+                self.total_time += end - start
+                return page_content
+
+            # Add the download link before rendering, as the renderer modifies the soup
+            with self._timer.stage("download_link"):
+                page_content = self.renderer.add_link(output_content, job.pdf_file, soup=soup)
+            self._page_times[str(src_path)] = self._timer.reset()
+
+            if self._lazy is not None:
+                # Converted when requested from the server, once the site is built
+                self._logger.info("Deferred conversion of {} to {}".format(src_path, job.pdf_file))
+                self._lazy_jobs.append(job)
+            elif self._options.parallel:
+                # Render in a worker process, the results are collected in `on_post_build`
+                if self._pool is None:
+                    self._pool = RenderPool(
+                        self.config,
+                        config,
+                        workers=self._options.parallel_workers,
+                        cache_dir=self._render_cache_dir,
+                        link_map=self.renderer.link_map,
+                    )
+                self._logger.info("Queued {} for conversion to {}".format(src_path, job.pdf_file))
+                self._pool.submit(job)
+            else:
+                try:
+                    self._logger.info("Converting {} to {}".format(src_path, job.pdf_file))
+                    self._collect_result(build_document(self.renderer, job, soup=soup))
+                except Exception as e:
+                    self.num_errors += 1
+                    raise PDFPluginException("❌ Error converting {}. Reason: {}".format(src_path, e))
+            output_content = page_content
         else:
             self._logger.info("⏩ Skipped: PDF conversion for {}".format(src_path))
 
@@ -224,8 +329,55 @@ class PdfGeneratePlugin(BasePlugin):
         if not self.enabled:
             return
 
+        if self.combined:
+            self._build_combined()
+
+        # Number of pages whose PDF document could not be converted or written, the build fails as for the pages
+        # converted in `on_post_page`
+        failed = 0
+        if self._pool is not None:
+            # Wait for the worker processes, and report the results in submission order
+            start = timer()
+            for result in self._pool.results():
+                if result.error is not None:
+                    self.num_errors += 1
+                    failed += 1
+                    self._logger.error("❌ Error converting {}. Reason: {}".format(result.src_path, result.error))
+                else:
+                    status = "restored from cache" if result.cached else "generated"
+                    self._logger.info("✅ {} file {}".format(result.pdf_file, status))
+                    self._collect_result(result)
+            self._pool.shutdown()
+            self._pool = None
+            self.total_time += timer() - start
+        # Wait for the files written in the background, before they are listed in the CSV file
+        self.renderer.artifacts.close()
+        self.num_errors += self.renderer.artifacts.errors
+        failed += self.renderer.artifacts.errors
+        if self._lazy is not None:
+            self._lazy.publish(self._lazy_jobs, self._lazy_renderer_factory(config))
+            self._logger.info("🔸 {} PDF document(s) will be converted when requested".format(len(self._lazy_jobs)))
+
         self._logger.info("🔸 Converting {} file(s) to PDF took {:.1f}s".format(self.pdf_num_files, self.total_time))
+        self._logger.info("🔸 Loading fonts took {:.1f}s".format(self.font_time))
+        if self.fetch_hits + self.fetch_misses:
+            self._logger.info(
+                "🔸 Resource cache: {} hit(s), {} miss(es) ({:.0%} hit rate), {:.1f} MB not fetched again".format(
+                    self.fetch_hits,
+                    self.fetch_misses,
+                    self.fetch_hits / (self.fetch_hits + self.fetch_misses),
+                    self.bytes_saved / (1024 * 1024),
+                )
+            )
+        self._logger.info("🔸 Fetched {} resource(s) from the network".format(self.network_requests))
         self._logger.info("🔸 Converted {} PDF document's TOC to TXT".format(self.txt_num_files))
+        if self.renderer.cache is not None:
+            evicted = self.renderer.cache.prune()
+            self._logger.info(
+                "🔸 Render cache: {} hit(s), {} miss(es), {} evicted entry(s)".format(
+                    self.cache_hits, self.cache_misses, evicted
+                )
+            )
 
         def csv_generate(data: List[List]) -> int:
             rows: List[List] = data
@@ -242,5 +394,169 @@ class PdfGeneratePlugin(BasePlugin):
         if self._options.enable_csv:
             csv_entry = csv_generate(self.csv_build)
             self._logger.info("🔸 Generated '4Dversions.csv' file from {} entry(s)".format(csv_entry))
+        if self._options.build_report:
+            self._write_build_report(config)
         if self.num_errors > 0:
             self._logger.error("❌{} conversion errors occurred (see above)".format(self.num_errors))
+        if failed:
+            raise PDFPluginException("❌ {} PDF document(s) could not be converted (see above)".format(failed))
+
+    def on_build_error(self, *, error: Exception) -> None:
+        """
+        Event handler when the MkDocs build fails.
+        """
+        if self._lazy is not None:
+            # The requests wait for the build, the documents of the previous build are converted instead
+            self._lazy.cancel_build()
+
+    def on_serve(self, server: "LiveReloadServer", config: MkDocsConfig, builder: Callable) -> "LiveReloadServer":
+        """
+        Event handler when the development server starts.
+        """
+        if self._lazy is not None:
+            # Convert the requested documents before the server reads their files
+            server.set_app(self._lazy.wsgi_app(server.get_app(), server.root, server.mount_path))
+        return server
+
+    @property
+    def _render_cache_dir(self) -> Optional[Path]:
+        """
+        The directory of the render cache used while serving instead of the `cache_dir` option, if the persistent
+        cache is disabled.
+        """
+        return None if self._options.cache else self._serve_cache_dir
+
+    def _lazy_renderer_factory(self, config: MkDocsConfig) -> Callable:
+        """
+        Get a function creating the renderer of the documents converted on request. The renderer has its own
+        options, as the options of the plugin are changed by the next builds.
+
+        :param config: The MkDocs configuration of the build.
+        :return: A function returning a :class:`~mkdocs_pdf_generate.renderer.Renderer`.
+        """
+        plugin_config = self.config
+        link_map = self.renderer.link_map
+        cache_dir = self._render_cache_dir
+
+        def make_renderer():
+            from .renderer import Renderer
+
+            renderer = Renderer(options=Options(plugin_config, config, self._logger), cache_dir=cache_dir)
+            renderer.link_map = link_map
+            return renderer
+
+        return make_renderer
+
+    def _build_combined(self) -> None:
+        """
+        Build the combined PDF document from the pages of the navigation.
+        """
+        pages = [(url, job) for url, job in zip(self.renderer.page_order, self.renderer.pages) if job is not None]
+        if not pages:
+            return
+
+        from .combined import CombinedDocumentException, build_combined
+        from .parallel import RenderPool
+
+        start = timer()
+        output_file = self._options.combined_output_file()
+        if self._options.parallel:
+            # Lay out the chapters in worker processes, only the largest chapter is held in memory by each process
+            if self._pool is None:
+                self._pool = RenderPool(
+                    self.config,
+                    self._options.user_config,
+                    workers=self._options.parallel_workers,
+                    cache_dir=self._render_cache_dir,
+                    link_map=self.renderer.link_map,
+                )
+            render = self._pool.layout_chapters
+        else:
+
+            def render(chapters):
+                return [self.renderer.render_chapter(chapter) for chapter in chapters]
+
+        metadata = {"/Title": self._options.cover_title, "/Author": self._options.author}
+        self._logger.info("Converting {} page(s) to {}".format(len(pages), output_file))
+        try:
+            page_count = build_combined(
+                pages, output_file, render, metadata={key: value for key, value in metadata.items() if value}
+            )
+        except CombinedDocumentException as e:
+            self.num_errors += 1
+            self._logger.error("❌ Error converting the combined document. Reason: {}".format(e))
+        else:
+            self.pdf_num_files += 1
+            self._logger.info("✅ {} file generated ({} pages)".format(output_file, page_count))
+            combined_time = timer() - start
+            self.report_documents.append(
+                {
+                    "src_path": None,
+                    "pdf_file": str(output_file),
+                    "cached": False,
+                    "pages": page_count,
+                    "pdf_size": output_file.stat().st_size,
+                    "txt_size": 0,
+                    "time": round(combined_time, 6),
+                    "stages": {"combined": round(combined_time, 6)},
+                }
+            )
+        self.total_time += timer() - start
+
+    def _write_build_report(self, config: MkDocsConfig) -> None:
+        """
+        Write the build report to the site directory, and log the slowest documents.
+        """
+        report_file = Path(config["site_dir"]).joinpath(REPORT_FILE_NAME)
+        write_report(report_file, self.report_documents, self.total_time)
+        self._logger.info("🔸 Build report written to {}".format(report_file))
+
+        documents = slowest(self.report_documents, self._options.build_report_slowest)
+        if documents:
+            self._logger.info("🔸 Slowest {} PDF document(s):".format(len(documents)))
+        for entry in documents:
+            stages = sorted(entry["stages"].items(), key=lambda item: item[1], reverse=True)
+            self._logger.info(
+                "   {:.2f}s {} ({})".format(
+                    entry["time"],
+                    entry["src_path"] or entry["pdf_file"],
+                    ", ".join("{} {:.2f}s".format(name, seconds) for name, seconds in stages[:3]),
+                )
+            )
+
+    def _collect_result(self, result: "RenderResult") -> None:
+        """
+        Update the build counters and CSV data from the result of a PDF build.
+
+        :param result: The result of the PDF build.
+        """
+        self.pdf_num_files += 1
+        self.font_time += result.font_time
+        self.fetch_hits += result.fetch_hits
+        self.fetch_misses += result.fetch_misses
+        self.bytes_saved += result.bytes_saved
+        self.network_requests += result.network_requests
+        if result.cached:
+            self.cache_hits += 1
+        elif self.renderer.cache is not None:
+            self.cache_misses += 1
+        if result.txt_generated:
+            self.txt_num_files += 1
+        if result.csv_data is not None:
+            self.csv_build.append(result.csv_data)
+
+        stages = self._page_times.pop(str(result.src_path), {})
+        for name, seconds in (result.stage_times or {}).items():
+            stages[name] = stages.get(name, 0.0) + seconds
+        self.report_documents.append(
+            {
+                "src_path": str(result.src_path),
+                "pdf_file": result.pdf_file,
+                "cached": result.cached,
+                "pages": result.page_count,
+                "pdf_size": result.pdf_size,
+                "txt_size": result.txt_size,
+                "time": round(sum(stages.values()), 6),
+                "stages": {name: round(seconds, 6) for name, seconds in stages.items()},
+            }
+        )
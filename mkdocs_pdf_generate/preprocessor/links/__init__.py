@@ -1 +1 @@
-from .util import rel_html_href, replace_asset_hrefs  # noqa: F401
+from .util import LinkMap, rel_html_href, replace_asset_hrefs  # noqa: F401
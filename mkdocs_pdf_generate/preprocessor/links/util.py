@@ -1,10 +1,18 @@
 import os
+import posixpath
 import re
-from pathlib import Path, PosixPath, WindowsPath
+from pathlib import Path, PosixPath, PurePath, WindowsPath
+from typing import Dict, Iterable, Optional, Set
 from urllib.parse import urlsplit
 
 from bs4 import BeautifulSoup
-from weasyprint import urls
+
+_RELATIVE_LINK = re.compile(r"^\.{,2}?[\w\-.~$&+,/:;=?@%#*]*?$")
+_WEB_URL = re.compile(r"^(https://|http://)")
+_POSIX_SITE_DIR = re.compile(r"^(/tmp|tmp)/(mkdocs|pages)[\w\-]+|^[\w\-.~$&+,/:;=?@%#* \\]+[/\\]site")
+_WINDOWS_SITE_DIR = re.compile(r"^[\w\-:\\]+\\+(temp|Temp)\\+(mkdocs|pages)[\w\-]+|^[\w\-.~$&+,/:;=?@%#* \\]+[/\\]site")
+# Start of the query or fragment of an href
+_HREF_SUFFIX = re.compile(r"[?#]")
 
 
 # check if href is relative, if it is relative then it *should* be an HTML that generates a PDF doc
@@ -22,7 +30,7 @@ def is_doc_or_doc_subsection_link(href: str) -> bool:
     # html_file = ext.startswith(".html")  # Check if the extension is .html
 
     # Check if the href matches a relative link pattern
-    relative_link = re.search(r"^\.{,2}?[\w\-.~$&+,/:;=?@%#*]*?$", href)
+    relative_link = _RELATIVE_LINK.search(href)
     # Check if the path and fragment of the href are not empty
     doc_subsection_link = parsed_url.path and bool(parsed_url.fragment)
 
@@ -47,7 +55,7 @@ def rel_html_href(base_url: str, href: str, site_url: str) -> str:
 
     # Check if href is internal link or starts with "http://" or "https://"
     internal = href.startswith("#")
-    web_url = re.search(r"^(https://|http://)", href)
+    web_url = _WEB_URL.search(href)
     # Check if href is a document link
     is_document = is_doc_or_doc_subsection_link(href)
 
@@ -56,28 +64,33 @@ def rel_html_href(base_url: str, href: str, site_url: str) -> str:
         return href
 
     # Resolve relative URL using base_url and site_url
-    abs_html_href = Path(rel_url).joinpath(href).resolve()
-
-    if isinstance(abs_html_href, PosixPath):
-        abs_html_href = re.sub(
-            r"^(/tmp|tmp)/(mkdocs|pages)[\w\-]+|^[\w\-.~$&+,/:;=?@%#* \\]+[/\\]site",
-            site_url.rstrip("/"),
-            str(abs_html_href),
-        )
-    elif isinstance(abs_html_href, WindowsPath):
-        abs_html_href = re.sub(
-            r"^[\w\-:\\]+\\+(temp|Temp)\\+(mkdocs|pages)[\w\-]+|^[\w\-.~$&+,/:;=?@%#* \\]+[/\\]site",
-            site_url.rstrip("/"),
-            str(abs_html_href),
-        )
-        abs_html_href = abs_html_href.replace("\\", "/")
-
+    abs_html_href = site_href(Path(rel_url).joinpath(href).resolve(), site_url)
     if abs_html_href:
-        # Convert the resolved absolute URL to a valid URI
-        return urls.iri_to_uri(abs_html_href)
+        return abs_html_href
     return href
 
 
+def site_href(abs_path: PurePath, site_url: str) -> str:
+    """
+    Convert the absolute path of a file of the built site to its URL under the site URL.
+
+    :param abs_path: The resolved path of the file.
+    :param site_url: The root URL of the website.
+    :return: The URL of the file, as a valid URI.
+    """
+    abs_html_href = str(abs_path)
+    if isinstance(abs_path, PosixPath):
+        abs_html_href = _POSIX_SITE_DIR.sub(site_url.rstrip("/"), abs_html_href)
+    elif isinstance(abs_path, WindowsPath):
+        abs_html_href = _WINDOWS_SITE_DIR.sub(site_url.rstrip("/"), abs_html_href)
+        abs_html_href = abs_html_href.replace("\\", "/")
+
+    from weasyprint import urls
+
+    # Convert the resolved absolute URL to a valid URI
+    return urls.iri_to_uri(abs_html_href)
+
+
 def abs_asset_href(href: str, base_url: str) -> str:
     """
     Create an absolute URL for a given href based on the provided base URL.
@@ -93,6 +106,8 @@ def abs_asset_href(href: str, base_url: str) -> str:
     :return: The absolute URL.
     :rtype: str
     """
+    from weasyprint import urls
+
     if urls.url_is_absolute(href) or Path(href).is_absolute():
         return href
     return urls.iri_to_uri(urls.urljoin(base_url, href))
@@ -113,3 +128,79 @@ def replace_asset_hrefs(soup: BeautifulSoup, base_url: str) -> BeautifulSoup:
     for asset in soup.find_all(src=True):
         asset["src"] = abs_asset_href(asset["src"], base_url)
     return soup
+
+
+class LinkMap:
+    """
+    The URLs of the files of the built site, used to rewrite the links between pages with dictionary lookups
+    instead of resolving each link on the file system (see :func:`rel_html_href`).
+
+    It is built once per build from the MkDocs files. The links are normalized without the file system, and the URL
+    of each file of the site is computed once. The other links (e.g. to files outside of the site, or with `..`
+    before their query or fragment) fall back to :func:`rel_html_href`.
+    """
+
+    def __init__(self, dest_paths: Iterable[str]):
+        """
+        Initialize the link map.
+
+        :param dest_paths: The absolute destination paths of the files of the site. The directory of each
+          `index.html` file is added too, for the links with directory URLs.
+        """
+        self._targets: Set[str] = set()
+        self._site_url: Optional[str] = None
+        self._urls: Dict[str, str] = {}
+        if os.name != "posix":
+            # Only POSIX paths are normalized without the file system, the links are resolved by rel_html_href
+            return
+        for dest_path in dest_paths:
+            path = Path(dest_path)
+            targets = [path.parent, path] if path.name == "index.html" else [path]
+            # The targets have the form of the page directories in the base URLs (see `rel_html_href`)
+            self._targets.update(target.as_uri().replace("file://", "") for target in targets)
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def rel_html_href(self, base_url: str, href: str, site_url: str) -> str:
+        """
+        Resolve a relative HTML href to an absolute URL, like :func:`rel_html_href`.
+
+        :param base_url: The base URL of the current HTML file.
+        :param href: The relative or absolute href to be resolved.
+        :param site_url: The root URL of the website.
+        :return: The resolved absolute URL.
+        """
+        if href.startswith("#") or _WEB_URL.search(href) or not _RELATIVE_LINK.search(href):
+            return href
+
+        # `rel_html_href` resolves the query and fragment as part of the last path component
+        match = _HREF_SUFFIX.search(href)
+        path, suffix = (href[: match.start()], href[match.start() :]) if match else (href, "")
+        last_part = path.rsplit("/", 1)[-1]
+        if not suffix or (path and "/" not in suffix and last_part not in (".", "..")):
+            rel_url = os.path.dirname(base_url).replace("file://", "")
+            url = self._url(posixpath.normpath(posixpath.join(rel_url, path)), site_url)
+            if url is not None:
+                if not suffix:
+                    return url
+                from weasyprint import urls
+
+                # A suffix following a slash is a path component of its own
+                return url + ("/" if not last_part else "") + urls.iri_to_uri(suffix)
+        return rel_html_href(base_url, href, site_url)
+
+    def _url(self, target: str, site_url: str) -> Optional[str]:
+        """
+        Get the URL of a file of the site.
+
+        :param target: The normalized path of the file.
+        :param site_url: The root URL of the website.
+        :return: The URL of the file, or None if the path is not a file of the site.
+        """
+        if site_url != self._site_url:
+            self._site_url, self._urls = site_url, {}
+        url = self._urls.get(target)
+        if url is None and target in self._targets:
+            url = self._urls[target] = site_href(Path(target).resolve(), site_url)
+        return url
@@ -1,10 +1,10 @@
 import re
-from typing import Dict
+from typing import Dict, Optional
 
 from bs4 import BeautifulSoup
 
 from .content import restructure_tabbed_content
-from .links import rel_html_href, replace_asset_hrefs
+from .links import LinkMap, rel_html_href, replace_asset_hrefs
 from ..options import Options
 from ..utils import enable_legal_terms
 
@@ -25,11 +25,14 @@ from ..utils import enable_legal_terms
 #     return soup
 
 
-def get_separate(soup: BeautifulSoup, base_url: str, site_url: str) -> BeautifulSoup:
+def get_separate(
+    soup: BeautifulSoup, base_url: str, site_url: str, link_map: Optional[LinkMap] = None
+) -> BeautifulSoup:
     # transforms all relative hrefs pointing to other html docs
-    # into relative html hrefs
+    # into relative html hrefs, with the link map of the site if available
+    resolve = link_map.rel_html_href if link_map else rel_html_href
     for a in soup.find_all("a", href=True):
-        a["href"] = rel_html_href(base_url, a["href"], site_url)
+        a["href"] = resolve(base_url, a["href"], site_url)
 
     soup = replace_asset_hrefs(soup, base_url)
     soup = restructure_tabbed_content(soup)
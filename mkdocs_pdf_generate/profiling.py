@@ -0,0 +1,117 @@
+import cProfile
+import os
+import pstats
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Number of allocation sites written to the memory report
+MEMORY_TOP_COUNT = 25
+# Deepest call stack written to the collapsed stacks file
+_MAX_STACK_DEPTH = 256
+# Call stacks shorter than this time, in seconds, are dropped from the collapsed stacks file
+_MIN_STACK_TIME = 1e-5
+
+
+class DocumentProfiler:
+    """
+    Profile the conversion of a document with cProfile, and optionally its memory allocations with tracemalloc.
+
+    Used as a context manager, it writes next to the given file stem:
+
+    * ``<stem>.prof``: the cProfile statistics, to open with ``pstats``, snakeviz...
+    * ``<stem>.collapsed``: the collapsed call stacks, in microseconds, to open with ``flamegraph.pl`` or speedscope.
+    * ``<stem>.memory.txt``: the largest allocation sites, if the memory is profiled.
+    """
+
+    def __init__(self, file_stem: Path, memory: bool = False):
+        """
+        Initialize the profiler.
+
+        :param file_stem: The path of the profile files, without extension.
+        :param memory: Whether the memory allocations are traced too.
+        """
+        self.file_stem = file_stem
+        self.memory = memory
+        self._profile = cProfile.Profile()
+        self._started_tracemalloc = False
+
+    def __enter__(self) -> "DocumentProfiler":
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._profile.disable()
+        snapshot = tracemalloc.take_snapshot() if self.memory and tracemalloc.is_tracing() else None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        self.file_stem.parent.mkdir(parents=True, exist_ok=True)
+        self._profile.dump_stats(str(self._path(".prof")))
+        stats = pstats.Stats(self._profile)
+        lines = ["{} {}".format(stack, value) for stack, value in sorted(collapsed_stacks(stats).items())]
+        self._path(".collapsed").write_text("\n".join(lines) + "\n", encoding="UTF-8")
+        if snapshot is not None:
+            top_stats = snapshot.statistics("lineno")[:MEMORY_TOP_COUNT]
+            self._path(".memory.txt").write_text("\n".join(str(stat) for stat in top_stats) + "\n", encoding="UTF-8")
+
+    def _path(self, suffix: str) -> Path:
+        return self.file_stem.with_name(self.file_stem.name + suffix)
+
+
+def _label(func: Tuple[str, int, str]) -> str:
+    """
+    Format a function of the cProfile statistics as a frame of the collapsed stacks.
+
+    :param func: The (file name, line number, function name) of the function.
+    :return: The frame label, without semicolons.
+    """
+    file_name, line, name = func
+    if file_name == "~" and line == 0:
+        label = name  # Built-in function
+    else:
+        label = "{} ({}:{})".format(name, os.path.basename(file_name), line)
+    return label.replace(";", ",")
+
+
+def collapsed_stacks(stats: pstats.Stats) -> Dict[str, int]:
+    """
+    Rebuild the call stacks from the caller/callee statistics of cProfile, in the collapsed format of flamegraphs.
+
+    cProfile only records the time of each caller/callee pair, so the time of a function reached from several
+    call stacks is split between them in proportion to the time spent in each caller. Recursive calls are folded,
+    and the call stacks shorter than 10 µs are dropped.
+
+    :param stats: The cProfile statistics.
+    :return: The self time of each call stack (frames joined by semicolons), in microseconds.
+    """
+    entries = stats.stats  # type: ignore[attr-defined]
+    callees: Dict[Tuple, List[Tuple[Tuple, float]]] = defaultdict(list)
+    roots = []
+    for func, (_, _, _, _, callers) in entries.items():
+        if not callers:
+            roots.append(func)
+        for caller, (_, _, _, cumulative_time) in callers.items():
+            callees[caller].append((func, cumulative_time))
+
+    stacks: Dict[str, float] = defaultdict(float)
+
+    def walk(func: Tuple, time: float, path: Tuple[str, ...], seen: frozenset) -> None:
+        _, _, total_self_time, total_time, _ = entries[func]
+        share = min(time / total_time, 1.0) if total_time else 0.0
+        path = path + (_label(func),)
+        stacks[";".join(path)] += total_self_time * share
+        if len(path) >= _MAX_STACK_DEPTH:
+            return
+        seen = seen | {func}
+        for callee, callee_time in callees.get(func, ()):
+            if callee not in seen and callee_time * share >= _MIN_STACK_TIME:
+                walk(callee, callee_time * share, path, seen)
+
+    for root in roots:
+        walk(root, entries[root][3], (), frozenset())
+    return {stack: round(time * 1e6) for stack, time in stacks.items() if round(time * 1e6) > 0}
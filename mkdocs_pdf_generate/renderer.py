@@ -1,58 +1,196 @@
 import logging
 import re
 import sys
+from contextlib import nullcontext
 from importlib import import_module
 from importlib.util import module_from_spec, spec_from_file_location
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import TYPE_CHECKING, Callable, ContextManager, Dict, List, Optional, Tuple, Any, Union
 
 from bs4 import BeautifulSoup, Tag
-from weasyprint import HTML, document
 
-from . import cover, toc, __version__
+from . import combined, cover, generate_txt, toc, __version__
+from .cache import RenderCache
+from .artifacts import Artifact, ArtifactWriter
+from .checksums import data_checksum
+from .daemon import render_with_daemon
+from .fonts import FontLoader
+from .jobs import ChapterJob, ChapterLayout
 from .options import Options
+from .profiling import DocumentProfiler
+from .resources import ImageCache, LocalResolver, ResourceCache, image_cache_argument, resolver_settings
 from .preprocessor import get_content, get_separate as prep_separate
-from .styles import style_for_print
-from .templates.filters.url import URLFilter
+from .preprocessor.links import LinkMap
+from .styles import load_print_stylesheets, style_for_print
+from .timings import StageTimer
 from .themes import generic as generic_theme
 
+if TYPE_CHECKING:
+    from weasyprint import document
+
 
 class Renderer:
     """
     A class responsible for rendering Markdown content to PDF using weasyprint.
     """
 
-    def __init__(self, options: Options):
+    def __init__(self, options: Options, cache_dir: Optional[Path] = None):
         """
         Initialize the Renderer with the provided options.
 
         :param options: The options for rendering the PDF.
+        :param cache_dir: A directory used as render cache, even if the `cache` option is disabled.
         """
         self._options = options
 
         self.theme = self._load_theme_handler()
+        # The print stylesheets are read once per build (a new Renderer is created for each build)
+        self._theme_stylesheet = self.theme.get_stylesheet()
+        self._print_stylesheets = load_print_stylesheets(options)
+        # The font configuration and the web fonts are shared by all the documents of the build
+        self.fonts = FontLoader(options.font_cache_dir(), options.logger)
+        # The resources of the site are read from the local files, not requested from the server
+        self.resolver = LocalResolver(self.fonts.fetch, resolver_settings(options), options.logger)
+        # The fetched resources and the decoded images are shared by all the documents of the build
+        self.resources = ResourceCache(self.resolver.fetch, options.resource_cache_max_size * 1024 * 1024)
+        self._image_cache = ImageCache(options.resource_cache_max_size * 1024 * 1024)
+        self.cache = None
+        if options.cache or cache_dir is not None:
+            self.cache = RenderCache(options, self._theme_stylesheet, cache_dir=cache_dir)
         self.page_order = []
+        # The URLs of the files of the site, used to rewrite the links between pages (set from the MkDocs files)
+        self.link_map: Optional[LinkMap] = None
         self.pgnum = 0
+        # Number of pages of the combined document, shown in the page footers of its chapters
+        self.total_pages = None
         self.pages = []
+        # Time spent in each stage, and page count, of the document being converted
+        self.timer = StageTimer()
+        self.page_count: Optional[int] = None
+        # Sizes of the files of the document being converted, by file type ("pdf" and "txt"), if written by the renderer
+        self.file_sizes: Dict[str, int] = {}
+        self._daemon_warning_shown = False
+        # The PDF, TXT and debug HTML files are written in the background, while the next documents are laid out
+        self.artifacts = ArtifactWriter(options.logger, threads=options.write_threads)
 
     def write_pdf(
         self,
-        content: str,
+        content: Union[str, BeautifulSoup],
         base_url: str,
         filename: str,
         pdf_metadata: Dict,
-    ) -> None:
+        txt_filename: Optional[str] = None,
+        on_written: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, str]:
         """
         Render the Markdown content to PDF and write it to a file.
 
+        When the `render_daemon_socket` option is set and the render daemon is running,
+        the prepared HTML is rendered by the daemon instead of in-process. Otherwise, the files are written in the
+        background by :attr:`artifacts`, call its `flush` method to wait for them.
+
         :param content: The Markdown content to render.
         :param base_url: The base URL for resolving relative links.
         :param filename: The output filename for the PDF.
         :param pdf_metadata: Metadata for the PDF.
+        :param txt_filename: The output filename for the TXT table of contents, which is built from the layout of
+          the document. No TXT file is written if None.
+        :param on_written: Called once the files are written, on the I/O thread of :attr:`artifacts`.
+
+        :return: The checksums of the files by file type ("pdf" and "txt").
         """
-        self.render_doc(content, base_url, pdf_metadata=pdf_metadata).write_pdf(filename)
+        with self._profiler(base_url):
+            return self._write_pdf(content, base_url, filename, pdf_metadata, txt_filename, on_written)
+
+    def _write_pdf(
+        self,
+        content: Union[str, BeautifulSoup],
+        base_url: str,
+        filename: str,
+        pdf_metadata: Dict,
+        txt_filename: Optional[str],
+        on_written: Optional[Callable[[], None]],
+    ) -> Dict[str, str]:
+        self.file_sizes = {}
+        soup, headings = self._prepare_soup(content, base_url, pdf_metadata=pdf_metadata)
+        with self.timer.stage("serialize"):
+            html = str(soup)
+        self._write_debug_html(base_url, soup, html)
+        toc_entries = toc.get_toc_entries(headings, self._options) if txt_filename is not None else None
+        checksum_algorithm = self._options.checksum_algorithm
+
+        if self._options.render_daemon_socket:
+            # The daemon reads the resources of the site from the local files too
+            request = dict(checksum_algorithm=checksum_algorithm, resolver=resolver_settings(self._options))
+            if txt_filename is not None:
+                request.update(txt_file=str(txt_filename), toc_entries=toc_entries, toc_title=self._options.toc_title)
+            with self.timer.stage("daemon"):
+                reply = render_with_daemon(self._options.render_daemon_socket, html, str(filename), request)
+            if reply is not None:
+                self.page_count = reply.get("page_count")
+                self.resolver.network_requests += reply.get("network_requests", 0)
+                if on_written is not None:
+                    # The daemon has written the files
+                    self.artifacts.submit([], on_written)
+                return reply["checksums"]
+            if not self._daemon_warning_shown:
+                self.logger.warning(
+                    "⚠️ The render daemon is not running on {}, rendering in-process.".format(
+                        self._options.render_daemon_socket
+                    )
+                )
+                self._daemon_warning_shown = True
+
+        with self.timer.stage("layout"):
+            pdf_document = self._render_html(html)
+        self.page_count = len(pdf_document.pages)
+        with self.timer.stage("write"):
+            pdf_data = pdf_document.write_pdf()
+            checksums = {"pdf": data_checksum(pdf_data, checksum_algorithm)}
+        artifacts = [Artifact(Path(filename), pdf_data)]
+        self.file_sizes["pdf"] = len(pdf_data)
+        if txt_filename is not None:
+            with self.timer.stage("txt"):
+                txt_data = generate_txt.txt_toc_content(toc_entries, pdf_document.pages, self._options.toc_title)
+                checksums["txt"] = data_checksum(txt_data, checksum_algorithm)
+            artifacts.append(Artifact(Path(txt_filename), txt_data))
+            self.file_sizes["txt"] = len(txt_data)
+        self.artifacts.submit(artifacts, on_written)
+        return checksums
+
+    def render_chapter(self, chapter: ChapterJob) -> ChapterLayout:
+        """
+        Lay out a chapter of the combined PDF document, and write it to a PDF file if needed.
+
+        :param chapter: The chapter to lay out.
+        :return: The page count of the chapter and the pages of its headings.
+        """
+        job = chapter.page
+        self._options.site_url = job.site_url
+        self._options.md_src_path = job.src_path
+        self._options.out_dest_path = job.dest_path
+        self._options.body_title = job.body_title if chapter.index else None
+        self.pgnum = chapter.page_offset
+        self.total_pages = chapter.total_pages
+
+        pdf_metadata = job.pdf_meta if chapter.index else {}
+        soup, heading_index = self._prepare_soup(job.content, job.base_url, pdf_metadata=pdf_metadata, chapter=chapter)
+        headings = combined.get_chapter_headings(heading_index, chapter, self._options)
+        html = str(soup)
+        self._write_debug_html(job.base_url, soup, html)
+        pdf_document = self._render_html(html)
+        if chapter.pdf_file is not None:
+            pdf_document.write_pdf(chapter.pdf_file)
+
+        heading_anchors = {anchor for anchor, _, _ in headings}
+        anchors: Dict[str, int] = {}
+        for pg_num, page in enumerate(pdf_document.pages):
+            for anchor in page.anchors:
+                if anchor in heading_anchors:
+                    anchors.setdefault(anchor, pg_num)
+        return ChapterLayout(chapter.index, len(pdf_document.pages), headings=headings, anchors=anchors)
 
-    def render_doc(self, content: str, base_url: str, pdf_metadata: Dict) -> document.Document:
+    def render_doc(self, content: Union[str, BeautifulSoup], base_url: str, pdf_metadata: Dict) -> "document.Document":
         """
         Render the Markdown content to HTML and generate a PDF using weasyprint.
 
@@ -62,67 +200,170 @@ class Renderer:
 
         :return: A weasyprint :class:`document.Document` object.
         """
-        soup = BeautifulSoup(content, "html.parser")
-        pdf_generator = soup.find("meta", attrs={"name": "generator"})
-        pdf_generator["content"] = f"mkdocs-pdf-generate-{__version__}, " + pdf_generator["content"]
-        soup = get_content(soup, self._options, pdf_metadata)
-        self.inject_pgnum(soup)
+        with self._profiler(base_url):
+            return self._render_html(self.prepare_html(content, base_url, pdf_metadata=pdf_metadata))
 
-        style_tags: list[Tag] = style_for_print(self._options, pdf_metadata)
-        style_tags[0].append(self.theme.get_stylesheet())  # Add theme CSS
+    def _render_html(self, html: str) -> "document.Document":
+        """
+        Lay out prepared HTML with the font configuration shared by the build.
+        WeasyPrint is imported on the first document rendered.
 
-        for style_tag in style_tags:
-            soup.head.append(style_tag)
+        :param html: The prepared HTML.
+        :return: A weasyprint :class:`document.Document` object.
+        """
+        from weasyprint import HTML
+
+        self._image_cache.trim()
+        return HTML(string=html, url_fetcher=self.resources.fetch).render(
+            font_config=self.fonts.font_config, **{image_cache_argument(): self._image_cache}
+        )
 
-        soup = prep_separate(soup, base_url, self._options.site_url)
-        toc.make_toc(soup, self._options)
-        cover.make_cover(soup, self._options, pdf_metadata=pdf_metadata)
+    def prepare_html(self, content: Union[str, BeautifulSoup], base_url: str, pdf_metadata: Dict) -> str:
+        """
+        Prepare the HTML of a page for printing: extract the content, add the styles, the TOC and the cover page.
+
+        :param content: The Markdown content to render, as a string or an already parsed BeautifulSoup object
+          (which is modified in-place).
+        :param base_url: The base URL for resolving relative links.
+        :param pdf_metadata: Metadata for the PDF.
 
-        # Enable Debugging
+        :return: The HTML passed to weasyprint.
+        """
+        soup, _ = self._prepare_soup(content, base_url, pdf_metadata=pdf_metadata)
+        html = str(soup)
+        self._write_debug_html(base_url, soup, html)
+        return html
+
+    def _prepare_soup(
+        self,
+        content: Union[str, BeautifulSoup],
+        base_url: str,
+        pdf_metadata: Dict,
+        chapter: Optional[ChapterJob] = None,
+    ) -> Tuple[BeautifulSoup, List[toc.Heading]]:
+        """
+        Prepare the DOM of a page for printing, see :meth:`prepare_html`.
+
+        :param content: The Markdown content to render, as a string or an already parsed BeautifulSoup object
+          (which is modified in-place).
+        :param base_url: The base URL for resolving relative links.
+        :param pdf_metadata: Metadata for the PDF.
+        :param chapter: The chapter of the combined PDF document prepared from the page, if any.
+
+        :return: The prepared BeautifulSoup object, and the index of its headings (empty for the front matter
+          of the combined PDF document).
+        """
+        soup = content
+        if isinstance(soup, str):
+            with self.timer.stage("parse"):
+                soup = BeautifulSoup(soup, self._options.html_parser)
+        with self.timer.stage("content"):
+            pdf_generator = soup.find("meta", attrs={"name": "generator"})
+            pdf_generator["content"] = f"mkdocs-pdf-generate-{__version__}, " + pdf_generator["content"]
+            soup = get_content(soup, self._options, pdf_metadata)
+            self.inject_pgnum(soup)
+
+        with self.timer.stage("styles"):
+            style_tags: list[Tag] = style_for_print(self._options, pdf_metadata, self._print_stylesheets)
+            style_tags[0].append(self._theme_stylesheet)  # Add theme CSS
+
+            for style_tag in style_tags:
+                soup.head.append(style_tag)
+
+        with self.timer.stage("links"):
+            soup = prep_separate(soup, base_url, self._options.site_url, link_map=self.link_map)
+        if chapter is None:
+            with self.timer.stage("toc"):
+                headings = toc.index_headings(soup, self._options)
+                toc.make_toc(soup, self._options, headings)
+            with self.timer.stage("cover"):
+                cover.make_cover(soup, self._options, pdf_metadata=pdf_metadata, headings=headings)
+        elif chapter.index == 0:
+            # Front matter of the combined document
+            combined.make_site_toc(soup, self._options, chapter.site_toc)
+            headings = []
+            cover.make_cover(soup, self._options, pdf_metadata=pdf_metadata, headings=headings)
+        else:
+            headings = toc.index_headings(soup, self._options)
+            combined.prepare_chapter(soup, chapter, self._options, headings)
+
+        return soup, headings
+
+    def _write_debug_html(self, base_url: str, soup: BeautifulSoup, html: str) -> None:
+        """
+        Write the HTML of the document to the `pdf_html_debug` folder, if the debug mode is enabled.
+        The file is written in the background.
+
+        :param base_url: The base URL of the document.
+        :param soup: The prepared BeautifulSoup object, prettified if the `debug_prettify` option is enabled.
+        :param html: The serialized HTML passed to weasyprint.
+        """
+        if self._options.debug and self._is_debug_target():
+            content = soup.prettify() if self._options.debug_prettify else html
+            extension = ".html.gz" if self._options.debug_gzip else ".html"
+            self.artifacts.write(Path(self._debug_file(base_url) + extension), content, self._options.debug_gzip)
+
+    def _is_debug_target(self) -> bool:
+        """
+        Check if the page being converted is the `debug_target` document. Every page is a target if it is not set.
+
+        :return: True if the page is debugged (or profiled).
+        """
+        if self._options.debug_target is None:
+            return True
+        path_filter = self._options.url_filter
+        debug_target_file = path_filter(pathname=str(self._options.debug_target))
+        doc_src_path = path_filter(pathname=str(self._options.md_src_path))
+        return doc_src_path == debug_target_file
+
+    def _debug_file(self, base_url: str) -> str:
+        """
+        Get the path of the debug files of a page, in the `pdf_html_debug` folder.
+
+        :param base_url: The base URL of the page.
+        :return: The path of the debug files, without extension.
+        """
         site_dir = self._options.user_config["site_dir"].replace("\\", "/").split("/")[-1]
         not_as_uri = re.compile(r"^file:/{,3}")
         pattern = r"^[\w\-.~$&+,/:;=?@%#* \\]+[/\\]" + site_dir
         check_site_dir = re.compile(pattern)
-        if self._options.debug and self._options.debug_target is not None:
-            # Debug a single PDF build file
-            path_filter = URLFilter(self._options, self._options.user_config)
-            debug_target_file = path_filter(pathname=str(self._options.debug_target))
-            doc_src_path = path_filter(pathname=str(self._options.md_src_path))
-
-            if doc_src_path == debug_target_file:
-                debug_folder_path = str(self._options.debug_dir()).replace("\\", "/")
-                rel_url = not_as_uri.sub("", base_url)
-                pdf_html_file = check_site_dir.sub(debug_folder_path, rel_url) + ".html"
-                pdf_html_dir = Path(pdf_html_file).parent
-                if not pdf_html_dir.is_dir():
-                    pdf_html_dir.mkdir(parents=True, exist_ok=True)
-                with open(pdf_html_file, "w", encoding="UTF-8") as f:
-                    f.write(soup.prettify())
-
-        elif self._options.debug and self._options.debug_target is None:
-            # Debug every PDF build file
-            debug_folder_path = str(self._options.debug_dir()).replace("\\", "/")
-            rel_url = not_as_uri.sub("", base_url)
-            pdf_html_file = check_site_dir.sub(debug_folder_path, rel_url) + ".html"
-            pdf_html_dir = Path(pdf_html_file).parent
-            if not pdf_html_dir.is_dir():
-                pdf_html_dir.mkdir(parents=True, exist_ok=True)
-            with open(pdf_html_file, "w", encoding="UTF-8") as f:
-                f.write(soup.prettify())
-
-        html = HTML(string=str(soup))
-        return html.render()
-
-    def add_link(self, content: str, file_name: Optional[str] = None) -> str:
+        debug_folder_path = str(self._options.debug_dir()).replace("\\", "/")
+        rel_url = not_as_uri.sub("", base_url)
+        return check_site_dir.sub(debug_folder_path, rel_url)
+
+    def _profiler(self, base_url: str) -> ContextManager:
+        """
+        Get a context manager profiling the conversion of the page, if the `profile` option is enabled for it.
+
+        :param base_url: The base URL of the page.
+        :return: A :class:`DocumentProfiler`, or a context manager doing nothing.
+        """
+        if not (self._options.profile and self._is_debug_target()):
+            return nullcontext()
+        return DocumentProfiler(Path(self._debug_file(base_url)), memory=self._options.profile_memory)
+
+    def add_link(self, content: str, file_name: Optional[str] = None, soup: Optional[BeautifulSoup] = None) -> str:
         """
         Modify HTML content by adding a link using the theme handler.
 
         :param content: The HTML content to modify.
         :param file_name: The name of the file to link to.
+        :param soup: The already parsed HTML content. If the theme handler defines a ``modify_soup`` function,
+          it is called with this object (modified in-place) instead of parsing ``content`` again.
+
+        If the theme handler defines a ``splice_link`` function, the link is spliced into ``content`` at a known
+        anchor first, without parsing nor re-serializing the page. The parsed content is only used if the anchor
+        is not found.
 
         :return: The modified HTML content.
         """
         self.logger.info(f"✅ Link to {file_name} file included in HTML")
+        if hasattr(self.theme, "splice_link"):
+            spliced = self.theme.splice_link(content, file_name)
+            if spliced is not None:
+                return spliced
+        if soup is not None and hasattr(self.theme, "modify_soup"):
+            return self.theme.modify_soup(soup, file_name)
         return self.theme.modify_html(content, file_name)
 
     def inject_pgnum(self, soup: BeautifulSoup) -> None:
@@ -142,9 +383,29 @@ class Renderer:
         """.format(
             self.pgnum
         )
+        if self.total_pages is not None:
+            # Continuous page numbers in the chapters of the combined document
+            pgnum_counter.string += """
+        @page {{
+            @bottom-right {{
+                content: "Page " counter(__pgnum__) " of {}" !important;
+            }}
+        }}
+        """.format(
+                self.total_pages
+            )
 
         soup.head.append(pgnum_counter)
 
+    @property
+    def options(self) -> Options:
+        """
+        Get the options used for rendering.
+
+        :return: The options instance.
+        """
+        return self._options
+
     @property
     def logger(self) -> logging:
         """
@@ -0,0 +1,221 @@
+import inspect
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import unquote, urlsplit
+
+from .options import Options
+
+# Host names of the development server on the local machine
+_LOCAL_HOSTS = ("127.0.0.1", "localhost", "0.0.0.0")
+# Number of entries of the image cache before it is cleared, the decoded images are not all held as bytes
+MAX_CACHED_IMAGES = 1024
+
+
+def read_fetch_result(result: Dict) -> bytes:
+    """
+    Read the content of a WeasyPrint URL fetcher result.
+
+    :param result: The URL fetcher result, holding either a `string` or a `file_obj`.
+    :return: The content of the resource.
+    """
+    data = result.get("string")
+    if data is None:
+        with result["file_obj"] as file_obj:
+            data = file_obj.read()
+    if isinstance(data, str):
+        data = data.encode(result.get("encoding") or "UTF-8")
+    return data
+
+
+@lru_cache(maxsize=None)
+def image_cache_argument() -> str:
+    """
+    Get the name of the `HTML.render` argument sharing the decoded images between documents.
+    It is `cache` since WeasyPrint 59 and `image_cache` before.
+
+    :return: The argument name.
+    """
+    from weasyprint import HTML
+
+    return "cache" if "cache" in inspect.signature(HTML.render).parameters else "image_cache"
+
+
+class ResourceCache:
+    """
+    An in-memory cache of the resources (stylesheets, images, fonts...) fetched by WeasyPrint during a build.
+
+    The cached bytes are bounded by size, the least recently used resources are evicted first.
+    """
+
+    def __init__(self, fetcher: Callable[..., Dict], max_size: int):
+        """
+        Initialize the cache.
+
+        :param fetcher: The URL fetcher called for the resources which are not cached.
+        :param max_size: The maximum size of the cached resources, in bytes. Nothing is cached if 0.
+        """
+        self._fetcher = fetcher
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # Bytes served from memory instead of being fetched again
+        self.bytes_saved = 0
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def fetch(self, url: str, *args, **kwargs) -> Dict:
+        """
+        Fetch an external resource for WeasyPrint, from the cache if possible.
+
+        :param url: The URL of the resource.
+        :return: The WeasyPrint URL fetcher result.
+        """
+        if self.max_size <= 0 or url.startswith("data:"):
+            return self._fetcher(url, *args, **kwargs)
+
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+            self.hits += 1
+            self.bytes_saved += len(entry["string"])
+            return dict(entry)
+
+        self.misses += 1
+        result = self._fetcher(url, *args, **kwargs)
+        data = read_fetch_result(result)
+        entry = {key: value for key, value in result.items() if key != "file_obj"}
+        entry["string"] = data
+        if len(data) <= self.max_size:
+            self._entries[url] = entry
+            self.size += len(data)
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted["string"])
+        return dict(entry)
+
+
+class ImageCache(dict):
+    """
+    The decoded images shared by the documents of a build, passed to WeasyPrint as its image cache.
+
+    WeasyPrint stores the images by URL, and their data under keys of their own referenced by the images, so the
+    entries can't be evicted one by one. The cache is cleared between two documents instead, once it holds more
+    than :data:`MAX_CACHED_IMAGES` entries or its data exceeds the maximum size.
+    """
+
+    def __init__(self, max_size: int):
+        """
+        Initialize the cache.
+
+        :param max_size: The maximum size of the image data, in bytes. The images are not shared if 0.
+        """
+        super().__init__()
+        self.max_size = max_size
+        self.clears = 0
+
+    @property
+    def size(self) -> int:
+        """
+        The size of the image data held by the cache, in bytes.
+        """
+        return sum(len(value) for value in self.values() if isinstance(value, bytes))
+
+    def trim(self) -> None:
+        """
+        Clear the cache if it exceeds its limits. Called before a document is laid out, as the images of the
+        previous documents are written.
+        """
+        if self and (self.max_size <= 0 or len(self) > MAX_CACHED_IMAGES or self.size > self.max_size):
+            self.clear()
+            self.clears += 1
+
+
+def resolver_settings(options: Options) -> Dict:
+    """
+    Get the site locations used by :class:`LocalResolver`, as plain values which can be sent to the render daemon.
+
+    :param options: The plugin options.
+    :return: The `site_url`, the `dev_addr` (host, port) of the development server, the `site_dir` and the `docs_dir`.
+    """
+    config = options.user_config
+    dev_addr = config.get("dev_addr")
+    return {
+        "site_url": config["site_url"],
+        "dev_addr": [dev_addr.host, dev_addr.port] if dev_addr else None,
+        "site_dir": str(config["site_dir"]),
+        "docs_dir": str(config["docs_dir"]),
+    }
+
+
+class LocalResolver:
+    """
+    A URL fetcher which reads the resources of the site from the local files instead of the network.
+
+    The URLs under `site_url` or the address of the development server are mapped to the matching files in the site
+    directory, then in the docs directory. The other HTTP(S) requests are counted, as they escape to the network.
+    """
+
+    def __init__(self, fetcher: Callable[..., Dict], settings: Dict, logger: logging.Logger):
+        """
+        Initialize the resolver.
+
+        :param fetcher: The URL fetcher called with the resolved URLs.
+        :param settings: The site locations, see :func:`resolver_settings`.
+        :param logger: The logger of the plugin.
+        """
+        self._fetcher = fetcher
+        self._logger = logger
+        self._roots = [Path(settings["site_dir"]), Path(settings["docs_dir"])]
+        self._prefixes = []
+        if settings["site_url"]:
+            self._prefixes.append(settings["site_url"].rstrip("/") + "/")
+        if settings["dev_addr"]:
+            host, port = settings["dev_addr"]
+            hosts = {host}
+            if host in _LOCAL_HOSTS:
+                hosts.update(_LOCAL_HOSTS)
+            self._prefixes.extend(f"http://{host}:{port}/" for host in sorted(hosts))
+        # Requests sent to the network
+        self.network_requests = 0
+
+    def resolve(self, url: str) -> Optional[str]:
+        """
+        Get the local file of a URL of the site.
+
+        :param url: The URL of the resource.
+        :return: The `file://` URL of the local file, or None if the URL is not a local resource.
+        """
+        for prefix in self._prefixes:
+            if not (url + "/").startswith(prefix):
+                continue
+            path = unquote(urlsplit(url[len(prefix) :]).path)
+            if path == "" or path.endswith("/"):
+                path += "index.html"
+            for root in self._roots:
+                local_file = root.joinpath(path).resolve()
+                try:
+                    # Never read outside the site and docs directories
+                    local_file.relative_to(root.resolve())
+                except ValueError:
+                    continue
+                if local_file.is_file():
+                    return local_file.as_uri()
+        return None
+
+    def fetch(self, url: str, *args, **kwargs) -> Dict:
+        """
+        Fetch an external resource for WeasyPrint, from the local files if possible.
+
+        :param url: The URL of the resource.
+        :return: The WeasyPrint URL fetcher result.
+        """
+        local_url = self.resolve(url)
+        if local_url is not None:
+            return self._fetcher(local_url, *args, **kwargs)
+        if urlsplit(url).scheme in ("http", "https"):
+            self.network_requests += 1
+            self._logger.debug("Fetching {} from the network".format(url))
+        return self._fetcher(url, *args, **kwargs)
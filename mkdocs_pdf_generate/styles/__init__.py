@@ -1,7 +1,7 @@
 import html
 import re
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from bs4 import Tag
 
@@ -29,16 +29,52 @@ def _css_escape(text: str) -> str:
     return text.replace("'", "\\27")
 
 
-def style_for_print(options: Options, pdf_metadata: Dict) -> List[Tag]:
+def load_print_stylesheets(options: Options) -> List[Tuple[str, str]]:
+    """
+    Read the plugin and custom CSS files used for printing.
+
+    The files are read once per build, the returned list is reused for every PDF document.
+
+    :param options: An Options object containing various styling options.
+    :return: A list of (CSS file name, CSS rules) tuples, in cascade order.
+    """
+    base_path = Path(__file__).parent.resolve()
+    css_files = ["_styles.css", "_paging.css"]
+
+    if options.toc:
+        css_files.append("toc.css")
+
+    if options.cover:
+        css_files.append("cover.css")
+
+    docs_src_dir = Path(options.user_config["config_file_path"]).parent.resolve()
+    custom_template_path = Path(options.custom_template_path)
+    if not custom_template_path.is_absolute():
+        custom_template_path = docs_src_dir.joinpath(options.custom_template_path)
+
+    if custom_template_path.is_dir():
+        css_files.append("custom.css")  # Add plugin custom CSS
+
+    stylesheets: List[Tuple[str, str]] = []
+    for css_file in css_files:
+        filename = base_path.joinpath(css_file) if css_file != "custom.css" else custom_template_path.joinpath(css_file)
+        if filename.is_file():
+            with open(filename, "r", encoding="UTF-8") as f:
+                stylesheets.append((css_file, f.read()))
+    return stylesheets
+
+
+def style_for_print(
+    options: Options, pdf_metadata: Dict, stylesheets: Optional[List[Tuple[str, str]]] = None
+) -> List[Tag]:
     """
     Generate a list of CSS style tags for printing documentation.
 
     :param options: An Options object containing various styling options.
     :param pdf_metadata: Metadata for the PDF.
+    :param stylesheets: The CSS files loaded by :func:`load_print_stylesheets`. They are read if not provided.
     :return: A list of Tag objects representing CSS styles.
     """
-    base_path = Path(__file__).parent.resolve()
-
     css_string = """
     :root {{
         --author: '{}';
@@ -65,37 +101,21 @@ def style_for_print(options: Options, pdf_metadata: Dict) -> List[Tag]:
     )
     css_tag = Tag(name="style", attrs={"class": "plugin-default-css"})
     css_tag.append(css_string)
-    css_files = ["_styles.css", "_paging.css"]
-
-    if options.toc:
-        css_files.append("toc.css")
-
-    if options.cover:
-        css_files.append("cover.css")
-
-    docs_src_dir = Path(options.user_config["config_file_path"]).parent.resolve()
-    custom_template_path = Path(options.custom_template_path)
-    if not custom_template_path.is_absolute():
-        custom_template_path = docs_src_dir.joinpath(options.custom_template_path)
 
-    if custom_template_path.is_dir():
-        css_files.append("custom.css")  # Add plugin custom CSS
+    if stylesheets is None:
+        stylesheets = load_print_stylesheets(options)
 
     css_styles_list: List[Tag] = []
-    for css_file in css_files:
-        filename = base_path.joinpath(css_file) if css_file != "custom.css" else custom_template_path.joinpath(css_file)
-        if filename.is_file():
-            with open(filename, "r", encoding="UTF-8") as f:
-                css_rules = f.read()
-                if css_file in ["_styles.css", "_paging.css"]:
-                    css_tag.append(css_rules)
-                else:
-                    style_tag = Tag(
-                        name="style",
-                        attrs={"class": "plugin-{}".format(css_file.replace(".", "-"))},
-                    )
-                    style_tag.append(css_rules)
-                    css_styles_list.append(style_tag)
+    for css_file, css_rules in stylesheets:
+        if css_file in ["_styles.css", "_paging.css"]:
+            css_tag.append(css_rules)
+        else:
+            style_tag = Tag(
+                name="style",
+                attrs={"class": "plugin-{}".format(css_file.replace(".", "-"))},
+            )
+            style_tag.append(css_rules)
+            css_styles_list.append(style_tag)
 
     css_styles_list.insert(0, css_tag)  # Insert default CSS tag at the start
     return css_styles_list
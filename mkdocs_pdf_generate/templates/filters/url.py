@@ -1,6 +1,9 @@
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 
+from mkdocs.config.defaults import MkDocsConfig
+
 from . import _FilterBase
 
 
@@ -10,8 +13,22 @@ class URLFilter(_FilterBase):
     This filter takes a pathname and checks whether it is a URL or a local path to a file. If it's a URL, the
     original pathname is returned. If it's a local path, the filter searches for the file in a list of directories
     and returns the URL of the first matching file found.
+
+    The results are memoized: an instance is meant to be used for a single build (see :attr:`Options.url_filter`),
+    so the files added or removed between `mkdocs serve` rebuilds are found again.
     """
 
+    def __init__(self, options: Any, config: MkDocsConfig):
+        """
+        Initialize a new URLFilter instance.
+
+        :param options: Options for the filter.
+        :param config: MkDocs configuration.
+        """
+        super().__init__(options, config)
+        self._dirs: Optional[List[Path]] = None
+        self._urls: Dict[str, str] = {}
+
     def __call__(self, pathname: str) -> str:
         """
         Filter the input pathname and return the corresponding URL.
@@ -22,23 +39,29 @@ class URLFilter(_FilterBase):
         if not pathname:
             return ""
 
+        url = self._urls.get(pathname)
+        if url is None:
+            url = self._urls[pathname] = self._find(pathname)
+        return url
+
+    def _find(self, pathname: str) -> str:
         # Check if the pathname is already a URL
         target_url = urlparse(pathname)
         if target_url.scheme or target_url.netloc:
             return pathname
 
         # Search for the image file in the specified directories
-        dirs = [
-            Path(self.config["config_file_path"]).parent.resolve(),
-            getattr(self.config["theme"], "custom_dir", None),
-            Path(self.config["docs_dir"]),
-            Path("."),
-        ]
-
-        for d in dirs:
-            if not d:
-                continue
-            path = Path(d).joinpath(pathname).resolve()
+        if self._dirs is None:
+            dirs = [
+                Path(self.config["config_file_path"]).parent.resolve(),
+                getattr(self.config["theme"], "custom_dir", None),
+                Path(self.config["docs_dir"]),
+                Path("."),
+            ]
+            self._dirs = [Path(d) for d in dirs if d]
+
+        for d in self._dirs:
+            path = d.joinpath(pathname).resolve()
             if path.is_file():
                 return path.as_uri()
 
@@ -1,13 +1,17 @@
 # import os
+import json
 from datetime import datetime
-from typing import Dict, List, Any, Optional, MutableMapping
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, MutableMapping, Tuple
 from pathlib import Path
 
 import jinja2
+import jinja2.meta
 from mkdocs.config.defaults import MkDocsConfig
 
 from .filters.datetime_filter import strftime, strptime
-from .filters.url import URLFilter
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 
 class Template(object):
@@ -38,6 +42,10 @@ class Template(object):
         self._config = config
         self._keywords = None
         self._jinja_env = None
+        # Rendered and parsed fragments, by template name and keyword values (a new Template is created per build)
+        self._fragments: Dict[Tuple[str, str], "BeautifulSoup"] = {}
+        # Keywords used by each template, None if it includes other templates
+        self._template_variables: Dict[str, Optional[frozenset]] = {}
 
     @property
     def _env(self) -> jinja2.Environment:
@@ -56,7 +64,7 @@ class Template(object):
             base_path = Path(__file__).parent.resolve()
             template_paths = []
 
-            custom_template_path = self._get_custom_template_path()
+            custom_template_path = self.get_custom_template_path()
 
             if custom_template_path.is_dir():
                 template_paths.append(custom_template_path)
@@ -70,11 +78,12 @@ class Template(object):
                 lstrip_blocks=True,
                 trim_blocks=True,
                 autoescape=True,
+                bytecode_cache=self.get_bytecode_cache(),
             )
 
             env.filters["strptime"] = strptime
             env.filters["strftime"] = strftime
-            env.filters["to_url"] = URLFilter(self._options, self._config)
+            env.filters["to_url"] = self._options.url_filter
 
             return env
 
@@ -179,7 +188,75 @@ class Template(object):
 
         return self._env.select_template(real_names, parent=parent, globals=globals)
 
-    def _get_custom_template_path(self) -> Path:
+    def render_fragment(self, names: [str], keywords: Optional[Dict] = None) -> Tuple[str, "BeautifulSoup"]:
+        """
+        Render a template selected by names, and parse the rendered HTML.
+
+        The fragments are memoized by template name and the values of the keywords used by the template,
+        so identical fragments (e.g. the covers of the documents sharing a title, type and revision) are only
+        rendered and parsed once per build.
+
+        :param names: A list of template names to search for.
+        :param keywords: The keywords passed to the template.
+        :return: The name of the rendered template, and a copy of the parsed fragment which may be modified.
+        """
+        from bs4 import BeautifulSoup
+
+        keywords = keywords or {}
+        template = self.select(names)
+        variables = self.get_template_variables(template.name)
+        if variables is not None:
+            keywords_used = {key: value for key, value in keywords.items() if key in variables}
+        else:
+            keywords_used = keywords
+        try:
+            key = (template.name, json.dumps(keywords_used, sort_keys=True, default=str))
+        except (TypeError, ValueError):
+            # The keywords can not be compared (e.g. keys of mixed types), the fragment is not memoized
+            key = None
+
+        fragment = self._fragments.get(key) if key is not None else None
+        if fragment is None:
+            fragment = BeautifulSoup(str(template.render(keywords)), "html.parser")
+            if key is not None:
+                self._fragments[key] = fragment
+
+        # Copying the parsed elements is cheaper than parsing the fragment again
+        fragment_copy = BeautifulSoup("", "html.parser")
+        for element in fragment.contents:
+            fragment_copy.append(element.__copy__())
+        return template.name, fragment_copy
+
+    def get_template_variables(self, name: str) -> Optional[frozenset]:
+        """
+        Get the names of the keywords used by a template.
+
+        :param name: The name of the template.
+        :return: The names of the keywords, or None if the template includes, imports or extends other templates.
+        """
+        if name not in self._template_variables:
+            source, _, _ = self._env.loader.get_source(self._env, name)
+            ast = self._env.parse(source)
+            variables = None
+            if not any(True for _ in jinja2.meta.find_referenced_templates(ast)):
+                variables = frozenset(jinja2.meta.find_undeclared_variables(ast))
+            self._template_variables[name] = variables
+        return self._template_variables[name]
+
+    def get_bytecode_cache(self) -> jinja2.BytecodeCache:
+        """
+        Get the cache of the compiled templates, shared by the builds. It is kept in the `cache_dir` directory
+        if the render cache is enabled, and in the temporary directory of the system otherwise.
+
+        :return: The Jinja2 bytecode cache.
+        """
+        if self._options.cache:
+            bytecode_dir = self._options.cache_dir().joinpath("templates")
+            bytecode_dir.mkdir(parents=True, exist_ok=True)
+            return jinja2.FileSystemBytecodeCache(str(bytecode_dir))
+        return jinja2.FileSystemBytecodeCache()
+
+    def get_custom_template_path(self) -> Path:
         """
         Get the resolved custom template path.
 
@@ -0,0 +1,52 @@
+"""
+Theme handlers add the PDF download link to the pages of a theme, and may provide a stylesheet for its PDF export.
+
+A theme handler is a module defining:
+
+* ``get_stylesheet() -> Optional[str]``: the stylesheet added to the PDF export.
+* ``modify_html(html, href) -> str``: add the download link to the HTML of a page.
+* ``splice_link(html, href) -> Optional[str]`` (optional): add the download link with string operations only,
+  typically with :func:`splice_html`. It returns None if the anchor of the link is not found in the page.
+* ``modify_soup(soup, href) -> str`` (optional): add the download link to the already parsed page.
+
+The plugin calls ``splice_link`` first, as it neither parses nor re-serializes the page, and falls back to
+``modify_soup`` or ``modify_html`` if it returns None.
+"""
+
+import re
+from typing import Optional, Pattern, Union
+
+
+def splice_html(html: str, anchor: Union[str, Pattern[str]], markup: str, after: bool = True) -> Optional[str]:
+    """
+    Insert markup at the first occurrence of an anchor, without parsing the HTML.
+
+    :param html: The HTML content.
+    :param anchor: The anchor, a string or a compiled regular expression.
+    :param markup: The markup to insert.
+    :param after: Whether the markup is inserted after the anchor, or before it.
+    :return: The modified HTML content, or None if the anchor is not found.
+    """
+    if isinstance(anchor, str):
+        start = html.find(anchor)
+        if start < 0:
+            return None
+        end = start + len(anchor)
+    else:
+        match = anchor.search(html)
+        if match is None:
+            return None
+        start, end = match.span()
+    offset = end if after else start
+    return html[:offset] + markup + html[offset:]
+
+
+def opening_tag(name: str) -> Pattern[str]:
+    """
+    Compile a regular expression matching the opening tag of an element with any attributes, e.g.
+    ``<footer class="col-md-12">``.
+
+    :param name: The name of the element.
+    :return: The compiled regular expression.
+    """
+    return re.compile(r"<{}(?:\s[^>]*)?>".format(re.escape(name)), re.IGNORECASE)
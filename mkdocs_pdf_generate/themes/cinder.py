@@ -1,7 +1,12 @@
+from html import escape
 from typing import Optional
 
 from bs4 import BeautifulSoup
 
+from . import opening_tag, splice_html
+
+_FOOTER = opening_tag("footer")
+
 
 def get_stylesheet() -> Optional[str]:
     """
@@ -20,9 +25,34 @@ def modify_html(html: str, href: str) -> str:
     :param href: The URL of the PDF file to be downloaded.
     :return: The modified HTML with the added PDF download link.
     """
+    spliced = splice_link(html, href)
+    if spliced is not None:
+        return spliced
     # Parse the HTML using BeautifulSoup
-    soup = BeautifulSoup(html, "html.parser")
+    return modify_soup(BeautifulSoup(html, "html.parser"), href)
+
+
+def splice_link(html: str, href: str) -> Optional[str]:
+    """
+    Add a PDF download link at the beginning of the footer, without parsing the HTML.
 
+    :param html: The original HTML content.
+    :param href: The URL of the PDF file to be downloaded.
+    :return: The modified HTML, or None if the footer is not found.
+    """
+    href = escape(href)
+    link = '<small><a href="{0}" title="PDF Export" download="{0}" class="pdf-download">Download PDF</a></small>'
+    return splice_html(html, _FOOTER, link.format(href))
+
+
+def modify_soup(soup: BeautifulSoup, href: str) -> str:
+    """
+    Modify parsed HTML in-place by adding a PDF download link to the footer.
+
+    :param soup: The parsed HTML content.
+    :param href: The URL of the PDF file to be downloaded.
+    :return: The modified HTML with the added PDF download link.
+    """
     # Create a <small> wrapper
     sm_wrapper = soup.new_tag("small")
 
@@ -1,6 +1,10 @@
+from html import escape
 from typing import Optional
+
 from bs4 import BeautifulSoup
 
+from . import splice_html
+
 
 def get_stylesheet() -> Optional[str]:
     """
@@ -19,8 +23,32 @@ def modify_html(html: str, href: str) -> str:
     :param href: The URL of the PDF export link.
     :return: The modified HTML content with the added PDF export link.
     """
-    soup = BeautifulSoup(html, "html.parser")
+    spliced = splice_link(html, href)
+    if spliced is not None:
+        return spliced
+    return modify_soup(BeautifulSoup(html, "html.parser"), href)
+
+
+def splice_link(html: str, href: str) -> Optional[str]:
+    """
+    Add a PDF export link at the end of the head section, without parsing the HTML.
 
+    :param html: The input HTML content.
+    :param href: The URL of the PDF export link.
+    :return: The modified HTML content, or None if the end of the head section is not found.
+    """
+    link = '<link href="{}" rel="alternate" title="PDF Export" type="application/pdf"/>'.format(escape(href))
+    return splice_html(html, "</head>", link, after=False)
+
+
+def modify_soup(soup: BeautifulSoup, href: str) -> str:
+    """
+    Modify the given parsed HTML in-place by adding a PDF export link to the head section.
+
+    :param soup: The parsed HTML content.
+    :param href: The URL of the PDF export link.
+    :return: The modified HTML content with the added PDF export link.
+    """
     if soup.head:
         link = soup.new_tag(
             "link",
@@ -2,6 +2,13 @@
 This module provides functions for manipulating HTML content and generating a stylesheet.
 """
 
+from html import escape
+from typing import Optional
+
+from . import splice_html
+
+_INSERT_POINT = '<article class="md-content__inner md-typeset">'
+
 
 def get_stylesheet() -> str:
     """
@@ -49,9 +56,21 @@ def modify_html(html: str, href: str) -> str:
     :param href: The link for the download button.
     :return: The modified HTML content with the download button added.
     """
+    spliced = splice_link(html, href)
+    return html if spliced is None else spliced
+
+
+def splice_link(html: str, href: str) -> Optional[str]:
+    """
+    Add a download button with an icon at the beginning of the article, without parsing the HTML.
+
+    :param html: The original HTML content.
+    :param href: The link for the download button.
+    :return: The modified HTML content, or None if the article is not found.
+    """
     # SVG 'file-download' size 2x from fontawesome: https://fontawesome.com/icons/file-download?style=solid
     # resized to 16px width * height
-    a_tag = '<a class="md-content__button md-icon" href="{}" download title="Download PDF">'.format(href)
+    a_tag = '<a class="md-content__button md-icon" href="{}" download title="Download PDF">'.format(escape(href))
 
     icon = (
         '<svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" fill="currentColor" '
@@ -73,7 +92,4 @@ def modify_html(html: str, href: str) -> str:
     button_tag = a_tag + icon + "</a>"
 
     # Insert the button into the HTML
-    insert_point = '<article class="md-content__inner md-typeset">'
-    html = html.replace(insert_point, insert_point + button_tag)
-
-    return html
+    return splice_html(html, _INSERT_POINT, button_tag)
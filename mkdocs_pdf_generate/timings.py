@@ -0,0 +1,74 @@
+import json
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from timeit import default_timer as timer
+from typing import Dict, Iterator, List
+
+# Name of the build report written to the site directory
+REPORT_FILE_NAME = "pdf-build-report.json"
+
+
+class StageTimer:
+    """
+    Accumulate the time spent in each stage of the conversion of a document.
+    """
+
+    def __init__(self):
+        self.times: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time a stage. The times of a stage run several times are added up.
+
+        :param name: The name of the stage.
+        """
+        start = timer()
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0.0) + timer() - start
+
+    def reset(self) -> Dict[str, float]:
+        """
+        Start timing a new document.
+
+        :return: The stage times of the previous document, in seconds.
+        """
+        times, self.times = self.times, {}
+        return times
+
+
+def write_report(report_file: Path, documents: List[Dict], total_time: float) -> None:
+    """
+    Write the build report as JSON.
+
+    :param report_file: The path of the report.
+    :param documents: The entries of the converted documents (see :meth:`PdfGeneratePlugin._collect_result`).
+    :param total_time: The time spent converting the documents, in seconds.
+    """
+    stages: Dict[str, float] = {}
+    for entry in documents:
+        for name, seconds in entry["stages"].items():
+            stages[name] = stages.get(name, 0.0) + seconds
+
+    report = {
+        "generated": datetime.now(timezone.utc).isoformat(),
+        "total_time": round(total_time, 6),
+        "documents_count": len(documents),
+        "stages": {name: round(seconds, 6) for name, seconds in stages.items()},
+        "documents": documents,
+    }
+    report_file.write_text(json.dumps(report, indent=2), encoding="UTF-8")
+
+
+def slowest(documents: List[Dict], count: int) -> List[Dict]:
+    """
+    Get the documents which took the longest to convert.
+
+    :param documents: The entries of the converted documents.
+    :param count: The number of documents to return.
+    :return: The slowest documents, slowest first.
+    """
+    return sorted(documents, key=lambda entry: entry["time"], reverse=True)[:count]
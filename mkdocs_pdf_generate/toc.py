@@ -1,33 +1,146 @@
-from typing import Union
+import re
+from copy import copy
+from typing import List, NamedTuple, Optional, Sequence, Tuple
 
-from bs4 import BeautifulSoup, NavigableString, PageElement, Tag
+from bs4 import BeautifulSoup, PageElement, Tag
 
 from .options import Options
 
+_HEADING_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+# The h1 heading used as the document title must have an id (set by the `toc` Markdown extension)
+_TITLE_ID = re.compile(r"[\w_\-]+")
 
-def make_toc(soup: PageElement, options: Options) -> None:
+
+class Heading(NamedTuple):
+    """
+    A heading of the document, as indexed by :func:`index_headings`.
+    """
+
+    element: Tag
+    level: int
+    id: Optional[str]
+    # The chapter number (e.g. "1.2. "), empty if the heading is not numbered
+    numbering: str
+    text: str
+
+
+def index_headings(soup: PageElement, options: Options) -> List[Heading]:
+    """
+    Index the headings of the document in a single traversal. The index is shared by the numbering,
+    the table of contents, the cover page and the TXT table of contents.
+
+    The numbering is computed if both `toc` and `toc_numbering` are enabled, up to the `toc_level` option.
+
+    :param soup: Target BeautifulSoup PageElement.
+    :param options: Project options.
+    :return: The headings in document order.
+    """
+    level = options.toc_level if options.toc and options.toc_ordering and 1 <= options.toc_level <= 6 else 0
+    counters = [0] * 7
+
+    headings = []
+    for h in soup.find_all(_HEADING_TAGS):
+        h_level = int(h.name[1])
+        numbering = ""
+        if 2 <= h_level <= level:
+            counters[h_level] += 1
+            counters[h_level + 1 :] = [0] * (6 - h_level)
+            numbering = ".".join(str(n) for n in counters[2 : h_level + 1]) + ". "
+        headings.append(Heading(h, h_level, h.get("id"), numbering, h.get_text()))
+    return headings
+
+
+def make_toc(soup: PageElement, options: Options, headings: Optional[Sequence[Heading]] = None) -> None:
     """
     Generate a table of contents (toc) tree if enabled in options.
 
     :param soup: Target BeautifulSoup PageElement.
     :param options: Project options.
+    :param headings: The heading index of the document, built if None.
     """
 
     if options.toc:
-        _make_indexes(soup, options)
+        if headings is None:
+            headings = index_headings(soup, options)
+        _make_indexes(soup, options, headings)
+
+
+def number_headings(soup: PageElement, options: Options, headings: Optional[Sequence[Heading]] = None) -> None:
+    """
+    Number the headings without generating a table of contents, if enabled in options.
+
+    :param soup: Target BeautifulSoup PageElement.
+    :param options: Project options.
+    :param headings: The heading index of the document, built if None.
+    """
+    if options.toc and options.toc_ordering:
+        if headings is None:
+            headings = index_headings(soup, options)
+        _inject_heading_order(headings, options)
 
 
-def _make_indexes(soup: BeautifulSoup, options: Options) -> None:
+def get_toc_entries(headings: Sequence[Heading], options: Options) -> List[Tuple[str, str]]:
+    """
+    Get the links of the table of contents generated by :func:`make_toc`.
+
+    :param headings: The heading index of the document.
+    :param options: Project options.
+    :return: A list of (anchor, text) tuples in document order. The text includes the heading numbering.
+    """
+    return [
+        (h.id, re.sub(r"\s+", " ", h.numbering + h.text).strip())
+        for h in _listed_headings(headings, options)
+        if h.level > 1 and h.id
+    ]
+
+
+def get_title(headings: Sequence[Heading]) -> Optional[Heading]:
+    """
+    Get the h1 heading used as the title of the document.
+
+    :param headings: The heading index of the document.
+    :return: The first h1 heading with an id, or None.
+    """
+    for h in headings:
+        if h.level == 1 and h.id and _TITLE_ID.search(h.id):
+            return h
+    return None
+
+
+def _listed_headings(headings: Sequence[Heading], options: Options) -> List[Heading]:
+    """
+    Select the headings listed in the table of contents: every h1, and the headings up to the `toc_level` option
+    nested under a listed heading of the level above.
+
+    :param headings: The heading index of the document.
+    :param options: Project options.
+    :return: The listed headings in document order.
+    """
+    level = options.toc_level
+    if not options.toc or not (1 <= level <= 6):
+        return []
+
+    listed = []
+    depth = 0
+    for h in headings:
+        if h.level == 1 or (h.level <= level and h.level <= depth + 1):
+            listed.append(h)
+            depth = h.level
+    return listed
+
+
+def _make_indexes(soup: BeautifulSoup, options: Options, headings: Sequence[Heading]) -> None:
     """
     Generate ordered chapter numbers and Table of Contents (TOC) for the document.
 
     :param soup: BeautifulSoup object representing the DOM of the document.
     :param options: Options instance containing generation settings.
+    :param headings: The heading index of the document.
     """
 
     # Step 1: (re)ordered headings
     if options.toc_ordering:
-        _inject_heading_order(soup, options)
+        _inject_heading_order(headings, options)
 
     # Step 2: generate toc page
     level = options.toc_level
@@ -36,187 +149,63 @@ def _make_indexes(soup: BeautifulSoup, options: Options) -> None:
 
     options.logger.info(f"Generate table of contents up to heading level {level} for PDF document.")
 
-    h1li = None
-    h2ul = h2li = h3ul = h3li = h4ul = h4li = h5ul = h5li = h6ul = None
-    # exclude_lv2 = exclude_lv3 = False
-
-    def make_link(heading_tag: Tag) -> Tag:
-        """
-        Create a link for a heading and return it wrapped in an 'li' tag.
-
-        :param heading_tag: The heading tag to create a link for.
-        :return: An 'li' tag containing the link.
-        """
-        li = soup.new_tag("li")
-        if heading_tag.name == "h1":
-            return li
-        ref = heading_tag.get("id", "")
-        prefix = heading_tag.get("data-numbering", None)
-        a = (
-            soup.new_tag("a", href=f"#{ref}", attrs={"data-numbering": prefix})
-            if prefix is not None
-            else soup.new_tag("a", href=f"#{ref}")
-        )
-        for el in heading_tag.contents:
-            if el.name == "a":
-                a.append(el.contents[0])
-            else:
-                a.append(_clone_element(el))
-        li.append(a)
-        options.logger.debug(f"| [{heading_tag.get_text(separator=' ')}]({ref})")
-        return li
-
     toc = soup.new_tag("article", id="doc-toc")
     title = soup.new_tag("h1")
     title.append(soup.new_string(options.toc_title))
     toc.append(title)
 
-    h1ul = soup.new_tag("ul")
-    toc.append(h1ul)
-
-    headings = soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6"])
-    for h in headings:
-        if h.name == "h1":
-            h1li = make_link(h)
-            h1ul.append(h1li)
-            h2ul = h2li = h3ul = h3li = h4ul = h4li = h5ul = h5li = h6ul = None
-
-            # exclude_lv2 = _is_exclude(h.get("id", None), options)
-
-        elif h.name == "h2" and level >= 2:
-            if not h2ul:
-                h2ul = soup.new_tag("ul")
-                h1li.append(h2ul)
-            h2li = make_link(h)
-            h2ul.append(h2li)
-            h3ul = h3li = h4ul = h4li = h5ul = h5li = h6ul = None
-
-            # exclude_lv3 = _is_exclude(h.get("id", None), options)
-
-        elif h.name == "h3" and level >= 3:
-            if not h2li:
-                continue
-            if not h3ul:
-                h3ul = soup.new_tag("ul")
-                h2li.append(h3ul)
-            h3li = make_link(h)
-            h3ul.append(h3li)
-            h4ul = h4li = h5ul = h5li = h6ul = None
-
-        elif h.name == "h4" and level >= 4:
-            if not h3li:
-                continue
-            if not h4ul:
-                h4ul = soup.new_tag("ul")
-                h3li.append(h4ul)
-            h4li = make_link(h)
-            h4ul.append(h4li)
-            h5ul = h5li = h6ul = None
-
-        elif h.name == "h5" and level >= 5:
-            if not h4li:
-                continue
-            if not h5ul:
-                h5ul = soup.new_tag("ul")
-                h4li.append(h5ul)
-            h5li = make_link(h)
-            h5ul.append(h5li)
-            h6ul = None
-
-        elif h.name == "h6" and level >= 6:
-            if not h5li:
-                continue
-            if not h6ul:
-                h6ul = soup.new_tag("ul")
-                h5li.append(h6ul)
-            h6li = make_link(h)
-            h6ul.append(h6li)
+    # The list of each level, the items are appended to the list of their level. Each listed heading is one level
+    # deeper than the previous one at most (see `_listed_headings`), so its list is nested in the last item above.
+    lists: List[Optional[Tag]] = [None] * 7
+    lists[1] = soup.new_tag("ul")
+    toc.append(lists[1])
+    li = None
+    for h in _listed_headings(headings, options):
+        if lists[h.level] is None:
+            lists[h.level] = soup.new_tag("ul")
+            li.append(lists[h.level])
+        lists[h.level + 1 :] = [None] * (6 - h.level)
 
-        else:
-            continue
-        pass
+        li = soup.new_tag("li")
+        if h.level > 1:
+            attrs = {"href": f"#{h.id or ''}"}
+            if h.numbering:
+                attrs["data-numbering"] = h.numbering
+            a = soup.new_tag("a", attrs=attrs)
+            a.extend(_link_content(h.element))
+            li.append(a)
+            options.logger.debug(f"| [{h.text}]({h.id or ''})")
+        lists[h.level].append(li)
 
     soup.body.insert(0, toc)
 
 
-def _inject_heading_order(soup: Tag, options: Options) -> None:
+def _inject_heading_order(headings: Sequence[Heading], options: Options) -> None:
     """
     Injects numbering into headings based on their level.
 
-    :param soup: BeautifulSoup Tag containing the parsed HTML.
+    :param headings: The heading index of the document.
     :param options: Options for heading injection.
     """
-    level = options.toc_level
-    if not (1 <= level <= 6):
-        return
+    options.logger.debug(f"Number headings up to level {options.toc_level}.")
 
-    options.logger.debug(f"Number headings up to level {level}.")
-
-    h2n = h3n = h4n = h5n = h6n = 0
-    # exclude_lv2 = exclude_lv3 = False
-
-    headings = soup.find_all(["h2", "h3", "h4", "h5", "h6"])
     for h in headings:
-        # if h.name == "h1":
-        #     h1n += 1
-        #     h2n = h3n = 0
-        #     prefix = ""
-
-        # exclude_lv2 = _is_exclude(h.get("id", None), options)
-
-        if h.name == "h2" and level >= 2:
-            h2n += 1
-            h3n = h4n = h5n = h6n = 0
-            prefix = f"{h2n}. "
-
-            # exclude_lv3 = _is_exclude(h.get("id", None), options)
-
-        elif h.name == "h3" and level >= 3:
-            h3n += 1
-            h4n = h5n = h6n = 0
-            prefix = f"{h2n}.{h3n}. "
-
-        elif h.name == "h4" and level >= 4:
-            h4n += 1
-            h5n = h6n = 0
-            prefix = f"{h2n}.{h3n}.{h4n}. "
-
-        elif h.name == "h5" and level >= 5:
-            h5n += 1
-            h6n = 0
-            prefix = f"{h2n}.{h3n}.{h4n}.{h5n}. "
+        if h.numbering:
+            h.element["data-numbering"] = h.numbering
 
-        elif h.name == "h6" and level >= 6:
-            h6n += 1
-            prefix = f"{h2n}.{h3n}.{h4n}.{h5n}.{h6n}. "
 
-        else:
-            continue
-
-        h["data-numbering"] = prefix
-
-
-def _clone_element(el: Union[Tag, PageElement]) -> Tag:
+def _link_content(heading: Tag) -> List[PageElement]:
     """
-    Clone a BeautifulSoup PageElement.
+    Get the content of a heading for its TOC link. The elements are copied, except the text of the links inside
+    the heading (e.g. permalinks) which is moved to the TOC link, as links cannot be nested.
 
-    This function creates a deep copy of the given PageElement while preserving its structure and attributes.
-
-    :param el: The PageElement to be cloned.
-    :return: A new PageElement that is a deep copy of the input element.
+    :param heading: The heading tag.
+    :return: The elements of the TOC link.
     """
-    if isinstance(el, NavigableString):
-        # If the element is a NavigableString, create a new instance of it.
-        return type(el)(el)
-
-    copy = Tag(None, el.builder, el.name, el.namespace, el.nsprefix)
-    # Workaround for a bug where the builder is not set. (See: https://bugs.launchpad.net/beautifulsoup/+bug/1307471)
-    copy.attrs = dict(el.attrs)
-    # Copy attribute values.
-    for attr in ("can_be_empty_element", "hidden"):
-        setattr(copy, attr, getattr(el, attr))
-    # Recursively clone child elements.
-    for child in el.contents:
-        copy.append(_clone_element(child))
-
-    return copy
+    content = []
+    for el in heading.contents:
+        if isinstance(el, Tag) and el.name == "a":
+            content.extend(el.contents[:1])
+        else:
+            content.append(copy(el))
+    return content
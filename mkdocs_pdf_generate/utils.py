@@ -127,19 +127,17 @@ def enable_legal_terms(soup: BeautifulSoup, options: Options, pdf_metadata: Dict
         document_legal_terms: str = pdf_metadata.get("legal_terms") or "legal_terms"
         # Select legal_terms template
         legal_terms_template_files = [document_legal_terms.lower()]
-        template = options.template.select(legal_terms_template_files)
+        template_name, legal_terms_html = options.template.render_fragment(legal_terms_template_files)
 
-        options.logger.info(f'Add legal_terms content to PDF document using "{template.name}" template.')
-        legal_terms_template = str(template.render())
+        options.logger.info(f'Add legal_terms content to PDF document using "{template_name}" template.')
 
-        def format_legal_terms_html(legal_terms_html: str) -> Tag:
+        def format_legal_terms_html(html_soup: BeautifulSoup) -> Tag:
             """
             Format legal_terms HTML to a BeautifulSoup Tag.
 
-            :param legal_terms_html: The HTML content of the legal_terms.
+            :param html_soup: The parsed legal_terms content.
             :return: The BeautifulSoup Tag with the added legal_terms content.
             """
-            html_soup = BeautifulSoup(legal_terms_html, "html.parser")
             headings = html_soup.find_all(["h2", "h3", "h4", "h5", "h6"])
             for h in headings:
                 ref = h.get("id")
@@ -155,7 +153,7 @@ def enable_legal_terms(soup: BeautifulSoup, options: Options, pdf_metadata: Dict
                 "class": "page-break",
             },
         )
-        legal_terms_div.append(format_legal_terms_html(legal_terms_template))
+        legal_terms_div.append(format_legal_terms_html(legal_terms_html))
 
         content.append(legal_terms_div)
         return soup
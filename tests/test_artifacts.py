@@ -0,0 +1,103 @@
+"""
+The files of the converted documents are written on background I/O threads, through temporary files.
+"""
+
+import gzip
+import logging
+import threading
+
+import pytest
+
+from mkdocs_pdf_generate.artifacts import Artifact, ArtifactWriter, write_atomic
+
+LOGGER = logging.getLogger("mkdocs-pdf-generate-test")
+
+
+def _tmp_files(path):
+    return [file for file in path.rglob("*") if file.name.endswith(".tmp")]
+
+
+def test_write_atomic(tmp_path):
+    path = tmp_path.joinpath("sub", "a.pdf")
+    write_atomic(path, b"first")
+    write_atomic(path, "second é")
+    assert path.read_bytes() == "second é".encode("UTF-8")
+
+    write_atomic(tmp_path.joinpath("a.html.gz"), "<p></p>", compress=True)
+    assert gzip.decompress(tmp_path.joinpath("a.html.gz").read_bytes()) == b"<p></p>"
+    assert not _tmp_files(tmp_path)
+
+
+def test_write_atomic_error(tmp_path):
+    # A directory can't be replaced by a file, the temporary file is removed
+    tmp_path.joinpath("a.pdf").mkdir()
+    with pytest.raises(OSError):
+        write_atomic(tmp_path.joinpath("a.pdf"), b"data")
+    assert tmp_path.joinpath("a.pdf").is_dir()
+    assert not _tmp_files(tmp_path)
+
+
+def test_write_on_calling_thread(tmp_path):
+    writer = ArtifactWriter(LOGGER, threads=0)
+    threads = []
+    writer.submit([Artifact(tmp_path.joinpath("a.pdf"), b"pdf")], lambda: threads.append(threading.current_thread()))
+    # Written before `submit` returns
+    assert tmp_path.joinpath("a.pdf").read_bytes() == b"pdf"
+    assert threads == [threading.current_thread()]
+    writer.close()
+
+
+def test_close_writes_queued_files(tmp_path):
+    writer = ArtifactWriter(LOGGER, threads=2)
+    written = []
+    for n in range(20):
+        artifacts = [Artifact(tmp_path.joinpath(f"{n}.pdf"), b"pdf"), Artifact(tmp_path.joinpath(f"{n}.txt"), "txt")]
+        writer.submit(artifacts, lambda n=n: written.append(n))
+    writer.close()
+    assert sorted(written) == list(range(20))
+    assert len(list(tmp_path.glob("*.pdf"))) == len(list(tmp_path.glob("*.txt"))) == 20
+    assert writer.errors == 0
+
+
+def test_bounded_queue(tmp_path):
+    writer = ArtifactWriter(LOGGER, threads=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    # The first document is taken by the I/O thread, which blocks, the second one fills the queue
+    writer.submit([Artifact(tmp_path.joinpath("0.pdf"), b"pdf")], block)
+    assert started.wait(5)
+    writer.write(tmp_path.joinpath("1.pdf"), b"pdf")
+    submitted = threading.Event()
+    thread = threading.Thread(target=lambda: (writer.write(tmp_path.joinpath("2.pdf"), b"pdf"), submitted.set()))
+    thread.start()
+    assert not submitted.wait(0.2)
+
+    release.set()
+    assert submitted.wait(5)
+    thread.join()
+    writer.close()
+    assert len(list(tmp_path.glob("*.pdf"))) == 3
+
+
+def test_errors(tmp_path, caplog):
+    writer = ArtifactWriter(LOGGER, threads=1)
+    tmp_path.joinpath("a.pdf").mkdir()
+    written = []
+    writer.submit([Artifact(tmp_path.joinpath("a.pdf"), b"pdf")], lambda: written.append("a"))
+    writer.submit([Artifact(tmp_path.joinpath("b.pdf"), b"pdf")], lambda: written.append("b"))
+    writer.write(tmp_path.joinpath("c.pdf"), b"pdf")
+    writer.flush()
+    assert writer.errors == 1
+    assert str(tmp_path.joinpath("a.pdf")) in writer.last_error
+    assert writer.last_error in caplog.text
+    # The callback is only called once the files are written
+    assert written == ["b"]
+
+    writer.submit([], lambda: 1 / 0)
+    writer.close()
+    assert writer.errors == 2
+    assert "division by zero" in writer.last_error
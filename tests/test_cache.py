@@ -0,0 +1,185 @@
+"""
+The render cache: the stability and invalidation of the keys, the restored files, the pruning of the least recently
+used entries, and the cache hits and misses of a build.
+"""
+
+import logging
+import os
+import shutil
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from mkdocs_pdf_generate.artifacts import write_atomic
+from mkdocs_pdf_generate.cache import RenderCache
+from mkdocs_pdf_generate.checksums import data_checksum
+from mkdocs_pdf_generate.jobs import RenderJob, build_document
+from mkdocs_pdf_generate.options import Options
+from mkdocs_pdf_generate.plugin import PdfGeneratePlugin
+from mkdocs_pdf_generate.timings import StageTimer
+
+MKDOCS_YML = """
+site_name: Test
+site_url: https://example.com/
+theme:
+  name: material
+  logo: logo.png
+"""
+CONTENT = '<html><head><meta name="generator" content="mkdocs"></head><body><img src="logo.png"></body></html>'
+
+
+@pytest.fixture
+def project(tmp_path):
+    """
+    A project with a built page referencing an image, and a custom stylesheet and template.
+    """
+    project = tmp_path.joinpath("project")
+    project.joinpath("docs").mkdir(parents=True)
+    project.joinpath("docs", "index.md").write_text("# Page\n", encoding="UTF-8")
+    project.joinpath("mkdocs.yml").write_text(MKDOCS_YML, encoding="UTF-8")
+    project.joinpath("templates").mkdir()
+    project.joinpath("templates", "custom.css").write_text("h1 { color: red; }", encoding="UTF-8")
+    project.joinpath("templates", "cover.html.j2").write_text("<h1>{{ title }}</h1>", encoding="UTF-8")
+    project.joinpath("site", "page").mkdir(parents=True)
+    project.joinpath("site", "page", "logo.png").write_bytes(b"PNG")
+    return project
+
+
+def _options(project: Path, **plugin_config) -> Options:
+    from mkdocs.config import load_config
+
+    config = load_config(str(project.joinpath("mkdocs.yml")))
+    plugin = PdfGeneratePlugin()
+    errors, _ = plugin.load_config(dict({"cache": True}, **plugin_config), str(config["config_file_path"]))
+    assert not errors
+    return Options(plugin.config, config, logging.getLogger("mkdocs-pdf-generate-test"))
+
+
+def _job(project: Path, **fields) -> RenderJob:
+    dest_path = project.joinpath("site", "page")
+    job = RenderJob(
+        src_path=Path("page.md"),
+        dest_path=dest_path,
+        file_name="Page",
+        content=CONTENT,
+        base_url=dest_path.joinpath("Page").as_uri(),
+        pdf_meta={"title": "Page"},
+        site_url="https://example.com/",
+        body_title="Page",
+    )
+    return job._replace(**fields)
+
+
+def _key(project: Path, **fields) -> str:
+    return RenderCache(_options(project), None).key(_job(project, **fields))
+
+
+def test_key_stable_across_checkouts(project, tmp_path):
+    key = _key(project)
+    assert _key(project) == key
+    checkout = tmp_path.joinpath("checkout")
+    shutil.copytree(project, checkout)
+    assert _key(checkout) == key
+
+
+def test_key_invalidation(project):
+    key = _key(project)
+    assert _key(project, pdf_meta={"title": "Page", "revision": "2"}) != key
+    assert _key(project, content=CONTENT.replace("<body>", "<body><p>Changed</p>")) != key
+
+    keys = {key}
+    for path, content in (
+        ("site/page/logo.png", "GIF"),
+        ("templates/custom.css", "h1 { color: blue; }"),
+        ("templates/cover.html.j2", "<h2>{{ title }}</h2>"),
+    ):
+        project.joinpath(path).write_text(content, encoding="UTF-8")
+        keys.add(_key(project))
+    assert len(keys) == 4
+
+    options = _options(project, toc_level=2)
+    assert RenderCache(options, None).key(_job(project)) not in keys
+    assert RenderCache(_options(project), "h1 { margin: 0; }").key(_job(project)) not in keys
+
+
+def test_store_and_restore(project):
+    options = _options(project)
+    cache = RenderCache(options, None)
+    dest_path = project.joinpath("site", "page")
+    key = cache.key(_job(project))
+    assert cache.restore(key, dest_path, "Page") is None
+
+    dest_path.joinpath("Page.pdf").write_bytes(b"%PDF")
+    dest_path.joinpath("Page.txt").write_text("TOC", encoding="UTF-8")
+    cache.store(key, dest_path, "Page", with_txt=True)
+    dest_path.joinpath("Page.pdf").unlink()
+    dest_path.joinpath("Page.txt").unlink()
+
+    algorithm = options.checksum_algorithm
+    checksums = cache.restore(key, dest_path, "Page")
+    assert checksums == {"pdf": data_checksum(b"%PDF", algorithm), "txt": data_checksum(b"TOC", algorithm)}
+    assert dest_path.joinpath("Page.pdf").read_bytes() == b"%PDF"
+    assert dest_path.joinpath("Page.txt").read_text(encoding="UTF-8") == "TOC"
+    assert sorted(file.name for file in dest_path.iterdir()) == ["Page.pdf", "Page.txt", "logo.png"]
+
+
+def test_prune(project):
+    cache = RenderCache(_options(project), None)
+    # Entries of 1 MB, and a cache of 2 MB
+    cache.max_size = 2 * 1024 * 1024
+    dest_path = project.joinpath("site", "page")
+    keys = []
+    for n in range(3):
+        dest_path.joinpath("Page.pdf").write_bytes(bytes([n]) * 1024 * 1024)
+        key = cache.key(_job(project, file_name=f"Page{n}"))
+        cache.store(key, dest_path, "Page")
+        os.utime(cache._entry_dir(key), (n, n))
+        keys.append(key)
+    # Restoring an entry marks it as recently used
+    assert cache.restore(keys[0], dest_path, "Page") is not None
+
+    assert cache.prune() == 1
+    assert [cache._entry_dir(key).is_dir() for key in keys] == [True, False, True]
+    assert cache.prune() == 0
+
+
+class _Renderer:
+    """
+    A renderer writing the content of the page as PDF file.
+    """
+
+    def __init__(self, options: Options):
+        self.options = options
+        self.logger = options.logger
+        self.cache = RenderCache(options, None)
+        self.timer = StageTimer()
+        self.fonts = SimpleNamespace(load_time=0.0)
+        self.resources = SimpleNamespace(hits=0, misses=0, bytes_saved=0)
+        self.resolver = SimpleNamespace(network_requests=0)
+        self.page_count = None
+        self.file_sizes = {}
+        self.converted = 0
+
+    def write_pdf(self, content, base_url, filename, pdf_metadata, txt_filename=None, on_written=None):
+        self.converted += 1
+        data = content.encode("UTF-8")
+        write_atomic(Path(filename), data)
+        self.file_sizes["pdf"] = len(data)
+        on_written()
+        return {"pdf": data_checksum(data, self.options.checksum_algorithm)}
+
+
+def test_hits_and_misses(project):
+    plugin = PdfGeneratePlugin()
+    plugin.renderer = _Renderer(_options(project))
+    pdf_file = project.joinpath("site", "page", "Page.pdf")
+    for content in (CONTENT, CONTENT, CONTENT.replace("<body>", "<body><p>Changed</p>")):
+        if pdf_file.exists():
+            # The site directory is cleaned before each build
+            pdf_file.unlink()
+        plugin._collect_result(build_document(plugin.renderer, _job(project, content=content)))
+        assert pdf_file.read_text(encoding="UTF-8") == content
+
+    assert (plugin.cache_hits, plugin.cache_misses, plugin.renderer.converted) == (1, 2, 2)
+    assert [document["cached"] for document in plugin.report_documents] == [False, True, False]
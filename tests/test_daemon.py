@@ -0,0 +1,127 @@
+"""
+The protocol of the render daemon, with a fake daemon on a temporary socket: the length-prefixed messages, the
+fallback when the daemon is not running, the error replies, and the checks of the daemon itself.
+"""
+
+import os
+import socket
+import stat
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from mkdocs_pdf_generate.daemon import (
+    RenderDaemonException,
+    _listen,
+    _output_path,
+    _recv_message,
+    _send_message,
+    render_with_daemon,
+)
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix domain sockets are not available")
+
+
+@pytest.fixture
+def socket_path():
+    # The path of a Unix domain socket is limited to about 100 characters, shorter than the pytest directories
+    with tempfile.TemporaryDirectory(prefix="pdf-") as tmp_dir:
+        yield os.path.join(tmp_dir, "d.sock")
+
+
+def _fake_daemon(socket_path: str, reply):
+    """
+    Serve a single request on the socket.
+
+    :param reply: The reply, or None to close the connection without replying.
+    :return: The thread serving the request, and the list the received request is added to.
+    """
+    listener = _listen(socket_path, 1)
+    requests = []
+
+    def serve():
+        conn, _ = listener.accept()
+        try:
+            requests.append(_recv_message(conn))
+            if reply is not None:
+                _send_message(conn, reply)
+        finally:
+            conn.close()
+            listener.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    return thread, requests
+
+
+def test_message_round_trip():
+    left, right = socket.socketpair()
+    with left, right:
+        message = {"html": "<p>é</p>" * 100000, "pdf_file": "/site/a.pdf"}
+        threading.Thread(target=_send_message, args=(left, message), daemon=True).start()
+        assert _recv_message(right) == message
+
+
+def test_message_truncated():
+    left, right = socket.socketpair()
+    with right:
+        with left:
+            left.sendall(b"\x00\x00\x00\x10{}")
+        with pytest.raises(ConnectionError):
+            _recv_message(right)
+
+
+def test_not_running(socket_path):
+    assert render_with_daemon(socket_path, "<p></p>", "/site/a.pdf") is None
+    # A socket file left by a stopped daemon
+    _listen(socket_path, 1).close()
+    assert os.path.exists(socket_path)
+    assert render_with_daemon(socket_path, "<p></p>", "/site/a.pdf") is None
+
+
+def test_reply(socket_path):
+    reply = {"pdf_file": "/site/a.pdf", "checksums": {"pdf": "0"}, "page_count": 2, "network_requests": 0}
+    thread, requests = _fake_daemon(socket_path, reply)
+    assert render_with_daemon(socket_path, "<p></p>", "/site/a.pdf", {"checksum_algorithm": "md5"}) == reply
+    thread.join()
+    assert requests == [{"checksum_algorithm": "md5", "html": "<p></p>", "pdf_file": "/site/a.pdf"}]
+
+
+def test_error_reply(socket_path):
+    thread, _ = _fake_daemon(socket_path, {"error": "Layout failed"})
+    with pytest.raises(RenderDaemonException, match="Layout failed"):
+        render_with_daemon(socket_path, "<p></p>", "/site/a.pdf")
+    thread.join()
+
+
+def test_stopped_before_reply(socket_path):
+    thread, _ = _fake_daemon(socket_path, None)
+    assert render_with_daemon(socket_path, "<p></p>", "/site/a.pdf") is None
+    thread.join()
+
+
+def test_socket_permissions(socket_path):
+    with _listen(socket_path, 1):
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+
+
+def test_output_path(tmp_path):
+    root = tmp_path.joinpath("site")
+    root.joinpath("sub").mkdir(parents=True)
+    tmp_path.joinpath("other").mkdir()
+    root.joinpath("link").symlink_to(tmp_path.joinpath("other"))
+    roots = [root.resolve()]
+
+    assert _output_path(str(root.joinpath("a.pdf")), roots) == root.resolve().joinpath("a.pdf")
+    assert _output_path(str(root.joinpath("sub", "a.pdf")), roots) == root.resolve().joinpath("sub", "a.pdf")
+    for path in (
+        tmp_path.joinpath("a.pdf"),
+        root.joinpath("..", "a.pdf"),
+        root.joinpath("link", "a.pdf"),
+        Path("site", "a.pdf"),
+        root,
+    ):
+        with pytest.raises(RenderDaemonException):
+            _output_path(str(path), roots)
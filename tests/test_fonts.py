@@ -0,0 +1,50 @@
+"""
+The web fonts downloaded by WeasyPrint are kept in a persistent cache shared by the builds.
+"""
+
+import logging
+
+import pytest
+
+try:
+    from weasyprint import urls
+except (ImportError, OSError):
+    # WeasyPrint raises OSError if Pango is not installed
+    pytest.skip("WeasyPrint is not installed", allow_module_level=True)
+
+from mkdocs_pdf_generate.fonts import FontLoader  # noqa: E402
+
+LOGGER = logging.getLogger("mkdocs-pdf-generate-test")
+URL = "https://example.com/font.woff2"
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    fetched = []
+
+    def fetch(url, *args, **kwargs):
+        fetched.append(url)
+        return {"string": b"wOF2", "mime_type": "font/woff2", "redirected_url": url}
+
+    monkeypatch.setattr(urls, "default_url_fetcher", fetch)
+    return fetched
+
+
+def test_font_cache(tmp_path, fetched):
+    for _ in range(2):
+        # A new build
+        result = FontLoader(tmp_path, LOGGER).fetch(URL)
+        assert result["string"] == b"wOF2" and result["mime_type"] == "font/woff2"
+    assert fetched == [URL]
+    assert not [file for file in tmp_path.iterdir() if file.name.endswith(".tmp")]
+
+
+def test_font_cache_error(tmp_path, fetched, caplog):
+    cache_dir = tmp_path.joinpath("fonts")
+    # The cache directory can't be created
+    cache_dir.write_bytes(b"")
+    fonts = FontLoader(cache_dir, LOGGER)
+    for _ in range(2):
+        assert fonts.fetch(URL)["string"] == b"wOF2"
+    assert fetched == [URL, URL]
+    assert "Could not add {} to the font cache".format(URL) in caplog.text
@@ -0,0 +1,74 @@
+"""
+The `html_parser` option must not change the PDF documents: the pages of a synthetic site are converted with
+`html.parser` and `lxml`, and the prepared HTML and the text of the PDF documents are compared.
+"""
+
+import io
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("lxml")
+try:
+    import weasyprint  # noqa: F401
+except (ImportError, OSError):
+    # WeasyPrint raises OSError if Pango is not installed
+    pytest.skip("WeasyPrint is not installed", allow_module_level=True)
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from benchmarks.run import build_site, make_options  # noqa: E402
+from benchmarks.sitegen import generate_site  # noqa: E402
+
+PARSERS = ("html.parser", "lxml")
+PAGES = 3
+
+
+@pytest.fixture(scope="module")
+def site(tmp_path_factory):
+    work_dir = tmp_path_factory.mktemp("site")
+    config = build_site(generate_site(work_dir, pages=PAGES, heading_depth=4, seed=1), work_dir.joinpath("site"))
+    return config, sorted(work_dir.joinpath("site").glob("page-*/index.html"))
+
+
+def _convert(config, html_file: Path, parser: str, layout: bool):
+    """
+    Convert a page with the given parser, as the plugin does.
+
+    :return: The prepared HTML, and the text of each page of the PDF document if laid out.
+    """
+    from mkdocs_pdf_generate.renderer import Renderer
+
+    options = make_options(config)
+    options.html_parser = parser
+    options.site_url = config["site_url"]
+    options.md_src_path = Path(html_file.parent.name + ".md")
+    options.out_dest_path = html_file.parent
+    options.body_title = None
+    renderer = Renderer(options=options)
+    base_url = html_file.parent.joinpath("page.pdf").as_uri()
+
+    html = renderer.prepare_html(BeautifulSoup(html_file.read_text(encoding="UTF-8"), parser), base_url, {})
+    if not layout:
+        return html, None
+
+    from pypdf import PdfReader
+
+    pdf = renderer._render_html(html).write_pdf()
+    return html, [page.extract_text() for page in PdfReader(io.BytesIO(pdf)).pages]
+
+
+def test_prepared_html(site):
+    config, pages = site
+    for html_file in pages:
+        prepared = [_convert(config, html_file, parser, layout=False)[0] for parser in PARSERS]
+        # The serialized markup may differ (e.g. the whitespace around `<html>`), the text must not
+        texts = [" ".join(BeautifulSoup(html, "html.parser").get_text().split()) for html in prepared]
+        assert texts[0] == texts[1], html_file
+
+
+def test_pdf_text(site):
+    config, pages = site
+    for html_file in pages:
+        texts = [_convert(config, html_file, parser, layout=True)[1] for parser in PARSERS]
+        assert texts[0] == texts[1], html_file
@@ -0,0 +1,215 @@
+"""
+The on-demand conversion of the documents while `mkdocs serve` runs, with a stub renderer recording the converted
+documents.
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from mkdocs_pdf_generate import lazy
+from mkdocs_pdf_generate.jobs import RenderJob
+from mkdocs_pdf_generate.lazy import LazyRenderer
+
+LOGGER = logging.getLogger("mkdocs-pdf-generate-test")
+
+
+class _Artifacts:
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Renderer:
+    """
+    Record the converted documents. The conversion of the documents in `blocked` waits for `release`.
+    """
+
+    def __init__(self, converted, blocked=(), started=None, release=None):
+        self.artifacts = _Artifacts()
+        self.converted = converted
+        self.blocked = blocked
+        self.started = started
+        self.release = release
+
+    def build(self, job):
+        if job.file_name in self.blocked:
+            self.started.set()
+            assert self.release.wait(5)
+        self.converted.append(job.file_name)
+
+
+@pytest.fixture(autouse=True)
+def stub_build_document(monkeypatch):
+    monkeypatch.setattr(lazy, "build_document", lambda renderer, job: renderer.build(job))
+
+
+def _job(site_dir: Path, name: str, toc_txt: bool = False) -> RenderJob:
+    return RenderJob(
+        src_path=Path(f"{name}.md"),
+        dest_path=site_dir.joinpath(name),
+        file_name=name,
+        content="",
+        base_url="",
+        pdf_meta={"toc_txt": toc_txt},
+        site_url="https://example.com/",
+        body_title=None,
+    )
+
+
+def _pdf(site_dir: Path, name: str) -> str:
+    return str(site_dir.joinpath(name, f"{name}.pdf"))
+
+
+def test_convert_requested_document(tmp_path):
+    converted = []
+    renderer = LazyRenderer(LOGGER, background=False)
+    renderer.publish([_job(tmp_path, "a", toc_txt=True), _job(tmp_path, "b")], lambda: _Renderer(converted))
+
+    renderer.convert(str(tmp_path.joinpath("a", "a.txt")))
+    assert converted == ["a"]
+    # Converted once, whichever of its files is requested
+    renderer.convert(_pdf(tmp_path, "a"))
+    renderer.convert(str(tmp_path.joinpath("a", "a.txt")))
+    # Not the files of the documents
+    renderer.convert(str(tmp_path.joinpath("b", "index.html")))
+    renderer.convert(str(tmp_path.joinpath("b", "b.txt")))
+    renderer.convert(_pdf(tmp_path, "c"))
+    assert converted == ["a"]
+
+    renderer.convert(_pdf(tmp_path, "b"))
+    assert converted == ["a", "b"]
+    renderer.close()
+
+
+def test_rebuild_cancels_waiting_conversion(tmp_path):
+    converted = []
+    started, release = threading.Event(), threading.Event()
+    renderer = LazyRenderer(LOGGER, background=False)
+    jobs = [_job(tmp_path, "a"), _job(tmp_path, "b")]
+    renderer.publish(jobs, lambda: _Renderer(converted, blocked=("a",), started=started, release=release))
+
+    # "a" is being converted, "b" waits for the renderer
+    requests = [threading.Thread(target=renderer.convert, args=(_pdf(tmp_path, "a"),))]
+    requests[0].start()
+    assert started.wait(5)
+    requests.append(threading.Thread(target=renderer.convert, args=(_pdf(tmp_path, "b"),)))
+    requests[1].start()
+    deadline = time.monotonic() + 5
+    while renderer._waiting < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # The rebuild waits for the conversion of "a"
+    rebuild = threading.Thread(target=renderer.begin_build)
+    rebuild.start()
+    rebuild.join(0.2)
+    assert rebuild.is_alive()
+
+    release.set()
+    rebuild.join(5)
+    for request in requests:
+        request.join(5)
+        assert not request.is_alive()
+    assert converted == ["a"]
+    renderer.close()
+
+
+def test_wait_for_build(tmp_path, monkeypatch):
+    converted = []
+    renderer = LazyRenderer(LOGGER, background=False)
+    renderer.publish([_job(tmp_path, "a")], lambda: _Renderer(converted))
+    renderer.begin_build()
+
+    # The requested files are served as they are once the build takes too long
+    monkeypatch.setattr(lazy, "BUILD_TIMEOUT", 0.1)
+    renderer.convert(_pdf(tmp_path, "a"))
+    assert converted == []
+
+    monkeypatch.setattr(lazy, "BUILD_TIMEOUT", 5)
+    request = threading.Thread(target=renderer.convert, args=(_pdf(tmp_path, "a"),))
+    request.start()
+    renderer.publish([_job(tmp_path, "a")], lambda: _Renderer(converted))
+    request.join(5)
+    assert converted == ["a"]
+    renderer.close()
+
+
+def test_cancel_build(tmp_path):
+    converted = []
+    renderer = LazyRenderer(LOGGER, background=False)
+    renderer.publish([_job(tmp_path, "a"), _job(tmp_path, "b")], lambda: _Renderer(converted))
+    renderer.convert(_pdf(tmp_path, "a"))
+
+    # The build fails, the documents of the previous build are converted again as the site may have been cleaned
+    renderer.begin_build()
+    renderer.cancel_build()
+    renderer.convert(_pdf(tmp_path, "a"))
+    renderer.convert(_pdf(tmp_path, "b"))
+    assert converted == ["a", "a", "b"]
+    renderer.close()
+
+
+def test_cancel_first_build(tmp_path):
+    renderer = LazyRenderer(LOGGER, background=False)
+    renderer.begin_build()
+    renderer.cancel_build()
+    # Not held by the failed build
+    request = threading.Thread(target=renderer.convert, args=(_pdf(tmp_path, "a"),))
+    request.start()
+    request.join(1)
+    assert not request.is_alive()
+    renderer.close()
+
+
+def test_background_conversion(tmp_path, monkeypatch):
+    monkeypatch.setattr(lazy, "BACKGROUND_DELAY", 0)
+    converted = []
+    done = threading.Event()
+
+    def make_renderer():
+        renderer = _Renderer(converted)
+        build = renderer.build
+
+        def build_and_notify(job):
+            build(job)
+            if len(converted) == 2:
+                done.set()
+
+        renderer.build = build_and_notify
+        return renderer
+
+    renderer = LazyRenderer(LOGGER)
+    renderer.publish([_job(tmp_path, "a"), _job(tmp_path, "b")], make_renderer)
+    thread = renderer._thread
+    assert done.wait(5)
+    assert sorted(converted) == ["a", "b"]
+
+    renderer.close()
+    assert renderer._thread is None and not thread.is_alive()
+    # Already converted
+    renderer.convert(_pdf(tmp_path, "a"))
+    assert len(converted) == 2
+
+
+def test_wsgi_app(tmp_path):
+    requested = []
+    renderer = LazyRenderer(LOGGER, background=False)
+    renderer.convert = requested.append
+
+    def app(environ, start_response):
+        return [environ["PATH_INFO"].encode("latin-1")]
+
+    serve = renderer.wsgi_app(app, str(tmp_path), "/docs/")
+    # The WSGI paths are the UTF-8 bytes of the URL path decoded as latin-1
+    paths = ("/docs/a/a.pdf", "/docs/a/../b/" + "é.pdf".encode("UTF-8").decode("latin-1"), "/docs/", "/other/a.pdf")
+    for path in paths:
+        assert serve({"PATH_INFO": path}, None) == [path.encode("latin-1")]
+    assert requested == [
+        str(tmp_path.joinpath("a", "a.pdf")),
+        str(tmp_path.joinpath("b", "é.pdf")),
+        str(tmp_path) + "/",
+    ]
@@ -0,0 +1,86 @@
+"""
+`LinkMap.rel_html_href` must rewrite the links between pages as `rel_html_href` does: the links of the pages of a
+site directory are resolved with both, and the URLs compared.
+"""
+
+import itertools
+import os
+
+import pytest
+
+try:
+    import weasyprint  # noqa: F401
+except (ImportError, OSError):
+    # WeasyPrint raises OSError if Pango is not installed
+    pytest.skip("WeasyPrint is not installed", allow_module_level=True)
+
+from mkdocs_pdf_generate.preprocessor.links import LinkMap, rel_html_href  # noqa: E402
+
+# The files of the site, relative to the site directory
+FILES = (
+    "index.html",
+    "about/index.html",
+    "sub/p1/index.html",
+    "sub/p2/index.html",
+    "sub/page.html",
+    "a b/index.html",
+    "img/logo.png",
+)
+# The directories of the pages the links are resolved from
+BASE_DIRS = ("", "about", "sub/p1", "a b")
+HREFS = (
+    "",
+    ".",
+    "./",
+    "..",
+    "../",
+    "#x",
+    "./#x",
+    "..#x",
+    "index.html",
+    "index.html#x",
+    "about/",
+    "about",
+    "../about/",
+    "../about",
+    "../about/index.html",
+    "../about/#x",
+    "../about#x",
+    "../about/?q=1",
+    "../about/index.html?q=1#x",
+    "../sub/p2/",
+    "../p2/",
+    "../p2/#x",
+    "p1/../p2/",
+    "../sub/page.html",
+    "../sub/page.html?x=1#y",
+    "../a%20b/",
+    "../a b/",
+    "../../index.html",
+    "../../../outside.html",
+    "../missing/",
+    "../img/logo.png",
+    "https://example.com/x/about/",
+    "mailto:someone@example.com",
+    "../about/#x/y",
+)
+SITE_URLS = ("https://example.com/x/", "https://example.com/x")
+
+
+@pytest.fixture(scope="module")
+def site_dir(tmp_path_factory):
+    # The links are only rewritten under a directory named `site` (see `site_href`)
+    site_dir = tmp_path_factory.mktemp("links").joinpath("site")
+    for file in FILES:
+        site_dir.joinpath(file).parent.mkdir(parents=True, exist_ok=True)
+        site_dir.joinpath(file).touch()
+    return site_dir
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The links are only mapped on POSIX systems")
+def test_link_map(site_dir):
+    link_map = LinkMap(str(site_dir.joinpath(file)) for file in FILES)
+    for base_dir, href, site_url in itertools.product(BASE_DIRS, HREFS, SITE_URLS):
+        base_url = site_dir.joinpath(base_dir, "page.pdf").as_uri()
+        expected = rel_html_href(base_url, href, site_url)
+        assert link_map.rel_html_href(base_url, href, site_url) == expected, (base_dir, href, site_url)
@@ -0,0 +1,67 @@
+"""
+The worker processes of the `parallel` option get their configuration as a pickled snapshot, and must create the
+same renderer as the main process.
+"""
+
+import logging
+import pickle
+
+import pytest
+
+try:
+    import weasyprint  # noqa: F401
+except (ImportError, OSError):
+    # WeasyPrint raises OSError if Pango is not installed
+    pytest.skip("WeasyPrint is not installed", allow_module_level=True)
+
+from mkdocs_pdf_generate import parallel  # noqa: E402
+from mkdocs_pdf_generate.options import Options  # noqa: E402
+from mkdocs_pdf_generate.plugin import PdfGeneratePlugin  # noqa: E402
+from mkdocs_pdf_generate.preprocessor.links import LinkMap  # noqa: E402
+from mkdocs_pdf_generate.renderer import Renderer  # noqa: E402
+
+MKDOCS_YML = """
+site_name: Test
+site_url: https://example.com/docs/
+theme:
+  name: material
+  logo: logo.png
+extra:
+  version: 1.2
+"""
+PLUGIN_CONFIG = {"cache": True, "author": "Author", "cover_subtitle": "Subtitle", "toc_level": 2}
+
+
+def test_config_snapshot(tmp_path, monkeypatch):
+    from mkdocs.config import load_config
+
+    tmp_path.joinpath("docs").mkdir()
+    tmp_path.joinpath("mkdocs.yml").write_text(MKDOCS_YML, encoding="UTF-8")
+    tmp_path.joinpath("templates").mkdir()
+    tmp_path.joinpath("templates", "custom.css").write_text("h1 { color: red; }", encoding="UTF-8")
+    config = load_config(str(tmp_path.joinpath("mkdocs.yml")))
+    plugin = PdfGeneratePlugin()
+    errors, _ = plugin.load_config(PLUGIN_CONFIG, str(config["config_file_path"]))
+    assert not errors
+    site_dir = tmp_path.joinpath("site")
+    link_map = LinkMap([str(site_dir.joinpath("index.html")), str(site_dir.joinpath("page", "index.html"))])
+
+    renderer = Renderer(Options(plugin.config, config, logging.getLogger("mkdocs-pdf-generate-test")))
+    renderer.link_map = link_map
+    # Sent to the worker processes as the arguments of `_init_worker`
+    initargs = pickle.loads(pickle.dumps((dict(plugin.config), parallel.config_snapshot(config), None, link_map)))
+    monkeypatch.setattr(parallel, "_worker_renderer", None)
+    parallel._init_worker(*initargs)
+    worker_renderer = parallel._worker_renderer
+    worker_renderer.artifacts.close()
+
+    options, worker_options = renderer.options, worker_renderer.options
+    for name in ("site_url", "author", "cover_title", "cover_subtitle", "toc_level", "author_logo", "theme_name"):
+        assert getattr(worker_options, name) == getattr(options, name), name
+    assert worker_options.cache_dir() == options.cache_dir()
+    # The inputs of the cache keys: the options, the `extra` configuration, the stylesheets and templates
+    assert worker_renderer.cache._fingerprint == renderer.cache._fingerprint
+    base_url = site_dir.joinpath("page", "Page.pdf").as_uri()
+    for href in ("../", "./#section", "../missing/"):
+        expected = renderer.link_map.rel_html_href(base_url, href, options.site_url)
+        assert worker_renderer.link_map.rel_html_href(base_url, href, options.site_url) == expected
@@ -0,0 +1,54 @@
+"""
+The resources and the decoded images shared by the documents of a build stay within their limits.
+"""
+
+from mkdocs_pdf_generate.resources import MAX_CACHED_IMAGES, ImageCache, ResourceCache
+
+
+def test_resource_cache_limit():
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return {"string": b"x" * 400, "mime_type": "image/png"}
+
+    cache = ResourceCache(fetch, max_size=1000)
+    for url in ("a", "b", "a", "c", "a", "b"):
+        assert cache.fetch(url)["string"] == b"x" * 400
+        assert cache.size <= cache.max_size
+    # "b" is evicted by "c", "a" was used more recently
+    assert fetched == ["a", "b", "c", "b"]
+    assert (cache.hits, cache.misses, cache.bytes_saved) == (2, 4, 800)
+
+
+def test_image_cache_size():
+    cache = ImageCache(max_size=1000)
+    # An image, and the data it references under a key of its own
+    cache["https://example.com/a.png"] = object()
+    cache["image-1"] = b"x" * 600
+    cache.trim()
+    assert len(cache) == 2
+
+    cache["image-2"] = b"x" * 600
+    assert cache.size == 1200
+    cache.trim()
+    assert not cache and cache.clears == 1
+    cache.trim()
+    assert cache.clears == 1
+
+
+def test_image_cache_entries():
+    cache = ImageCache(max_size=1000)
+    cache.update((f"https://example.com/{n}.svg", object()) for n in range(MAX_CACHED_IMAGES))
+    cache.trim()
+    assert len(cache) == MAX_CACHED_IMAGES
+    cache["https://example.com/more.svg"] = object()
+    cache.trim()
+    assert not cache
+
+
+def test_image_cache_disabled():
+    cache = ImageCache(max_size=0)
+    cache["https://example.com/a.svg"] = object()
+    cache.trim()
+    assert not cache